@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+Olist Seller Success - Columnar Analytics Backend
+
+Exports the Olist tables (plus seller_metrics, review_sentiment and the dataset
+version stamp) to Parquet once per load, and answers the api_queries.py
+aggregates from those files with an embedded DuckDB database.
+
+DuckDBEngine quacks like the parts of a SQLAlchemy engine the query functions
+use (`engine.connect()` / `connection.execute(text(...), params)`), so the same
+functions run on either backend. Postgres stays the default; set
+ANALYTICS_BACKEND=duckdb to serve the platform dashboards from Parquet, with no
+database server needed once an export exists.
+
+Usage:
+    uv run python -m backend.analytics_backend export
+"""
+
+import os
+import re
+import sys
+import json
+import shutil
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from sqlalchemy import text
+
+from .db import copy_out_stream
+
+# --- Paths ---
+BASE_DIR = Path(__file__).resolve().parent
+PARQUET_EXPORT_DIR = Path(os.getenv("PARQUET_EXPORT_DIR", BASE_DIR.parent / "artifacts" / "parquet"))
+LATEST_POINTER = "LATEST"
+
+# --- Parameters ---
+ANALYTICS_BACKEND = os.getenv("ANALYTICS_BACKEND", "postgres").lower()
+EXPORTS_TO_KEEP = 2
+EXPORT_TABLES = [
+    "customers", "sellers", "product_category_name_translation", "products",
+    "orders", "order_items", "order_payments", "order_reviews",
+    "seller_metrics", "review_sentiment", "dataset_version",
+]
+
+COLUMN_TYPES_QUERY = text("""
+    SELECT a.attname, format_type(a.atttypid, a.atttypmod)
+    FROM pg_attribute a
+    WHERE a.attrelid = CAST(:table_name AS regclass) AND a.attnum > 0 AND NOT a.attisdropped
+    ORDER BY a.attnum;
+""")
+
+
+# --- Parquet Export ---
+
+def _arrow_type(pg_type: str):
+    import pyarrow as pa
+
+    if pg_type.startswith(("integer", "smallint", "bigint")):
+        return pa.int64()
+    if pg_type.startswith(("numeric", "double precision", "real")):
+        return pa.float64()
+    if pg_type.startswith("timestamp"):
+        # timestamptz columns are exported as naive UTC, see _column_expression
+        return pa.timestamp('us')
+    if pg_type == "date":
+        return pa.date32()
+    if pg_type == "boolean":
+        return pa.bool_()
+    return pa.string()
+
+def _column_expression(name: str, pg_type: str) -> str:
+    if pg_type == "timestamp with time zone":
+        return f"(\"{name}\" AT TIME ZONE 'UTC') AS \"{name}\""
+    return f'"{name}"'
+
+def export_table(dbapi_connection, table_name: str, columns: list, path: Path) -> int:
+    """Streams one table through COPY TO STDOUT into a Parquet file. Returns the row count."""
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+
+    select = ", ".join(_column_expression(name, pg_type) for name, pg_type in columns)
+    sql = f'COPY (SELECT {select} FROM "{table_name}") TO STDOUT WITH (FORMAT csv, HEADER true)'
+    schema = pa.schema([(name, _arrow_type(pg_type)) for name, pg_type in columns])
+
+    rows = 0
+    with copy_out_stream(dbapi_connection, sql, name=f"export-{table_name}") as source:
+        reader = pa_csv.open_csv(
+            source,
+            convert_options=pa_csv.ConvertOptions(column_types=schema, strings_can_be_null=True),
+        )
+        with pq.ParquetWriter(path, schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+                rows += batch.num_rows
+    return rows
+
+def latest_export(export_dir: Path = PARQUET_EXPORT_DIR):
+    try:
+        return (export_dir / LATEST_POINTER).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+def export_tables(engine, export_dir: Path = PARQUET_EXPORT_DIR) -> dict:
+    """Exports EXPORT_TABLES as a new Parquet version and atomically points LATEST at it."""
+    start = time.perf_counter()
+    created_at = datetime.now(timezone.utc)
+    version = created_at.strftime("%Y%m%dT%H%M%S%fZ")
+    tmp_dir = export_dir / f".{version}.tmp"
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+
+    tables = {}
+    with engine.connect() as connection:
+        column_types = {
+            table_name: [tuple(row) for row in connection.execute(COLUMN_TYPES_QUERY, {'table_name': table_name})]
+            for table_name in EXPORT_TABLES
+        }
+    dbapi_connection = engine.raw_connection()
+    try:
+        for table_name in EXPORT_TABLES:
+            rows = export_table(dbapi_connection, table_name, column_types[table_name], tmp_dir / f"{table_name}.parquet")
+            tables[table_name] = {"rows": rows}
+            logging.info(f"Exported {table_name}: {rows} rows.")
+    finally:
+        dbapi_connection.close()
+
+    manifest = {"version": version, "created_at": created_at.isoformat(), "tables": tables}
+    (tmp_dir / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp_dir, export_dir / version)
+    pointer_tmp = export_dir / f".{LATEST_POINTER}.tmp"
+    pointer_tmp.write_text(version)
+    os.replace(pointer_tmp, export_dir / LATEST_POINTER)
+
+    # Keep the newest exports only; readers of an older one keep their open files
+    versions = sorted(p.name for p in export_dir.iterdir() if p.is_dir() and not p.name.startswith('.'))
+    for old in versions[:-EXPORTS_TO_KEEP]:
+        shutil.rmtree(export_dir / old, ignore_errors=True)
+
+    logging.info(f"Parquet export {version} written in {time.perf_counter() - start:.1f}s.")
+    return manifest
+
+
+# --- DuckDB Engine ---
+
+# Postgres-only SQL used by api_queries.py and its DuckDB equivalent
+SQL_REWRITES = [
+    (re.compile(r"TO_CHAR\(([\w.]+), 'YYYY-MM'\)", re.IGNORECASE), r"strftime(\1, '%Y-%m')"),
+]
+BIND_PARAMETER = re.compile(r"(?<![:\w]):([A-Za-z_]\w*)")
+
+def to_duckdb_sql(sql: str) -> str:
+    """Rewrites Postgres-only constructs and :name bind parameters ($name in DuckDB)."""
+    for pattern, replacement in SQL_REWRITES:
+        sql = pattern.sub(replacement, sql)
+    return BIND_PARAMETER.sub(r"$\1", sql)
+
+class DuckDBResult:
+    """The subset of the SQLAlchemy Result API used by the query functions."""
+
+    def __init__(self, rows):
+        self._rows = rows
+
+    def fetchall(self):
+        return self._rows
+
+    def first(self):
+        return self._rows[0] if self._rows else None
+
+    def scalar_one(self):
+        if len(self._rows) != 1:
+            raise ValueError(f"Expected exactly one row, got {len(self._rows)}.")
+        return self._rows[0][0]
+
+    def scalar_one_or_none(self):
+        return self._rows[0][0] if self._rows else None
+
+class DuckDBConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def execute(self, query, params=None):
+        sql = to_duckdb_sql(str(query))
+        names = set(BIND_PARAMETER.findall(str(query)))
+        bound = {name: value for name, value in (params or {}).items() if name in names}
+        return DuckDBResult(self._cursor.execute(sql, bound).fetchall())
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self._cursor.close()
+
+class DuckDBEngine:
+    """
+    In-memory DuckDB database with one view per exported Parquet table. A newer
+    export (LATEST pointer) is picked up on the next connect().
+    """
+
+    def __init__(self, export_dir: Path = PARQUET_EXPORT_DIR):
+        self.export_dir = export_dir
+        self.version = None
+        self._database = None
+        self._lock = threading.Lock()
+
+    def _attach(self, version: str):
+        import duckdb
+
+        database = duckdb.connect(":memory:")
+        for path in sorted((self.export_dir / version).glob("*.parquet")):
+            database.execute(f"CREATE VIEW \"{path.stem}\" AS SELECT * FROM read_parquet('{path.as_posix()}');")
+        logging.info(f"DuckDB analytics backend attached to Parquet export {version}.")
+        return database
+
+    def connect(self):
+        version = latest_export(self.export_dir)
+        if version is None:
+            raise RuntimeError(f"No Parquet export in {self.export_dir}; run `python -m backend.analytics_backend export`.")
+        with self._lock:
+            if version != self.version:
+                self._database, self.version = self._attach(version), version
+            # A cursor is a separate connection to the same database, safe to use from this thread
+            return DuckDBConnection(self._database.cursor())
+
+def get_analytics_engine(engine, backend: str = ANALYTICS_BACKEND):
+    """Engine for the api_queries.py aggregates: the Postgres engine, or DuckDB over the Parquet export."""
+    if backend == "duckdb":
+        return DuckDBEngine()
+    if backend != "postgres":
+        logging.warning(f"Unknown ANALYTICS_BACKEND '{backend}', using postgres.")
+    return engine
+
+
+def main():
+    """Exports the configured database to Parquet."""
+    from .db import create_db_engine
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if sys.argv[1:] != ["export"]:
+        print("Usage: python -m backend.analytics_backend export", file=sys.stderr)
+        sys.exit(2)
+    engine = create_db_engine()
+    if engine is None:
+        sys.exit(1)
+    export_tables(engine)
+
+if __name__ == "__main__":
+    main()
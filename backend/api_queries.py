@@ -1,7 +1,12 @@
 import logging
+import time
+import numpy as np
 import pandas as pd
 from sqlalchemy import text
 
+from .db import copy_out_stream
+from .query_cache import cached_query
+
 def get_sellers(engine, sort_by='total_revenue', order='DESC', limit=10, page=1):
     """Queries for a paginated list of sellers using SQLAlchemy engine."""
     if sort_by not in ['total_revenue', 'unique_order_count', 'seller_id', 'seller_city', 'seller_state']:
@@ -12,18 +17,9 @@ def get_sellers(engine, sort_by='total_revenue', order='DESC', limit=10, page=1)
     offset = (page - 1) * limit
 
     query = text(f"""
-        WITH seller_metrics AS (
-            SELECT
-                s.seller_id, s.seller_city, s.seller_state,
-                COALESCE(SUM(oi.price), 0) AS total_revenue,
-                COALESCE(COUNT(DISTINCT oi.order_id), 0) AS unique_order_count
-            FROM sellers s
-            LEFT JOIN order_items oi ON s.seller_id = oi.seller_id
-            GROUP BY s.seller_id, s.seller_city, s.seller_state
-        )
         SELECT seller_id, seller_city, seller_state, total_revenue, unique_order_count
         FROM seller_metrics
-        ORDER BY {sort_by} {order}
+        ORDER BY {sort_by} {order}, seller_id {order}
         LIMIT :limit OFFSET :offset;
     """)
     try:
@@ -44,13 +40,13 @@ def get_sellers_count(engine):
         logging.error(f"Error fetching sellers count: {e}")
         return 0
 
+@cached_query
 def get_top_sellers_by_revenue(engine, limit=10):
     """Queries top sellers by revenue using SQLAlchemy engine."""
     query = text("""
-        SELECT s.seller_id, SUM(oi.price) AS total_revenue, s.seller_city, s.seller_state
-        FROM order_items oi
-        JOIN sellers s ON oi.seller_id = s.seller_id
-        GROUP BY s.seller_id, s.seller_city, s.seller_state
+        SELECT seller_id, total_revenue, seller_city, seller_state
+        FROM seller_metrics
+        WHERE unique_order_count > 0
         ORDER BY total_revenue DESC
         LIMIT :limit;
     """)
@@ -62,13 +58,13 @@ def get_top_sellers_by_revenue(engine, limit=10):
         logging.error(f"Error fetching top sellers by revenue: {e}")
         return []
 
+@cached_query
 def get_top_sellers_by_volume(engine, limit=10):
     """Queries top sellers by volume using SQLAlchemy engine."""
     query = text("""
-        SELECT s.seller_id, COUNT(DISTINCT oi.order_id) AS unique_order_count, s.seller_city, s.seller_state
-        FROM order_items oi
-        JOIN sellers s ON oi.seller_id = s.seller_id
-        GROUP BY s.seller_id, s.seller_city, s.seller_state
+        SELECT seller_id, unique_order_count, seller_city, seller_state
+        FROM seller_metrics
+        WHERE unique_order_count > 0
         ORDER BY unique_order_count DESC
         LIMIT :limit;
     """)
@@ -155,6 +151,7 @@ def get_orders_count(engine):
         logging.error(f"Error fetching orders count: {e}")
         return 0
 
+@cached_query
 def get_top_products(engine, limit=5):
     """Queries for the top N best-selling products using SQLAlchemy engine."""
     query = text("""
@@ -177,6 +174,7 @@ def get_top_products(engine, limit=5):
         logging.error(f"Error fetching top products: {e}")
         return []
 
+@cached_query
 def get_sales_by_region(engine):
     """Queries for total sales revenue per state using SQLAlchemy engine."""
     query = text("""
@@ -196,6 +194,7 @@ def get_sales_by_region(engine):
         logging.error(f"Error fetching sales by region: {e}")
         return []
 
+@cached_query
 def get_order_status_distribution(engine):
     """Queries for the distribution of order statuses using SQLAlchemy engine."""
     query = text("SELECT order_status, COUNT(*) FROM orders GROUP BY order_status;")
@@ -207,6 +206,7 @@ def get_order_status_distribution(engine):
         logging.error(f"Error fetching order status distribution: {e}")
         return []
 
+@cached_query
 def get_payment_method_distribution(engine):
     """Queries for the distribution of payment methods using SQLAlchemy engine."""
     query = text("SELECT payment_type, COUNT(*) FROM order_payments GROUP BY payment_type;")
@@ -218,6 +218,7 @@ def get_payment_method_distribution(engine):
         logging.error(f"Error fetching payment method distribution: {e}")
         return []
 
+@cached_query
 def get_revenue_trend(engine):
     """Queries for the total revenue trend aggregated by month using SQLAlchemy engine."""
     query = text("""
@@ -238,6 +239,7 @@ def get_revenue_trend(engine):
         logging.error(f"Error fetching revenue trend: {e}")
         return []
 
+@cached_query
 def get_platform_kpis(engine):
     """Queries for key platform-wide performance indicators using SQLAlchemy engine."""
     queries = {
@@ -259,34 +261,127 @@ def get_platform_kpis(engine):
         return {}
 
 
+# --- Summary Maintenance ---
+
+def refresh_seller_metrics(engine, concurrently=True):
+    """
+    Rebuilds the seller_metrics materialized view. CONCURRENTLY keeps it readable
+    during the refresh but needs an already populated view.
+    """
+    mode = "CONCURRENTLY " if concurrently else ""
+    with engine.begin() as connection:
+        connection.execute(text(f"REFRESH MATERIALIZED VIEW {mode}seller_metrics;"))
+    logging.info("seller_metrics refreshed.")
+
+
 # --- Functions for Predictive Analysis ---
 
-def get_data_for_predictions(engine):
-    """Fetches all necessary data for predictive modeling using SQLAlchemy engine."""
-    table_names = {
-        "orders": "orders",
-        "payments": "order_payments",
-        "customers": "customers",
-        "items": "order_items",
-        "products": "products",
-        "translations": "product_category_name_translation"
+# Only the columns the churn and forecasting models read, per table
+PREDICTION_COLUMNS = {
+    "orders": ("orders", ["order_id", "customer_id", "order_purchase_timestamp"]),
+    "payments": ("order_payments", ["order_id", "payment_value"]),
+    "customers": ("customers", ["customer_id", "customer_unique_id"]),
+    "items": ("order_items", ["order_id", "product_id", "seller_id", "price"]),
+    "products": ("products", ["product_id", "product_category_name"]),
+    "translations": ("product_category_name_translation", ["product_category_name", "product_category_name_english"]),
+}
+PREDICTION_TIMESTAMP_COLUMNS = {"order_purchase_timestamp"}
+PREDICTION_FLOAT_COLUMNS = {"payment_value", "price"}
+
+def _peak_rss_mb():
+    """Peak resident set size of this process in MB (None where `resource` is unavailable)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def copy_to_frame(dbapi_connection, table_name, columns):
+    """
+    Streams `SELECT columns FROM table_name` through COPY TO STDOUT into a typed
+    DataFrame: text columns become categoricals, timestamps and amounts are parsed
+    while reading, so no per-row Python objects are created.
+    """
+    sql = f'COPY (SELECT {", ".join(columns)} FROM "{table_name}") TO STDOUT WITH (FORMAT csv, HEADER true)'
+    dtypes = {
+        column: 'float64' if column in PREDICTION_FLOAT_COLUMNS else 'category'
+        for column in columns if column not in PREDICTION_TIMESTAMP_COLUMNS
     }
-    
+    parse_dates = [column for column in columns if column in PREDICTION_TIMESTAMP_COLUMNS]
+
+    # COPY writes into one end of a pipe while read_csv parses from the other
+    with copy_out_stream(dbapi_connection, sql, name=f"copy-{table_name}") as source:
+        return pd.read_csv(source, dtype=dtypes, parse_dates=parse_dates)
+
+def _join_positions(keys: pd.Series, reference: pd.Series) -> np.ndarray:
+    """
+    Row of `reference` (a unique categorical key column) matching each key, or -1.
+    Keys are recoded onto the reference categories, so the lookup runs on integer codes.
+    """
+    codes = keys.cat.set_categories(reference.cat.categories).cat.codes.to_numpy()
+    row_of_code = np.full(len(reference.cat.categories), -1, dtype=np.int64)
+    row_of_code[reference.cat.codes.to_numpy()] = np.arange(len(reference))
+    return np.where(codes >= 0, row_of_code[codes], -1)
+
+def build_processed_data(dataframes) -> pd.DataFrame:
+    """
+    Inner join of items, orders, products, customers and category translations
+    (the frame the forecasting and diversity features read), built from
+    integer-coded key lookups instead of chained merges.
+    """
+    items, orders, products = dataframes['items'], dataframes['orders'], dataframes['products']
+    customers, translations = dataframes['customers'], dataframes['translations']
+
+    order_pos = _join_positions(items['order_id'], orders['order_id'])
+    product_pos = _join_positions(items['product_id'], products['product_id'])
+    keep = (order_pos >= 0) & (product_pos >= 0)
+    item_rows, order_pos, product_pos = np.flatnonzero(keep), order_pos[keep], product_pos[keep]
+
+    customer_pos = _join_positions(orders['customer_id'].take(order_pos), customers['customer_id'])
+    category_pos = _join_positions(products['product_category_name'].take(product_pos), translations['product_category_name'])
+    keep = (customer_pos >= 0) & (category_pos >= 0)
+    item_rows, order_pos, product_pos = item_rows[keep], order_pos[keep], product_pos[keep]
+    customer_pos, category_pos = customer_pos[keep], category_pos[keep]
+
+    return pd.DataFrame({
+        'order_id': items['order_id'].array.take(item_rows),
+        'customer_id': orders['customer_id'].array.take(order_pos),
+        'order_purchase_timestamp': orders['order_purchase_timestamp'].array.take(order_pos),
+        'product_id': items['product_id'].array.take(item_rows),
+        'seller_id': items['seller_id'].array.take(item_rows),
+        'price': items['price'].array.take(item_rows),
+        'product_category_name': products['product_category_name'].array.take(product_pos),
+        'customer_unique_id': customers['customer_unique_id'].array.take(customer_pos),
+        'product_category_name_english': translations['product_category_name_english'].array.take(category_pos),
+    })
+
+def get_data_for_predictions(engine):
+    """
+    Fetches the data for predictive modeling. Only the model columns are read,
+    streamed through COPY into typed frames; processed_data is joined on integer codes.
+    Text columns are categoricals, so group them with observed=True.
+    """
+    start = time.perf_counter()
     dataframes = {}
     try:
-        for df_key, table_name in table_names.items():
-            logging.info(f"Fetching table: {table_name}...")
-            query = f'SELECT * FROM "{table_name}";'
-            dataframes[df_key] = pd.read_sql_query(query, engine)
-        
+        dbapi_connection = engine.raw_connection()
+        try:
+            for df_key, (table_name, columns) in PREDICTION_COLUMNS.items():
+                logging.info(f"Fetching table: {table_name} ({', '.join(columns)})...")
+                dataframes[df_key] = copy_to_frame(dbapi_connection, table_name, columns)
+        finally:
+            dbapi_connection.close()
+
         logging.info("Joining tables to create processed_data...")
-        df = pd.merge(dataframes['orders'], dataframes['items'], on='order_id')
-        df = pd.merge(df, dataframes['products'], on='product_id')
-        df = pd.merge(df, dataframes['customers'], on='customer_id')
-        df = pd.merge(df, dataframes['translations'], on='product_category_name')
-        dataframes['processed_data'] = df
+        dataframes['processed_data'] = build_processed_data(dataframes)
         logging.info("Successfully created 'processed_data' DataFrame.")
 
+        memory_mb = sum(df.memory_usage(deep=True).sum() for df in dataframes.values()) / 2**20
+        peak_rss = _peak_rss_mb()
+        logging.info(
+            f"Prediction data extracted in {time.perf_counter() - start:.1f}s: "
+            f"{memory_mb:.1f} MB in frames, peak RSS {f'{peak_rss:.0f} MB' if peak_rss else 'n/a'}."
+        )
         return dataframes
 
     except Exception as e:
@@ -295,6 +390,7 @@ def get_data_for_predictions(engine):
 
 # --- Functions for New Sentiment Dashboard ---
 
+@cached_query
 def get_average_review_score(engine):
     """Calculates the average review score across all reviews."""
     query = text("SELECT AVG(review_score) FROM order_reviews;")
@@ -306,6 +402,7 @@ def get_average_review_score(engine):
         logging.error(f"Error in get_average_review_score: {e}")
         return None
 
+@cached_query
 def get_overall_sentiment_distribution(engine):
     """Queries for the overall distribution of sentiment labels."""
     query = text("""
@@ -327,17 +424,23 @@ def get_overall_sentiment_distribution(engine):
         logging.error(f"Error in get_overall_sentiment_distribution: {e}")
         return []
 
+@cached_query
 def get_top_negative_categories(engine, limit=5):
-    """Queries for the top product categories with the most negative reviews."""
+    """
+    Queries for the top product categories with the most negative reviews.
+    Uses the stored model sentiment where available and the star score otherwise.
+    """
     query = text("""
         SELECT
             COALESCE(t.product_category_name_english, p.product_category_name) as category,
-            SUM(CASE WHEN r.review_score <= 2 THEN 1 ELSE 0 END) as negative_count
+            COUNT(*) as negative_count
         FROM order_items oi
         JOIN order_reviews r ON oi.order_id = r.order_id
+        LEFT JOIN review_sentiment rs ON r.review_id = rs.review_id AND r.order_id = rs.order_id AND rs.sentiment_label <> 'error'
         JOIN products p ON oi.product_id = p.product_id
         LEFT JOIN product_category_name_translation t ON p.product_category_name = t.product_category_name
-        WHERE p.product_category_name IS NOT NULL AND r.review_score <= 2
+        WHERE p.product_category_name IS NOT NULL
+          AND COALESCE(rs.sentiment_label, CASE WHEN r.review_score <= 2 THEN 'negative' END) = 'negative'
         GROUP BY category
         ORDER BY negative_count DESC
         LIMIT :limit;
@@ -350,16 +453,31 @@ def get_top_negative_categories(engine, limit=5):
         logging.error(f"Error in get_top_negative_categories: {e}")
         return []
 
+@cached_query
 def get_sentiment_trend_data(engine):
-    """Queries for sentiment counts aggregated by month using SQLAlchemy engine."""
+    """
+    Queries for sentiment counts aggregated by month using SQLAlchemy engine.
+    Uses the stored model sentiment where available and the star score otherwise.
+    """
     query = text("""
+        WITH labeled AS (
+            SELECT
+                r.review_creation_date,
+                COALESCE(rs.sentiment_label, CASE
+                    WHEN r.review_score >= 4 THEN 'positive'
+                    WHEN r.review_score = 3 THEN 'neutral'
+                    ELSE 'negative'
+                END) as sentiment_label
+            FROM order_reviews r
+            LEFT JOIN review_sentiment rs ON r.review_id = rs.review_id AND r.order_id = rs.order_id AND rs.sentiment_label <> 'error'
+            WHERE r.review_comment_message IS NOT NULL AND TRIM(r.review_comment_message) <> ''
+        )
         SELECT 
             TO_CHAR(review_creation_date, 'YYYY-MM') as month,
-            SUM(CASE WHEN review_score >= 4 THEN 1 ELSE 0 END) as positive,
-            SUM(CASE WHEN review_score = 3 THEN 1 ELSE 0 END) as neutral,
-            SUM(CASE WHEN review_score <= 2 THEN 1 ELSE 0 END) as negative
-        FROM order_reviews
-        WHERE review_comment_message IS NOT NULL AND TRIM(review_comment_message) <> ''
+            SUM(CASE WHEN sentiment_label = 'positive' THEN 1 ELSE 0 END) as positive,
+            SUM(CASE WHEN sentiment_label = 'neutral' THEN 1 ELSE 0 END) as neutral,
+            SUM(CASE WHEN sentiment_label = 'negative' THEN 1 ELSE 0 END) as negative
+        FROM labeled
         GROUP BY month
         ORDER BY month;
     """)
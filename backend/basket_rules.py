@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+Olist Seller Success - Market Basket Rules
+
+Mines association rules from multi-item orders with FP-growth and persists them
+per item level (product category or individual product):
+
+    <BASKET_RULES_DIR>/<level>/<version>/rules.parquet
+    <BASKET_RULES_DIR>/<level>/<version>/manifest.json
+    <BASKET_RULES_DIR>/<level>/LATEST
+
+Orders are encoded as a sparse order x item matrix and items below the minimum
+support are dropped before mining, so product-level mining (tens of thousands of
+items) never materializes a dense one-hot frame. The API serves the latest rules
+from memory with antecedent / consequent filters.
+
+Usage:
+    uv run python -m backend.basket_rules [--level category|product] [--min-support 0.001]
+"""
+
+import os
+import json
+import shutil
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+# --- Paths ---
+BASE_DIR = Path(__file__).resolve().parent
+BASKET_RULES_DIR = Path(os.getenv("BASKET_RULES_DIR", BASE_DIR.parent / "artifacts" / "basket_rules"))
+LATEST_POINTER = "LATEST"
+MANIFEST_FILE = "manifest.json"
+
+# --- Parameters ---
+BASKET_LEVELS = ["category", "product"]
+BASKET_MIN_SUPPORT = float(os.getenv("BASKET_MIN_SUPPORT", 0.001))
+BASKET_MIN_CONFIDENCE = float(os.getenv("BASKET_MIN_CONFIDENCE", 0.05))
+BASKET_MIN_LIFT = float(os.getenv("BASKET_MIN_LIFT", 1.0))
+BASKET_MAX_ITEMSET_SIZE = int(os.getenv("BASKET_MAX_ITEMSET_SIZE", 3))
+RULE_VERSIONS_TO_KEEP = 3
+RULE_COLUMNS = ["antecedents", "consequents", "support", "confidence", "lift", "leverage", "order_count"]
+
+# Distinct (order, item) pairs of the orders with more than one distinct item
+BASKET_ITEMS_QUERY = """
+    WITH order_item_keys AS (
+        SELECT DISTINCT oi.order_id, {item} AS item
+        FROM order_items oi
+        JOIN products p ON p.product_id = oi.product_id
+        LEFT JOIN product_category_name_translation t ON t.product_category_name = p.product_category_name
+        WHERE {item} IS NOT NULL
+    )
+    SELECT order_id, item FROM order_item_keys
+    WHERE order_id IN (SELECT order_id FROM order_item_keys GROUP BY order_id HAVING COUNT(*) > 1);
+"""
+ITEM_EXPRESSIONS = {
+    "category": "COALESCE(t.product_category_name_english, p.product_category_name)",
+    "product": "oi.product_id",
+}
+
+
+# --- Mining ---
+
+def fetch_basket_items(engine, level: str) -> pd.DataFrame:
+    """(order_id, item) pairs of the multi-item orders at the given item level."""
+    query = text(BASKET_ITEMS_QUERY.format(item=ITEM_EXPRESSIONS[level]))
+    return pd.read_sql_query(query, engine)
+
+def build_transaction_matrix(pairs: pd.DataFrame):
+    """Encodes (order_id, item) pairs as a sparse boolean order x item matrix. Returns (matrix, items)."""
+    from scipy import sparse
+
+    order_codes, _ = pd.factorize(pairs['order_id'])
+    item_codes, items = pd.factorize(pairs['item'])
+    matrix = sparse.csr_matrix(
+        (np.ones(len(pairs), dtype=bool), (order_codes, item_codes)),
+        shape=(order_codes.max() + 1 if len(pairs) else 0, len(items)),
+    )
+    return matrix, pd.Index(items)
+
+def mine_rules(matrix, items: pd.Index, min_support: float = BASKET_MIN_SUPPORT,
+               min_confidence: float = BASKET_MIN_CONFIDENCE, min_lift: float = BASKET_MIN_LIFT,
+               max_len: int = BASKET_MAX_ITEMSET_SIZE) -> pd.DataFrame:
+    """Runs FP-growth on the transaction matrix and derives rules sorted by lift."""
+    from mlxtend.frequent_patterns import fpgrowth, association_rules
+
+    n_orders = matrix.shape[0]
+    if n_orders == 0:
+        return pd.DataFrame(columns=RULE_COLUMNS)
+    # An itemset is never more frequent than its rarest item, so infrequent items can go up front
+    item_support = np.asarray(matrix.sum(axis=0)).ravel() / n_orders
+    frequent = np.flatnonzero(item_support >= min_support)
+    onehot = pd.DataFrame.sparse.from_spmatrix(matrix[:, frequent].astype(np.uint8), columns=items[frequent])
+    onehot = onehot.astype(pd.SparseDtype(bool, False))
+
+    itemsets = fpgrowth(onehot, min_support=min_support, use_colnames=True, max_len=max_len)
+    if itemsets.empty or itemsets['itemsets'].map(len).max() < 2:
+        return pd.DataFrame(columns=RULE_COLUMNS)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rules = association_rules(itemsets, num_itemsets=n_orders, metric='confidence', min_threshold=min_confidence)
+    rules = rules[rules['lift'] >= min_lift].sort_values(['lift', 'support'], ascending=False)
+
+    return pd.DataFrame({
+        "antecedents": rules['antecedents'].map(sorted),
+        "consequents": rules['consequents'].map(sorted),
+        "support": rules['support'],
+        "confidence": rules['confidence'],
+        "lift": rules['lift'],
+        "leverage": rules['leverage'],
+        "order_count": (rules['support'] * n_orders).round().astype(int),
+    }).reset_index(drop=True)
+
+
+# --- Persistence ---
+
+def write_rules(rules: pd.DataFrame, metadata: dict, level: str, rules_dir: Path = BASKET_RULES_DIR) -> dict:
+    """Writes the rules of one level as a new version and atomically points LATEST at it."""
+    level_dir = rules_dir / level
+    created_at = datetime.now(timezone.utc)
+    version = created_at.strftime("%Y%m%dT%H%M%S%fZ")
+    tmp_dir = level_dir / f".{version}.tmp"
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+
+    rules.to_parquet(tmp_dir / "rules.parquet", index=False)
+    manifest = {"version": version, "created_at": created_at.isoformat(), "level": level, "rules": len(rules), **metadata}
+    (tmp_dir / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp_dir, level_dir / version)
+    pointer_tmp = level_dir / f".{LATEST_POINTER}.tmp"
+    pointer_tmp.write_text(version)
+    os.replace(pointer_tmp, level_dir / LATEST_POINTER)
+
+    versions = sorted(p.name for p in level_dir.iterdir() if p.is_dir() and not p.name.startswith('.'))
+    for old in versions[:-RULE_VERSIONS_TO_KEEP]:
+        shutil.rmtree(level_dir / old, ignore_errors=True)
+    logging.info(f"Wrote {len(rules)} {level} basket rules as {version}.")
+    return manifest
+
+def latest_rules_version(level: str, rules_dir: Path = BASKET_RULES_DIR):
+    try:
+        return (rules_dir / level / LATEST_POINTER).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+def refresh_rules(engine, level: str = "category", min_support: float = BASKET_MIN_SUPPORT,
+                  rules_dir: Path = BASKET_RULES_DIR) -> dict:
+    """Mines and persists the rules of one level from the database. Returns the new manifest."""
+    start = time.perf_counter()
+    pairs = fetch_basket_items(engine, level)
+    matrix, items = build_transaction_matrix(pairs)
+    rules = mine_rules(matrix, items, min_support=min_support)
+    metadata = {
+        "orders": matrix.shape[0],
+        "items": len(items),
+        "min_support": min_support,
+        "min_confidence": BASKET_MIN_CONFIDENCE,
+        "min_lift": BASKET_MIN_LIFT,
+        "max_itemset_size": BASKET_MAX_ITEMSET_SIZE,
+    }
+    manifest = write_rules(rules, metadata, level, rules_dir)
+    logging.info(f"Mined {level} basket rules from {matrix.shape[0]} orders x {len(items)} items in {time.perf_counter() - start:.1f}s")
+    return manifest
+
+
+# --- Serving ---
+
+class RulesStore:
+    """Latest rules of each level, loaded from disk and reloaded when LATEST moves."""
+
+    def __init__(self, rules_dir: Path = BASKET_RULES_DIR):
+        self.rules_dir = rules_dir
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def version(self, level: str):
+        return latest_rules_version(level, self.rules_dir)
+
+    def get(self, level: str):
+        """Returns (rules, manifest) of the latest version of `level`, or (None, None) if none was mined."""
+        version = self.version(level)
+        if version is None:
+            return None, None
+        with self._lock:
+            loaded = self._loaded.get(level)
+            if loaded and loaded[1]["version"] == version:
+                return loaded
+        path = self.rules_dir / level / version
+        try:
+            manifest = json.loads((path / MANIFEST_FILE).read_text())
+            rules = pd.read_parquet(path / "rules.parquet")
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            logging.error(f"Could not load {level} basket rules {version}: {e}")
+            return None, None
+        rules['antecedents'] = rules['antecedents'].map(frozenset)
+        rules['consequents'] = rules['consequents'].map(frozenset)
+        with self._lock:
+            self._loaded[level] = (rules, manifest)
+        return rules, manifest
+
+def filter_rules(rules: pd.DataFrame, antecedent: list | None = None, consequent: list | None = None,
+                 min_confidence: float = 0.0, min_lift: float = 0.0, limit: int = 50) -> pd.DataFrame:
+    """Rules whose antecedents / consequents contain all the given items, strongest (by lift) first."""
+    mask = (rules['confidence'] >= min_confidence) & (rules['lift'] >= min_lift)
+    if antecedent:
+        wanted = frozenset(antecedent)
+        mask &= rules['antecedents'].map(wanted.issubset)
+    if consequent:
+        wanted = frozenset(consequent)
+        mask &= rules['consequents'].map(wanted.issubset)
+    return rules[mask].head(limit)
+
+def to_records(rules: pd.DataFrame) -> list:
+    return [
+        {**record, "antecedents": sorted(record["antecedents"]), "consequents": sorted(record["consequents"])}
+        for record in rules.to_dict('records')
+    ]
+
+
+def main():
+    """Mines the basket rules of the configured database."""
+    import argparse
+    from .db import create_db_engine
+
+    parser = argparse.ArgumentParser(description="Mine and persist market basket rules.")
+    parser.add_argument('--level', choices=BASKET_LEVELS + ["all"], default="all", help="Item level to mine (default: all).")
+    parser.add_argument('--min-support', type=float, default=BASKET_MIN_SUPPORT, help="Minimum itemset support (share of multi-item orders).")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    engine = create_db_engine()
+    if engine is None:
+        raise SystemExit(1)
+    for level in BASKET_LEVELS if args.level == "all" else [args.level]:
+        print(json.dumps(refresh_rules(engine, level, args.min_support), indent=2))
+
+if __name__ == "__main__":
+    main()
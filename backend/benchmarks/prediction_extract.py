@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: prediction data extraction, legacy SELECT * + pd.merge vs. COPY-based typed extraction.
+
+Each path runs in a fresh Python process against the configured database so
+peak RSS is measured in isolation. Reports wall time, peak RSS and the
+in-memory size of the resulting frames.
+
+Usage:
+    uv run python -m backend.benchmarks.prediction_extract [--path legacy|copy]
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+import pandas as pd
+
+LEGACY_TABLES = {
+    "orders": "orders",
+    "payments": "order_payments",
+    "customers": "customers",
+    "items": "order_items",
+    "products": "products",
+    "translations": "product_category_name_translation"
+}
+
+
+def extract_legacy(engine) -> dict:
+    """The extraction previously in get_data_for_predictions."""
+    dataframes = {key: pd.read_sql_query(f'SELECT * FROM "{table}";', engine) for key, table in LEGACY_TABLES.items()}
+    df = pd.merge(dataframes['orders'], dataframes['items'], on='order_id')
+    df = pd.merge(df, dataframes['products'], on='product_id')
+    df = pd.merge(df, dataframes['customers'], on='customer_id')
+    df = pd.merge(df, dataframes['translations'], on='product_category_name')
+    dataframes['processed_data'] = df
+    return dataframes
+
+def run_path(path: str) -> dict:
+    from backend.db import create_db_engine
+    from backend.api_queries import get_data_for_predictions
+
+    engine = create_db_engine()
+    start = time.perf_counter()
+    dataframes = extract_legacy(engine) if path == 'legacy' else get_data_for_predictions(engine)
+    wall_s = time.perf_counter() - start
+    return {
+        "path": path,
+        "wall_s": wall_s,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "frames_mb": sum(df.memory_usage(deep=True).sum() for df in dataframes.values()) / 2**20,
+        "processed_rows": len(dataframes['processed_data']),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--path', choices=['legacy', 'copy'], help="Run a single path in this process and print JSON.")
+    args = parser.parse_args()
+
+    if args.path:
+        print(json.dumps(run_path(args.path)))
+        return
+
+    print(f"{'path':>7} {'wall_s':>7} {'peak_rss_mb':>12} {'frames_mb':>10} {'processed_rows':>15}")
+    for path in ['legacy', 'copy']:
+        output = subprocess.run([sys.executable, '-m', 'backend.benchmarks.prediction_extract', '--path', path],
+                                check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{path:>7} {result['wall_s']:>7.2f} {result['peak_rss_mb']:>12.0f} {result['frames_mb']:>10.1f} {result['processed_rows']:>15}")
+
+if __name__ == "__main__":
+    main()
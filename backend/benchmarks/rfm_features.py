@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: churn feature building, legacy lambda groupby vs. vectorized builder.
+
+Generates synthetic data with the shape of the Olist dataset at 1x-20x volume and
+times both implementations. At 1x the outputs are also checked for equality.
+
+Usage:
+    uv run python -m backend.benchmarks.rfm_features [--scales 1 2 5 10 20]
+"""
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+
+from backend.churn_features import build_rfm_features, FEATURE_COLUMNS
+
+# Row counts of the public Olist dataset
+OLIST_ORDERS = 99_441
+OLIST_UNIQUE_CUSTOMERS = 96_096
+OLIST_EXTRA_PAYMENTS = 4_445
+OLIST_ORDER_ITEMS = 112_650
+OLIST_CATEGORIES = 71
+
+
+def make_dataset(scale: int, seed: int = 42) -> dict:
+    """Builds orders, payments, customers and processed_df frames at `scale` x Olist volume."""
+    rng = np.random.default_rng(seed)
+    n_orders = OLIST_ORDERS * scale
+    n_unique = OLIST_UNIQUE_CUSTOMERS * scale
+
+    order_ids = np.array([f"o{i:031x}" for i in range(n_orders)], dtype=object)
+    customer_ids = np.array([f"c{i:031x}" for i in range(n_orders)], dtype=object)
+    unique_ids = np.array([f"u{i:031x}" for i in range(n_unique)], dtype=object)
+    start = np.datetime64('2016-09-01')
+    timestamps = start + rng.integers(0, 760 * 24 * 3600, n_orders).astype('timedelta64[s]')
+
+    # Every unique customer orders at least once; the remaining orders go to repeat buyers
+    owners = rng.permutation(np.concatenate([np.arange(n_unique), rng.integers(0, n_unique, n_orders - n_unique)]))
+    customers = pd.DataFrame({'customer_id': customer_ids, 'customer_unique_id': unique_ids[owners]})
+    orders = pd.DataFrame({'order_id': order_ids, 'customer_id': customer_ids, 'order_purchase_timestamp': timestamps})
+
+    payment_orders = np.concatenate([np.arange(n_orders), rng.integers(0, n_orders, OLIST_EXTRA_PAYMENTS * scale)])
+    payments = pd.DataFrame({'order_id': order_ids[payment_orders], 'payment_value': rng.gamma(2.0, 80.0, len(payment_orders))})
+
+    item_orders = np.concatenate([np.arange(n_orders), rng.integers(0, n_orders, (OLIST_ORDER_ITEMS - OLIST_ORDERS) * scale)])
+    categories = np.array([f"category_{i}" for i in range(OLIST_CATEGORIES)], dtype=object)
+    processed = pd.DataFrame({
+        'order_id': order_ids[item_orders],
+        'customer_unique_id': customers['customer_unique_id'].to_numpy()[item_orders],
+        'product_category_name_english': categories[rng.integers(0, OLIST_CATEGORIES, len(item_orders))],
+    })
+    return {'orders': orders, 'payments': payments, 'customers': customers, 'processed': processed}
+
+def build_rfm_features_legacy(orders_df, payments_df, customers_df, processed_df) -> pd.DataFrame:
+    """The feature code previously inlined in run_churn_prediction_v2."""
+    df_rfm = pd.merge(orders_df, payments_df, on='order_id')
+    df_rfm = pd.merge(df_rfm, customers_df, on='customer_id')
+    df_rfm['order_purchase_timestamp'] = pd.to_datetime(df_rfm['order_purchase_timestamp'])
+    snapshot_date = df_rfm['order_purchase_timestamp'].max() + pd.Timedelta(days=1)
+    rfm = df_rfm.groupby('customer_unique_id').agg({
+        'order_purchase_timestamp': lambda date: (snapshot_date - date.max()).days,
+        'order_id': 'nunique',
+        'payment_value': 'sum'
+    })
+    rfm.rename(columns={'order_purchase_timestamp': 'Recency', 'order_id': 'Frequency', 'payment_value': 'Monetary'}, inplace=True)
+    diversity = processed_df.groupby('customer_unique_id')['product_category_name_english'].nunique().reset_index()
+    diversity.rename(columns={'product_category_name_english': 'Purchase_Diversity'}, inplace=True)
+    return pd.merge(rfm, diversity, on='customer_unique_id', how='left').fillna(0)
+
+def _time(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def check_equal(legacy: pd.DataFrame, vectorized: pd.DataFrame):
+    """Raises AssertionError if the two feature frames differ."""
+    legacy = legacy.sort_values('customer_unique_id').reset_index(drop=True)
+    vectorized = vectorized.sort_values('customer_unique_id').reset_index(drop=True)
+    assert legacy['customer_unique_id'].tolist() == vectorized['customer_unique_id'].tolist()
+    for column in FEATURE_COLUMNS:
+        np.testing.assert_allclose(legacy[column].to_numpy(dtype=float), vectorized[column].to_numpy(dtype=float), rtol=1e-9)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 2, 5, 10, 20])
+    parser.add_argument('--skip-legacy-above', type=int, default=20, help="Only time the legacy path up to this scale.")
+    args = parser.parse_args()
+
+    print(f"{'scale':>5} {'customers':>10} {'legacy_s':>9} {'vectorized_s':>12} {'speedup':>8}")
+    for scale in args.scales:
+        data = make_dataset(scale)
+        inputs = (data['orders'], data['payments'], data['customers'], data['processed'])
+        vectorized, vectorized_s = _time(build_rfm_features, *inputs)
+        legacy_s = None
+        if scale <= args.skip_legacy_above:
+            legacy, legacy_s = _time(build_rfm_features_legacy, *inputs)
+            if scale == 1:
+                check_equal(legacy, vectorized)
+        speedup = f"{legacy_s / vectorized_s:.1f}x" if legacy_s else "-"
+        legacy_col = f"{legacy_s:.2f}" if legacy_s else "-"
+        print(f"{scale:>5} {len(vectorized):>10} {legacy_col:>9} {vectorized_s:>12.2f} {speedup:>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: BERT sentiment inference on CPU, fp32 vs. int8 dynamic quantization and shorter max lengths.
+
+Every configuration scores the same fixed sample of commented order_reviews in
+a fresh Python process (the torch thread count is process-wide). Reports
+reviews/sec, the speedup over fp32 at 512 tokens, and how often the star
+score and the sentiment label agree with that baseline, then recommends the
+fastest configuration that keeps label agreement (SENTIMENT_QUANTIZE /
+SENTIMENT_MAX_LENGTH to set on the scoring nodes).
+
+Usage:
+    uv run python -m backend.benchmarks.sentiment_inference [--sample 1000] [--max-lengths 128 256] [--threads 4]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+from sqlalchemy import text
+
+SAMPLE_QUERY = text("""
+    SELECT review_comment_message FROM order_reviews
+    WHERE review_comment_message IS NOT NULL AND TRIM(review_comment_message) <> ''
+    ORDER BY md5(review_id || order_id) LIMIT :sample;
+""")
+BASELINE = ("fp32", 512)
+WARMUP_REVIEWS = 32
+TARGET_SPEEDUP = 3.0
+
+
+def load_sample(sample: int) -> list:
+    """A fixed pseudo-random sample of comments (the same on every run against the same data)."""
+    from backend.db import create_db_engine
+
+    engine = create_db_engine()
+    with engine.connect() as connection:
+        return [row[0] for row in connection.execute(SAMPLE_QUERY, {'sample': sample})]
+
+def run_config(precision: str, max_length: int, threads: int, sample: int) -> dict:
+    import torch
+    from backend.sentiment_engine import SentimentEngine
+
+    comments = load_sample(sample)
+    # The memo would answer repeated texts without running the model
+    engine = SentimentEngine(max_length=max_length, quantize=precision == "int8", num_threads=threads, memo=False)
+    engine.load()
+    engine.predict(comments[:WARMUP_REVIEWS])
+    start = time.perf_counter()
+    results = engine.predict(comments)
+    elapsed = time.perf_counter() - start
+    return {
+        "precision": precision,
+        "max_length": max_length,
+        "threads": torch.get_num_threads(),
+        "reviews": len(comments),
+        "seconds": elapsed,
+        "reviews_per_second": len(comments) / elapsed,
+        "scores": [score for score, _ in results],
+        "labels": [label for _, label in results],
+    }
+
+def agreement(a: list, b: list) -> float:
+    return sum(x == y for x, y in zip(a, b)) / len(a) if a else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sample', type=int, default=1000, help="Number of reviews to score.")
+    parser.add_argument('--max-lengths', type=int, nargs='+', default=[128, 256], help="Truncation lengths to try with int8.")
+    parser.add_argument('--threads', type=int, default=0, help="torch intra-op threads (0 = torch default).")
+    parser.add_argument('--min-label-agreement', type=float, default=0.99, help="Lowest label agreement with fp32 a recommended configuration may have.")
+    parser.add_argument('--config', nargs=2, metavar=('PRECISION', 'MAX_LENGTH'), help="Run a single configuration in this process and print JSON.")
+    args = parser.parse_args()
+
+    if args.config:
+        print(json.dumps(run_config(args.config[0], int(args.config[1]), args.threads, args.sample)))
+        return
+
+    configs = [BASELINE, ("int8", 512)] + [("int8", max_length) for max_length in args.max_lengths if max_length != 512]
+    results = []
+    for precision, max_length in configs:
+        command = [sys.executable, '-m', 'backend.benchmarks.sentiment_inference', '--config', precision, str(max_length),
+                   '--threads', str(args.threads), '--sample', str(args.sample)]
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    baseline = results[0]
+    print(f"{'precision':>9} {'max_len':>7} {'threads':>7} {'reviews/s':>10} {'speedup':>8} {'star_agree':>11} {'label_agree':>12}")
+    for result in results:
+        speedup = result['reviews_per_second'] / baseline['reviews_per_second']
+        print(f"{result['precision']:>9} {result['max_length']:>7} {result['threads']:>7} {result['reviews_per_second']:>10.1f} "
+              f"{speedup:>7.2f}x {agreement(result['scores'], baseline['scores']):>11.2%} "
+              f"{agreement(result['labels'], baseline['labels']):>12.2%}")
+
+    accepted = [result for result in results if agreement(result['labels'], baseline['labels']) >= args.min_label_agreement]
+    best = max(accepted, key=lambda result: result['reviews_per_second'])
+    speedup = best['reviews_per_second'] / baseline['reviews_per_second']
+    print(f"\nFastest configuration with label agreement >= {args.min_label_agreement:.0%}: "
+          f"SENTIMENT_QUANTIZE={int(best['precision'] == 'int8')} SENTIMENT_MAX_LENGTH={best['max_length']} "
+          f"({speedup:.2f}x, target {TARGET_SPEEDUP:.0f}x {'met' if speedup >= TARGET_SPEEDUP else 'NOT met'})")
+
+if __name__ == "__main__":
+    main()
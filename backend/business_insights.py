@@ -16,23 +16,23 @@ Refactoring improvements:
 """
 
 # --- 1. Setup and Configuration ---
+import sys
 import logging
 from pathlib import Path
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from mlxtend.frequent_patterns import apriori, association_rules
-from mlxtend.preprocessing import TransactionEncoder
 
 # NLP & ML Imports
-import re
-from nltk.corpus import stopwords
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report
-import lightgbm as lgb
 from transformers import pipeline
+from dataset_cache import load_dataset
+from basket_rules import build_transaction_matrix, mine_rules
+
+# The sentiment classifier trained here is registered for the API, which imports it from the backend package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from backend.fast_sentiment import fit_fast_sentiment, FastSentimentScorer, FAST_SENTIMENT_MODEL_NAME
+from backend.model_registry import save_model
 
 # --- Paths ---
 BASE_DIR = Path(__file__).resolve().parent
@@ -46,9 +46,10 @@ ORDER_REVIEWS_PATH = DATA_DIR / "olist_order_reviews_dataset.csv"
 
 # --- Parameters ---
 GEO_ANALYSIS_KEY_STATES = ['SP', 'RJ', 'MG']
-APRIORI_MIN_SUPPORT = 0.01
+BASKET_MIN_SUPPORT = 0.01
 ASSOC_RULES_MIN_LIFT = 1.0
 TRANSFORMER_SAMPLE_SIZE = 500 # Use a sample for the computationally expensive transformer model
+PAYMENT_COLUMNS = ['boleto', 'credit_card', 'debit_card', 'voucher']
 
 # --- Logging Setup ---
 def setup_logging():
@@ -62,10 +63,10 @@ def setup_logging():
         ]
     )
 
-def load_data(file_path: Path) -> pd.DataFrame | None:
-    """Loads a CSV file from the given path with error handling."""
+def load_data(file_path: Path, columns: list | None = None) -> pd.DataFrame | None:
+    """Loads `columns` of a CSV file through the Parquet cache (see dataset_cache.py) with error handling."""
     try:
-        df = pd.read_csv(file_path)
+        df = load_dataset(file_path, columns)
         logging.info(f"Successfully loaded data from {file_path}")
         return df
     except FileNotFoundError:
@@ -79,8 +80,7 @@ def perform_geo_analysis(df: pd.DataFrame):
     Analyzes customer distribution and AOV by state, saving a visualization.
     """
     logging.info("--- Starting Geographic Analysis ---")
-    payment_cols = ['boleto', 'credit_card', 'debit_card', 'voucher']
-    existing_payment_cols = [col for col in payment_cols if col in df.columns]
+    existing_payment_cols = [col for col in PAYMENT_COLUMNS if col in df.columns]
     df['total_payment'] = df[existing_payment_cols].sum(axis=1)
     geo_analysis = df.groupby('customer_state').agg(
         customer_count=('customer_unique_id', 'nunique'),
@@ -123,13 +123,11 @@ def perform_purchase_behavior_analysis(main_df: pd.DataFrame, orders_df: pd.Data
     multi_item_orders = multi_item_orders[multi_item_orders > 1].index
     basket_df = basket_df[basket_df['order_id'].isin(multi_item_orders)]
     if not basket_df.empty:
-        transactions = basket_df.groupby('order_id')['product_category_name_english'].apply(list).values.tolist()
-        te = TransactionEncoder()
-        te_ary = te.fit(transactions).transform(transactions)
-        basket_onehot = pd.DataFrame(te_ary, columns=te.columns_)
-        frequent_itemsets = apriori(basket_onehot, min_support=APRIORI_MIN_SUPPORT, use_colnames=True)
-        rules = association_rules(frequent_itemsets, metric='lift', min_threshold=ASSOC_RULES_MIN_LIFT)
-        top_10_rules = rules.sort_values(by='lift', ascending=False).head(10)
+        # Sparse order x category matrix mined with FP-growth (see basket_rules.py)
+        pairs = basket_df[['order_id', 'product_category_name_english']].drop_duplicates()
+        matrix, items = build_transaction_matrix(pairs.rename(columns={'product_category_name_english': 'item'}))
+        rules = mine_rules(matrix, items, min_support=BASKET_MIN_SUPPORT, min_confidence=0.0, min_lift=ASSOC_RULES_MIN_LIFT)
+        top_10_rules = rules.head(10)
         logging.info("Top 10 association rules (potential for bundles/cross-sells):\n" + top_10_rules.to_string())
     else:
         logging.warning("No multi-item orders found for market basket analysis.")
@@ -143,46 +141,30 @@ def map_sentiment(score: int) -> str:
     else:
         return 'negative'
 
-def clean_text(text: str) -> str:
-    """Basic text cleaning: lowercase, remove punctuation and numbers."""
-    if not isinstance(text, str):
-        return ""
-    text = text.lower()
-    text = re.sub(r'[\d\W_]+', ' ', text)
-    return text
-
 def perform_sentiment_analysis_lgbm(reviews_df: pd.DataFrame, main_df: pd.DataFrame):
     """
-    Performs sentiment analysis using TF-IDF and LightGBM.
+    Performs sentiment analysis using TF-IDF and LightGBM, registering the trained model.
     """
     logging.info("--- Starting Sentiment Analysis (TF-IDF + LightGBM) ---")
     
     # Prepare data
     reviews_with_comments = reviews_df[reviews_df['review_comment_message'].notna()].copy()
-    reviews_with_comments['sentiment'] = reviews_with_comments['review_score'].apply(map_sentiment)
-    
-    portuguese_stopwords = stopwords.words('portuguese')
-    reviews_with_comments['cleaned_comment'] = reviews_with_comments['review_comment_message'].apply(clean_text)
 
-    # Feature Engineering & Model Training
-    vectorizer = TfidfVectorizer(max_features=3000, stop_words=portuguese_stopwords)
-    X = vectorizer.fit_transform(reviews_with_comments['cleaned_comment'])
-    y = reviews_with_comments['sentiment']
-    
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
-    
+    # Feature Engineering & Model Training (see fast_sentiment.py); the fitted
+    # vectorizer and classifier are registered for the API's mode=fast sentiment path
     logging.info("Training LightGBM model...")
-    lgbm = lgb.LGBMClassifier(random_state=42)
-    lgbm.fit(X_train, y_train)
-    
+    artifact, metadata = fit_fast_sentiment(reviews_with_comments['review_comment_message'], reviews_with_comments['review_score'])
+    metadata = save_model(FAST_SENTIMENT_MODEL_NAME, artifact, metadata)
+
     # Evaluate
-    y_pred = lgbm.predict(X_test)
-    report = classification_report(y_test, y_pred)
-    logging.info(f"LightGBM Classification Report:\n{report}")
-    
+    report = pd.DataFrame(metadata['label_report']).T
+    logging.info(f"LightGBM Classification Report (star score {metadata['star_accuracy']:.2%} accurate):\n{report}")
+
     # Link back to business insights
     logging.info("Analyzing sentiment distribution by product category...")
-    reviews_with_comments['predicted_sentiment'] = lgbm.predict(X)
+    scorer = FastSentimentScorer(artifact, metadata)
+    sentiments = scorer.predict(reviews_with_comments['review_comment_message'].tolist())
+    reviews_with_comments['predicted_sentiment'] = [label for _, label in sentiments]
     
     merged_df = pd.merge(reviews_with_comments[['order_id', 'predicted_sentiment']], main_df, on='order_id')
     
@@ -240,23 +222,27 @@ def main():
     
     OUTPUT_DIR.mkdir(exist_ok=True)
 
-    # Load base data
-    main_df = load_data(PROCESSED_DATA_PATH)
-    if main_df is None:
+    # Each analysis loads only the columns it reads. The analyses do not modify
+    # their inputs in place, except the geographic one, which gets its own frame.
+    geo_df = load_data(PROCESSED_DATA_PATH, ['order_id', 'customer_unique_id', 'customer_state', *PAYMENT_COLUMNS])
+    if geo_df is None:
         logging.critical("Could not load main processed dataset. Aborting.")
         return
 
     # --- Run Analyses ---
-    perform_geo_analysis(main_df.copy())
+    perform_geo_analysis(geo_df)
+    del geo_df
 
-    orders_df = load_data(ORDERS_PATH)
+    orders_df = load_data(ORDERS_PATH, ['order_id', 'order_purchase_timestamp'])
     if orders_df is not None:
-        perform_purchase_behavior_analysis(main_df.copy(), orders_df.copy())
+        basket_df = load_data(PROCESSED_DATA_PATH, ['order_id', 'customer_unique_id', 'product_id', 'product_category_name_english'])
+        perform_purchase_behavior_analysis(basket_df, orders_df)
     
-    reviews_df = load_data(ORDER_REVIEWS_PATH)
+    reviews_df = load_data(ORDER_REVIEWS_PATH, ['order_id', 'review_score', 'review_comment_message'])
     if reviews_df is not None:
-        perform_sentiment_analysis_lgbm(reviews_df.copy(), main_df.copy())
-        perform_sentiment_analysis_transformer(reviews_df.copy())
+        category_df = load_data(PROCESSED_DATA_PATH, ['order_id', 'product_category_name_english'])
+        perform_sentiment_analysis_lgbm(reviews_df, category_df)
+        perform_sentiment_analysis_transformer(reviews_df)
 
     logging.info("====== Analysis Pipeline Finished Successfully ======")
 
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Olist Seller Success - Churn Feature Builder
+
+Builds the per-customer RFM and purchase diversity features used by the churn
+model. Customer ids are encoded to integer codes once and every feature is
+aggregated with vectorized numpy operations on those codes, so no Python code
+runs per customer and the orders x payments x customers frame is never built.
+"""
+
+import numpy as np
+import pandas as pd
+
+FEATURE_COLUMNS = ['Recency', 'Frequency', 'Monetary', 'Purchase_Diversity']
+
+
+def encode_customers(customers_df: pd.DataFrame):
+    """
+    Encodes customer_unique_id to sorted integer codes.
+    Returns (customer_id -> code Series, array of unique ids indexed by code).
+    """
+    codes, uniques = pd.factorize(customers_df['customer_unique_id'], sort=True)
+    customer_codes = pd.Series(codes, index=customers_df['customer_id'].to_numpy())
+    return customer_codes, np.asarray(uniques)
+
+def _codes_for(values: pd.Series, categories) -> np.ndarray:
+    """Maps values onto the integer codes of `categories` (-1 when unknown)."""
+    return pd.Categorical(values, categories=categories).codes.astype(np.int64)
+
+def build_rfm_features(orders_df, payments_df, customers_df, processed_df) -> pd.DataFrame:
+    """
+    Returns one row per customer_unique_id with Recency, Frequency, Monetary and
+    Purchase_Diversity. Only orders that have at least one payment are counted.
+    """
+    customer_codes, unique_ids = encode_customers(customers_df)
+    n_customers = len(unique_ids)
+
+    # Payments are summed per order before touching orders, so the join is 1:1
+    order_payments = payments_df.groupby('order_id', sort=False, observed=True)['payment_value'].sum()
+    orders = orders_df[['order_id', 'customer_id', 'order_purchase_timestamp']]
+    orders = orders[orders['order_id'].isin(order_payments.index)]
+    order_codes = customer_codes.reindex(orders['customer_id'].to_numpy()).to_numpy()
+    known = ~np.isnan(order_codes)
+    order_codes = order_codes[known].astype(np.int64)
+    orders = orders[known]
+
+    timestamps = pd.to_datetime(orders['order_purchase_timestamp']).to_numpy(dtype='datetime64[ns]').view(np.int64)
+    monetary_per_order = order_payments.reindex(orders['order_id'].to_numpy()).to_numpy(dtype=np.float64)
+
+    # order_id is the primary key of orders, so counting rows counts distinct orders
+    frequency = np.bincount(order_codes, minlength=n_customers)
+    monetary = np.bincount(order_codes, weights=monetary_per_order, minlength=n_customers)
+    last_purchase = np.full(n_customers, np.iinfo(np.int64).min, dtype=np.int64)
+    np.maximum.at(last_purchase, order_codes, timestamps)
+
+    has_orders = frequency > 0
+    snapshot_date = pd.Timestamp(timestamps.max()) + pd.Timedelta(days=1)
+    recency_ns = snapshot_date.value - last_purchase[has_orders]
+    recency = recency_ns // pd.Timedelta(days=1).value
+
+    diversity = build_purchase_diversity(processed_df, unique_ids)
+
+    return pd.DataFrame({
+        'customer_unique_id': unique_ids[has_orders],
+        'Recency': recency,
+        'Frequency': frequency[has_orders],
+        'Monetary': monetary[has_orders],
+        'Purchase_Diversity': diversity[has_orders],
+    })
+
+def build_purchase_diversity(processed_df, unique_ids) -> np.ndarray:
+    """Counts distinct product categories per customer, aligned with the codes of `unique_ids`."""
+    items = processed_df[['customer_unique_id', 'product_category_name_english']].dropna()
+    customer = _codes_for(items['customer_unique_id'], unique_ids)
+    category, categories = pd.factorize(items['product_category_name_english'])
+    known = customer >= 0
+    # One int64 key per (customer, category) pair; unique keys are distinct pairs
+    pair_keys = np.unique(customer[known] * len(categories) + category[known])
+    return np.bincount(pair_keys // max(len(categories), 1), minlength=len(unique_ids))
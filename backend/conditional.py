@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Olist Seller Success - Conditional GET Helpers
+
+Validators (ETag / Last-Modified) for the read endpoints. Tags are derived from
+the dataset version stamped by populate_db.py, the predictive snapshot version
+where relevant, and the request path and query, so a client holding a current
+tag gets a 304 before the endpoint runs.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+# Responses must be revalidated on every use; a matching tag makes that a cheap 304
+CACHE_CONTROL = "no-cache"
+
+
+def make_etag(*parts) -> str:
+    """Weak ETag over the given parts (the payload is equivalent, not byte-identical, across encodings)."""
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode('utf-8')).hexdigest()[:32]
+    return f'W/"{digest}"'
+
+def http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+def is_not_modified(headers, etag: str, last_modified: datetime | None) -> bool:
+    """
+    True if the request's validators match. If-None-Match takes precedence over
+    If-Modified-Since (RFC 9110 13.2.2); tags are compared weakly.
+    """
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        return _opaque(etag) in {_opaque(tag) for tag in if_none_match.split(",")}
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+def validator_headers(etag: str, last_modified: datetime | None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Olist Seller Success - Dataset Cache
+
+Converts the source CSVs to typed Parquet once, keyed by a hash of the CSV, and
+hands out Arrow-backed DataFrames with only the requested columns. Reruns of
+the offline pipelines read memory-mapped Parquet instead of re-parsing CSV, and
+a changed CSV gets a new cache entry automatically.
+
+The hash of a file is remembered together with its size and mtime, so unchanged
+files are not rehashed on every run.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+import time
+from pathlib import Path
+import pandas as pd
+
+# --- Paths ---
+BASE_DIR = Path(__file__).resolve().parent
+DATASET_CACHE_DIR = Path(os.getenv("DATASET_CACHE_DIR", BASE_DIR.parent / "artifacts" / "dataset_cache"))
+DIGEST_INDEX = "digests.json"
+
+_index_lock = threading.Lock()
+
+
+def _file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+def source_digest(csv_path: Path, cache_dir: Path = DATASET_CACHE_DIR) -> str:
+    """Content hash of `csv_path`, recomputed only when its size or mtime changed."""
+    stat = csv_path.stat()
+    index_path = cache_dir / DIGEST_INDEX
+    key = str(csv_path.resolve())
+    with _index_lock:
+        try:
+            index = json.loads(index_path.read_text())
+        except (FileNotFoundError, ValueError):
+            index = {}
+        entry = index.get(key)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["digest"]
+        digest = _file_digest(csv_path)
+        index[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "digest": digest}
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_dir / f".{DIGEST_INDEX}.tmp"
+        tmp_path.write_text(json.dumps(index, indent=2))
+        os.replace(tmp_path, index_path)
+    return digest
+
+def cached_parquet(csv_path, cache_dir: Path = DATASET_CACHE_DIR) -> Path:
+    """Path of the Parquet copy of `csv_path`, converting the CSV first if it changed."""
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+
+    csv_path = Path(csv_path)
+    if not csv_path.exists():
+        raise FileNotFoundError(csv_path)
+    digest = source_digest(csv_path, cache_dir)
+    parquet_path = cache_dir / f"{csv_path.stem}-{digest}.parquet"
+    if parquet_path.exists():
+        return parquet_path
+
+    start = time.perf_counter()
+    # pyarrow infers int, float, bool and timestamp columns while parsing on all cores
+    table = pa_csv.read_csv(csv_path)
+    tmp_path = cache_dir / f".{parquet_path.name}.tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, parquet_path)
+    for stale in cache_dir.glob(f"{csv_path.stem}-*.parquet"):
+        if stale != parquet_path:
+            stale.unlink(missing_ok=True)
+    logging.info(f"Cached {csv_path.name} as Parquet ({table.num_rows} rows) in {time.perf_counter() - start:.1f}s")
+    return parquet_path
+
+def dataset_columns(csv_path, cache_dir: Path = DATASET_CACHE_DIR) -> list:
+    """Column names of a cached dataset, read from the Parquet footer."""
+    import pyarrow.parquet as pq
+
+    return pq.read_schema(cached_parquet(csv_path, cache_dir)).names
+
+def load_dataset(csv_path, columns=None, cache_dir: Path = DATASET_CACHE_DIR) -> pd.DataFrame:
+    """
+    Loads `columns` (all if None; names missing from the file are skipped) of a
+    CSV dataset through the Parquet cache. The file is memory-mapped and the
+    frame's columns are ArrowDtype views of the Arrow table, not NumPy copies.
+    Raises FileNotFoundError if the CSV does not exist.
+    """
+    import pyarrow.parquet as pq
+
+    parquet_path = cached_parquet(csv_path, cache_dir)
+    if columns is not None:
+        available = set(pq.read_schema(parquet_path).names)
+        columns = [column for column in columns if column in available]
+    table = pq.read_table(parquet_path, columns=columns, memory_map=True)
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
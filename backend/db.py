@@ -0,0 +1,107 @@
+import os
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+
+# Load environment variables
+dotenv_path = Path(__file__).parent.parent / '.env'
+load_dotenv(dotenv_path=dotenv_path)
+
+def get_database_url():
+    """Returns DATABASE_URL rewritten to use the SQLAlchemy psycopg2 dialect."""
+    db_url = os.getenv("DATABASE_URL")
+    if db_url and db_url.startswith("postgres://"):
+        db_url = db_url.replace("postgres://", "postgresql://", 1)
+    if db_url and db_url.startswith("postgresql://"):
+        db_url = db_url.replace("postgresql://", "postgresql+psycopg2://", 1)
+    return db_url
+
+def create_db_engine(**kwargs):
+    """Creates the SQLAlchemy engine, or returns None if the database is not configured."""
+    db_url = get_database_url()
+    try:
+        if not db_url:
+            raise ValueError("DATABASE_URL environment variable is not set.")
+        engine = create_engine(db_url, **kwargs)
+        logging.info("Database engine created successfully.")
+        return engine
+    except Exception as e:
+        logging.error(f"Error creating database engine: {e}")
+        return None
+
+
+# --- Async Engine (asyncpg) ---
+
+def get_async_database_url():
+    """Returns DATABASE_URL rewritten to use the SQLAlchemy asyncpg dialect."""
+    db_url = get_database_url()
+    if db_url:
+        db_url = db_url.replace("postgresql+psycopg2://", "postgresql+asyncpg://", 1)
+    return db_url
+
+def create_async_db_engine(**kwargs):
+    """Creates the async SQLAlchemy engine, or returns None if the database is not configured."""
+    db_url = get_async_database_url()
+    try:
+        if not db_url:
+            raise ValueError("DATABASE_URL environment variable is not set.")
+        engine = create_async_engine(db_url, **kwargs)
+        logging.info("Async database engine created successfully.")
+        return engine
+    except Exception as e:
+        logging.error(f"Error creating async database engine: {e}")
+        return None
+
+async def fetch_all(engine, query, params=None):
+    """Runs `query` on its own pooled connection and returns all rows as mappings."""
+    async with engine.connect() as connection:
+        result = await connection.execute(query, params or {})
+        return result.mappings().all()
+
+async def fetch_first(engine, query, params=None):
+    """Runs `query` on its own pooled connection and returns the first row as a mapping (or None)."""
+    async with engine.connect() as connection:
+        result = await connection.execute(query, params or {})
+        return result.mappings().first()
+
+
+# --- COPY Streaming ---
+
+@contextmanager
+def copy_out_stream(dbapi_connection, sql: str, name: str = "copy"):
+    """
+    Runs `COPY ... TO STDOUT` (psycopg2) on a thread that writes into a pipe and
+    yields the read end, so the caller parses rows while they arrive. If COPY
+    fails, its error is raised rather than the parse error it caused (which is
+    kept as the exception context).
+    """
+    read_fd, write_fd = os.pipe()
+    errors = []
+
+    def produce():
+        try:
+            with os.fdopen(write_fd, 'wb') as sink:
+                cursor = dbapi_connection.cursor()
+                cursor.copy_expert(sql, sink)
+                cursor.close()
+        except Exception as e:
+            errors.append(e)
+
+    producer = threading.Thread(target=produce, name=name, daemon=True)
+    producer.start()
+    try:
+        with os.fdopen(read_fd, 'rb') as source:
+            yield source
+    except Exception:
+        # Closing the read end above unblocks a producer still writing (BrokenPipeError)
+        producer.join()
+        if errors and not isinstance(errors[0], BrokenPipeError):
+            raise errors[0]
+        raise
+    producer.join()
+    if errors:
+        raise errors[0]
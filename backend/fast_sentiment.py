@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Olist Seller Success - Fast Sentiment Scorer (TF-IDF + LightGBM)
+
+A CPU-friendly alternative to the BERT engine in sentiment_engine.py. A TF-IDF
+vectorizer and a LightGBM classifier predict the 1-5 star score of a review
+comment; both are trained once and stored in the model registry. Scoring a page
+is one sparse transform and one predict_proba call, which makes it practical
+to score the whole order_reviews table without a GPU.
+
+Usage:
+    uv run python -m backend.fast_sentiment
+"""
+
+import os
+import logging
+import threading
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from .model_registry import save_model, load_model, latest_version
+
+# --- Parameters ---
+FAST_SENTIMENT_MODEL_NAME = "sentiment_tfidf_lgbm"
+TFIDF_MAX_FEATURES = int(os.getenv("FAST_SENTIMENT_MAX_FEATURES", 3000))
+# Words of two or more letters; digits, punctuation and underscores separate tokens
+TOKEN_PATTERN = r"(?u)\b[^\W\d_]{2,}\b"
+STAR_LABELS = {1: 'negative', 2: 'negative', 3: 'neutral', 4: 'positive', 5: 'positive'}
+
+TRAINING_QUERY = text("""
+    SELECT review_comment_message, review_score
+    FROM order_reviews
+    WHERE review_comment_message IS NOT NULL AND TRIM(review_comment_message) <> '' AND review_score BETWEEN 1 AND 5;
+""")
+
+
+def _portuguese_stopwords():
+    try:
+        import nltk
+        from nltk.corpus import stopwords
+        try:
+            return stopwords.words('portuguese')
+        except LookupError:
+            # Fetched by the first training run; the API process never needs the corpus
+            nltk.download('stopwords', quiet=True)
+            return stopwords.words('portuguese')
+    except (ImportError, LookupError) as e:
+        logging.warning(f"Portuguese stopwords unavailable, training without them: {e}")
+        return None
+
+def fit_fast_sentiment(comments, scores, test_size: float = 0.2):
+    """
+    Fits the vectorizer and classifier on (comment, star score) pairs, evaluated on
+    a stratified hold-out split. Returns (artifact, metadata) for the model registry.
+    """
+    import lightgbm as lgb
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import accuracy_score, classification_report
+
+    start = time.perf_counter()
+    vectorizer = TfidfVectorizer(max_features=TFIDF_MAX_FEATURES, stop_words=_portuguese_stopwords(),
+                                 token_pattern=TOKEN_PATTERN, dtype=np.float32)
+    X = vectorizer.fit_transform(comments)
+    y = np.asarray(scores, dtype=int)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42, stratify=y)
+
+    model = lgb.LGBMClassifier(random_state=42, verbose=-1)
+    model.fit(X_train, y_train)
+    y_pred = model.predict(X_test)
+    to_labels = np.vectorize(STAR_LABELS.get)
+    metadata = {
+        "training_rows": int(X_train.shape[0]),
+        "features": len(vectorizer.vocabulary_),
+        "classes": [int(c) for c in model.classes_],
+        "star_accuracy": round(float(accuracy_score(y_test, y_pred)), 4),
+        "label_accuracy": round(float(accuracy_score(to_labels(y_test), to_labels(y_pred))), 4),
+        "label_report": classification_report(to_labels(y_test), to_labels(y_pred), output_dict=True, zero_division=0),
+        "training_seconds": round(time.perf_counter() - start, 1),
+    }
+    logging.info(f"Fast sentiment model: star accuracy {metadata['star_accuracy']}, label accuracy {metadata['label_accuracy']}")
+    return {"vectorizer": vectorizer, "model": model}, metadata
+
+def train_fast_sentiment(engine) -> dict:
+    """Trains on every commented review in the database and registers the model. Returns its metadata."""
+    reviews = pd.read_sql_query(TRAINING_QUERY, engine)
+    if reviews.empty:
+        raise RuntimeError("No commented reviews to train the fast sentiment model on.")
+    artifact, metadata = fit_fast_sentiment(reviews['review_comment_message'], reviews['review_score'])
+    return save_model(FAST_SENTIMENT_MODEL_NAME, artifact, metadata)
+
+
+class FastSentimentScorer:
+    """Scores comments with a registered vectorizer + classifier pair."""
+
+    def __init__(self, artifact: dict, metadata: dict):
+        self.vectorizer = artifact["vectorizer"]
+        self.model = artifact["model"]
+        self.version = metadata["version"]
+        self.model_name = f"{FAST_SENTIMENT_MODEL_NAME}:{self.version}"
+
+    def predict(self, comments: list) -> list[tuple]:
+        """Returns a (score, label) tuple per comment; blank comments get (None, 'no_comment')."""
+        results = [(None, 'no_comment')] * len(comments)
+        positions = [i for i, comment in enumerate(comments) if isinstance(comment, str) and comment.strip()]
+        if not positions:
+            return results
+        # One sparse transform and one predict_proba for all comments
+        features = self.vectorizer.transform([comments[i] for i in positions])
+        probabilities = self.model.predict_proba(features)
+        scores = self.model.classes_[probabilities.argmax(axis=1)]
+        for i, score in zip(positions, scores):
+            results[i] = (int(score), STAR_LABELS[int(score)])
+        return results
+
+
+# --- Process-wide Scorer ---
+_scorer = None
+_scorer_lock = threading.Lock()
+
+def get_fast_scorer() -> FastSentimentScorer | None:
+    """Returns the scorer of the latest registered model (reloaded after retraining), or None if none exists."""
+    global _scorer
+    version = latest_version(FAST_SENTIMENT_MODEL_NAME)
+    if version is None:
+        return None
+    if _scorer is None or _scorer.version != version:
+        with _scorer_lock:
+            if _scorer is None or _scorer.version != version:
+                artifact, metadata = load_model(FAST_SENTIMENT_MODEL_NAME, version)
+                if artifact is None:
+                    return _scorer
+                _scorer = FastSentimentScorer(artifact, metadata)
+                logging.info(f"Loaded fast sentiment model {version}.")
+    return _scorer
+
+
+def main():
+    """Trains and registers the fast sentiment model from the configured database."""
+    import json
+    from .db import create_db_engine
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    engine = create_db_engine()
+    if engine is None:
+        raise SystemExit(1)
+    metadata = train_fast_sentiment(engine)
+    print(json.dumps({key: value for key, value in metadata.items() if key != "label_report"}, indent=2))
+
+if __name__ == "__main__":
+    main()
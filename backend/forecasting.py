@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Olist Seller Success - Category Sales Forecasting Engine
+
+Builds the daily sales series of every category in a single groupby pass, fits
+one Prophet model per category in a process pool and caches each forecast on
+disk keyed by category, last date and a checksum of the series, so categories
+whose sales did not change are never refit.
+"""
+
+import os
+import hashlib
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import pandas as pd
+
+# --- Paths ---
+BASE_DIR = Path(__file__).resolve().parent
+FORECAST_CACHE_DIR = Path(os.getenv("FORECAST_CACHE_DIR", BASE_DIR.parent / "artifacts" / "forecasts"))
+
+# --- Parameters ---
+# Bump when the Prophet configuration below changes so cached forecasts are refit
+FORECAST_MODEL_VERSION = 1
+# Offline refreshes (populate_db.py, python -m backend.precompute) use half the cores;
+# the API's background refresh fits serially by default to keep the serving cores free
+FORECAST_MAX_WORKERS = int(os.getenv("FORECAST_MAX_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+API_FORECAST_MAX_WORKERS = int(os.getenv("API_FORECAST_MAX_WORKERS", 1))
+FORECAST_COLUMNS = ['ds', 'yhat', 'yhat_lower', 'yhat_upper']
+
+
+def build_daily_series(processed_df: pd.DataFrame, categories) -> dict:
+    """
+    Returns {category: DataFrame(ds, y)} with daily revenue for each category,
+    including zero-sales days between its first and last sale.
+    """
+    df = processed_df.loc[processed_df['product_category_name_english'].isin(categories),
+                          ['product_category_name_english', 'order_purchase_timestamp', 'price']]
+    day = pd.to_datetime(df['order_purchase_timestamp']).dt.floor('D')
+    daily = df['price'].groupby([df['product_category_name_english'], day], observed=True).sum()
+
+    series = {}
+    for category, sales in daily.groupby(level=0, sort=False, observed=True):
+        sales = sales.droplevel(0)
+        full_range = pd.date_range(sales.index.min(), sales.index.max(), freq='D')
+        sales = sales.reindex(full_range, fill_value=0.0)
+        series[category] = pd.DataFrame({'ds': sales.index, 'y': sales.to_numpy()})
+    return series
+
+def series_cache_key(category: str, daily_sales: pd.DataFrame, periods: int) -> str:
+    """Cache key from the category, the series' last date, a checksum of its values and the model settings."""
+    checksum = hashlib.sha256(pd.util.hash_pandas_object(daily_sales, index=False).to_numpy().tobytes()).hexdigest()[:16]
+    last_date = daily_sales['ds'].max().strftime('%Y%m%d')
+    category_slug = hashlib.sha256(str(category).encode('utf-8')).hexdigest()[:12]
+    return f"{category_slug}-{last_date}-{checksum}-p{periods}-v{FORECAST_MODEL_VERSION}"
+
+def fit_forecast(daily_sales: pd.DataFrame, periods: int) -> pd.DataFrame:
+    """Fits Prophet with Brazilian holidays on one series and forecasts `periods` days ahead."""
+    from prophet import Prophet
+
+    model = Prophet(yearly_seasonality=True, weekly_seasonality=True, daily_seasonality=False)
+    model.add_country_holidays(country_name='BR')
+    model.fit(daily_sales)
+    future = model.make_future_dataframe(periods=periods)
+    forecast = model.predict(future)
+    return forecast[FORECAST_COLUMNS].copy()
+
+def _load_cached(key: str, cache_dir: Path):
+    path = cache_dir / f"{key}.parquet"
+    try:
+        return pd.read_parquet(path)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable cached forecast {path}: {e}")
+        return None
+
+def _store_cached(key: str, forecast: pd.DataFrame, cache_dir: Path):
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_dir / f".{key}.parquet.tmp"
+    forecast.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, cache_dir / f"{key}.parquet")
+    # Drop superseded forecasts of the same category
+    category_slug = key.split('-', 1)[0]
+    for path in cache_dir.glob(f"{category_slug}-*.parquet"):
+        if path.stem != key:
+            path.unlink(missing_ok=True)
+
+def forecast_categories(processed_df: pd.DataFrame, categories, periods: int,
+                        max_workers: int = FORECAST_MAX_WORKERS, cache_dir: Path = FORECAST_CACHE_DIR) -> dict:
+    """Returns {category: forecast DataFrame} in the order of `categories`, refitting only changed series."""
+    start = time.perf_counter()
+    series = build_daily_series(processed_df, categories)
+    keys = {category: series_cache_key(category, daily_sales, periods) for category, daily_sales in series.items()}
+
+    forecasts = {category: _load_cached(key, cache_dir) for category, key in keys.items()}
+    to_fit = [category for category, forecast in forecasts.items() if forecast is None]
+    logging.info(f"Forecasting {len(series)} categories: {len(series) - len(to_fit)} cached, {len(to_fit)} to fit.")
+
+    if to_fit:
+        # A failed fit (e.g. a series with fewer than two days) only drops its own category
+        fitted = {}
+        if max_workers > 1 and len(to_fit) > 1:
+            # spawn instead of fork: this may run from a background thread of the API process
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=min(max_workers, len(to_fit)), mp_context=context) as pool:
+                futures = {category: pool.submit(fit_forecast, series[category], periods) for category in to_fit}
+                for category, future in futures.items():
+                    try:
+                        fitted[category] = future.result()
+                    except Exception as e:
+                        logging.error(f"Forecast for '{category}' failed, leaving it out: {e}")
+        else:
+            for category in to_fit:
+                try:
+                    fitted[category] = fit_forecast(series[category], periods)
+                except Exception as e:
+                    logging.error(f"Forecast for '{category}' failed, leaving it out: {e}")
+        for category, forecast in fitted.items():
+            _store_cached(keys[category], forecast, cache_dir)
+            forecasts[category] = forecast
+            logging.info(f"Advanced forecast for '{category}' generated.")
+
+    logging.info(f"Category forecasts ready in {time.perf_counter() - start:.1f}s")
+    return {category: forecasts[category] for category in categories if forecasts.get(category) is not None}
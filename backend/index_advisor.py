@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Olist Seller Success - Index Advisor
+
+Finds every SQL query passed to `text(...)` in api_queries.py and main.py, runs
+EXPLAIN on it against the configured database with sample parameters, and flags
+sequential scans on the large tables.
+
+Usage:
+    uv run python -m backend.index_advisor [--apply] [--files backend/main.py ...]
+
+--apply builds the indexes in indexes.sql first (for databases loaded before
+they existed).
+"""
+
+import ast
+import argparse
+import json
+import logging
+import re
+import sys
+from pathlib import Path
+from sqlalchemy import text
+
+# --- Paths ---
+BASE_DIR = Path(__file__).resolve().parent
+INDEXES_SQL_PATH = BASE_DIR / "indexes.sql"
+DEFAULT_FILES = [BASE_DIR / "api_queries.py", BASE_DIR / "main.py"]
+
+# --- Parameters ---
+LARGE_TABLES = {"orders", "order_items", "order_payments", "order_reviews", "customers"}
+
+# Values substituted for f-string placeholders (sort columns, directions, optional clauses)
+FORMAT_DEFAULTS = {
+    "sort_by": None,  # replaced by the first column the query is sorted on, see _render
+    "sort_expr": None,
+    "order": "DESC",
+    "where": "",
+    "keyset": "",
+    "mode": "",
+}
+
+# Bind parameters that need a real value; everything else is bound as NULL
+SAMPLE_PARAM_QUERIES = {
+    "seller_id": "SELECT seller_id FROM order_items GROUP BY seller_id ORDER BY COUNT(*) DESC LIMIT 1;",
+}
+STATIC_SAMPLE_PARAMS = {"limit": 10, "offset": 0}
+
+
+def find_queries(path: Path) -> list[dict]:
+    """Returns the SQL passed to text(...) in `path`, with its line and enclosing function."""
+    tree = ast.parse(path.read_text(), filename=str(path))
+    queries = []
+
+    def visit(node, function=None):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            function = node.name
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'text'
+                and node.args and isinstance(node.args[0], (ast.Constant, ast.JoinedStr))):
+            queries.append({"file": path.name, "line": node.lineno, "function": function, "node": node.args[0]})
+        for child in ast.iter_child_nodes(node):
+            visit(child, function)
+
+    visit(tree)
+    return queries
+
+def _render(node) -> str | None:
+    """Renders a string or f-string node to SQL, or None if it has placeholders we cannot fill."""
+    if isinstance(node, ast.Constant):
+        return node.value if isinstance(node.value, str) else None
+    constants = "".join(value.value for value in node.values if isinstance(value, ast.Constant))
+    # Sort placeholders default to the first candidate column the query selects
+    sort_column = next((c for c in ("total_revenue", "sales_count", "order_purchase_timestamp") if c in constants), "1")
+    values = {**FORMAT_DEFAULTS, "sort_by": sort_column, "sort_expr": sort_column}
+    parts = []
+    for value in node.values:
+        if isinstance(value, ast.Constant):
+            parts.append(value.value)
+        elif isinstance(value, ast.FormattedValue) and isinstance(value.value, ast.Name) and value.value.id in values:
+            parts.append(values[value.value.id])
+        else:
+            return None
+    return "".join(parts)
+
+def sample_params(connection) -> dict:
+    params = dict(STATIC_SAMPLE_PARAMS)
+    for name, query in SAMPLE_PARAM_QUERIES.items():
+        params[name] = connection.execute(text(query)).scalar_one_or_none()
+    return params
+
+def _seq_scans(plan: dict) -> list[str]:
+    """Relations read with a sequential scan anywhere in the plan tree."""
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        found.extend(_seq_scans(child))
+    return found
+
+def explain_query(connection, sql: str, params: dict) -> dict:
+    """Runs EXPLAIN (FORMAT JSON) and returns the estimated cost and large-table seq scans."""
+    names = set(re.findall(r"(?<!:):([a-zA-Z_]\w*)", sql))
+    bound = {name: params.get(name) for name in names}
+    plan = connection.execute(text(f"EXPLAIN (FORMAT JSON) {sql.strip().rstrip(';')}"), bound).scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    root = plan[0]["Plan"]
+    scans = _seq_scans(root)
+    return {
+        "total_cost": root.get("Total Cost"),
+        "seq_scans": sorted({table for table in scans if table in LARGE_TABLES}),
+    }
+
+def apply_indexes(engine):
+    """Builds the secondary indexes from indexes.sql."""
+    with engine.begin() as connection:
+        connection.exec_driver_sql(INDEXES_SQL_PATH.read_text())
+    logging.info("Secondary indexes are in place.")
+
+def run_advisor(engine, files=DEFAULT_FILES) -> list[dict]:
+    """EXPLAINs every query in `files`. Returns one report row per query."""
+    reports = []
+    with engine.connect() as connection:
+        params = sample_params(connection)
+        for path in files:
+            for query in find_queries(Path(path)):
+                report = {key: query[key] for key in ("file", "line", "function")}
+                sql = _render(query["node"])
+                if sql is None:
+                    report["status"] = "skipped (dynamic SQL)"
+                elif not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+                    report["status"] = "skipped (not a query)"
+                else:
+                    try:
+                        report.update(explain_query(connection, sql, params))
+                        report["status"] = "SEQ SCAN" if report["seq_scans"] else "ok"
+                    except Exception as e:
+                        connection.rollback()
+                        report["status"] = f"error: {str(e).splitlines()[0]}"
+                reports.append(report)
+    return reports
+
+def print_report(reports: list[dict]):
+    for report in reports:
+        location = f"{report['file']}:{report['line']} {report['function'] or '<module>'}"
+        detail = ", ".join(report.get("seq_scans", [])) if report["status"] == "SEQ SCAN" else ""
+        cost = f"cost={report['total_cost']:.0f}" if report.get("total_cost") is not None else ""
+        print(f"{report['status']:<10} {location:<60} {cost:<16} {detail}")
+    flagged = sum(1 for report in reports if report["status"] == "SEQ SCAN")
+    print(f"\n{flagged} of {len(reports)} queries scan a large table sequentially.")
+
+
+def main():
+    from .db import create_db_engine
+
+    parser = argparse.ArgumentParser(description="EXPLAIN the API queries and flag sequential scans on large tables.")
+    parser.add_argument('--apply', action='store_true', help="Build the indexes in indexes.sql before checking.")
+    parser.add_argument('--files', nargs='+', default=DEFAULT_FILES, help="Python files to scan for text(...) queries.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    engine = create_db_engine()
+    if engine is None:
+        sys.exit(1)
+    if args.apply:
+        apply_indexes(engine)
+    print_report(run_advisor(engine, args.files))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+-- Secondary and covering indexes, built by populate_db.py after the bulk COPY
+-- (building them once on loaded tables is much faster than maintaining them row by row).
+-- Run `uv run python -m backend.index_advisor` to check which queries still scan large tables.
+
+-- Per-seller endpoints (/api/v2/sellers/{seller_id}/*): covering, so most of them never touch the heap
+CREATE INDEX IF NOT EXISTS idx_order_items_seller_id ON order_items (seller_id) INCLUDE (order_id, product_id, price, shipping_limit_date);
+CREATE INDEX IF NOT EXISTS idx_order_items_product_id ON order_items (product_id);
+
+-- Customer lookups and the orders log (keyset pagination seeks on (sort column, order_id))
+CREATE INDEX IF NOT EXISTS idx_orders_customer_id ON orders (customer_id);
+CREATE INDEX IF NOT EXISTS idx_orders_purchase_timestamp ON orders (order_purchase_timestamp, order_id);
+CREATE INDEX IF NOT EXISTS idx_orders_status ON orders (order_status, order_id);
+
+-- Reviews joined by order, and the review feed ordered by creation date
+CREATE INDEX IF NOT EXISTS idx_order_reviews_order_id ON order_reviews (order_id) INCLUDE (review_score);
+CREATE INDEX IF NOT EXISTS idx_order_reviews_creation_date ON order_reviews (review_creation_date);
+
+-- The primary key already leads with order_id; this one also covers SUM(payment_value)
+CREATE INDEX IF NOT EXISTS idx_order_payments_order_id ON order_payments (order_id) INCLUDE (payment_value, payment_type);
+
+CREATE INDEX IF NOT EXISTS idx_customers_unique_id ON customers (customer_unique_id);
+
+-- Refresh planner statistics so the new indexes are picked up right away
+ANALYZE customers;
+ANALYZE sellers;
+ANALYZE products;
+ANALYZE orders;
+ANALYZE order_items;
+ANALYZE order_payments;
+ANALYZE order_reviews;
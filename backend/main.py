@@ -1,74 +1,157 @@
 import os
-from fastapi import FastAPI, HTTPException
+import asyncio
+from datetime import date, datetime
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from dotenv import load_dotenv
 import logging
 import uvicorn
 import pandas as pd
-from pathlib import Path
-from sqlalchemy import create_engine, text
-
-from .predictive_analysis import run_churn_prediction_v2, run_sales_forecasting_v2, run_sentiment_analysis
+from sqlalchemy import text, JSON
+
+from .db import create_db_engine, create_async_db_engine, fetch_all, fetch_first
+from .precompute import SnapshotStore, CHURN_SORT_COLUMNS, PAYLOAD_TABLES
+from .pagination import decode_cursor, encode_cursor, keyset_condition, next_cursor, get_cached_count_async
+from .fast_sentiment import get_fast_scorer
+from .query_cache import cache_stats, get_data_stamp, get_data_version
+from .conditional import make_etag, is_not_modified, validator_headers
+from .analytics_backend import get_analytics_engine
+from .basket_rules import BASKET_LEVELS, RulesStore, filter_rules, to_records
+from .response_format import (
+    ARROW_STREAM_MEDIA_TYPE,
+    JSON_MEDIA_TYPE,
+    VARY,
+    dumps,
+    encode_body,
+    negotiate_format,
+    response_headers,
+    to_arrow_stream,
+    to_columns,
+)
 from .api_queries import (
     get_sales_by_region,
     get_order_status_distribution,
     get_payment_method_distribution,
     get_revenue_trend,
     get_platform_kpis,
-    get_data_for_predictions,
     get_sentiment_trend_data,
     get_top_negative_categories,
     get_average_review_score,
     get_overall_sentiment_distribution
 )
-from collections import Counter
-import re
-
-# NLTK setup for keyword analysis (can be removed if no other endpoint uses it)
-# For now, we leave it in case it's needed elsewhere.
-try:
-    from nltk.corpus import stopwords
-    from nltk.tokenize import word_tokenize
-    import nltk
-    nltk.download('punkt', quiet=True)
-    nltk.download('punkt_tab', quiet=True)
-    nltk.download('stopwords', quiet=True)
-    stop_words = set(stopwords.words('portuguese'))
-except ImportError:
-    stop_words = set()
-
-# Load environment variables
-dotenv_path = Path(__file__).parent.parent / '.env'
-load_dotenv(dotenv_path=dotenv_path)
 
 app = FastAPI()
 
-# --- Global In-memory Cache ---
-analysis_cache = {"data": None}
+# --- Database Engine Creation (Singleton) ---
+# The async engine serves the request path; the sync engine is kept for pandas
+# (read_sql), api_queries.py and the background snapshot refresh.
+engine = create_db_engine(pool_size=5, max_overflow=10)
+async_engine = create_async_db_engine(pool_size=20, max_overflow=20, pool_pre_ping=True)
+# Platform and sentiment aggregates (api_queries.py): Postgres, or DuckDB over Parquet (ANALYTICS_BACKEND)
+analytics_engine = get_analytics_engine(engine)
+
+# Python types of the keyset sort columns, used to decode cursors for asyncpg.
+# The revenue sums are SUM(REAL), i.e. real: a float keeps the row comparison (and its index) on real.
+CURSOR_SORT_TYPES = {
+    'total_revenue': float,
+    'total_value': float,
+    'order_purchase_timestamp': datetime.fromisoformat,
+}
+
+async def _none():
+    """Placeholder awaitable for an optional query in asyncio.gather."""
+    return None
+
+async def _cached_total(query: str):
+    """List total from the count cache, counted again after every load (dataset version) or TTL."""
+    version = await run_in_threadpool(get_data_version, engine) if engine else None
+    return await get_cached_count_async(async_engine, query, version=version)
+
+# --- Predictive Insights Snapshot (loaded from disk, refreshed in the background) ---
+predictive_store = SnapshotStore(engine)
+predictive_store.reload()
+predictive_store.start_scheduler()
+
+# --- Market Basket Rules (mined offline, see basket_rules.py) ---
+basket_rules_store = RulesStore()
+
+# --- Conditional GET (ETag / Last-Modified from the dataset version) ---
+UNVALIDATED_PATHS = {"/api/platform/cache-stats"}
+# Endpoints whose representation is negotiated (format / Accept, Accept-Encoding), see response_format.py
+NEGOTIATED_PATHS = {"/api/platform/predictive-insights", "/api/platform/churn-predictions"}
+
+def current_validators(path: str, query_items, accept: str | None = None):
+    """(etag, last_modified) for a read request, or None when the data version is unknown."""
+    if not analytics_engine:
+        return None
+    version, loaded_at = get_data_stamp(analytics_engine)
+    if version is None:
+        return None
+    # The date is part of the tag because some panels are computed relative to NOW()
+    parts = [version, path, sorted(query_items), date.today().isoformat()]
+    last_modified = loaded_at
+    if path in ("/api/platform/predictive-insights", "/api/platform/churn-predictions"):
+        predictive_store.reload()
+        if predictive_store.manifest is None:
+            return None
+        if predictive_store.is_stale():
+            predictive_store.refresh_in_background()
+        parts.append(predictive_store.version)
+        # Each format is a different representation; encodings of one format share the weak tag
+        parts.append(negotiate_format(dict(query_items).get("format"), accept))
+        last_modified = max(loaded_at, datetime.fromisoformat(predictive_store.manifest["created_at"]))
+    elif path == "/api/platform/basket-rules":
+        _, manifest = basket_rules_store.get(dict(query_items).get("level", "category"))
+        if manifest is None:
+            return None
+        parts.append(manifest["version"])
+        last_modified = max(loaded_at, datetime.fromisoformat(manifest["created_at"]))
+    elif path == "/api/sentiment-analysis" and dict(query_items).get("mode", "fast") == "fast":
+        # Pages are rescored with whichever fast model is registered
+        scorer = get_fast_scorer()
+        parts.append(scorer.version if scorer else None)
+    return make_etag(*parts), last_modified
+
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):
+    """Answers 304 before the endpoint runs when the client's validators are current."""
+    path = request.url.path
+    if (request.method != "GET" or not path.startswith("/api/") or path in UNVALIDATED_PATHS
+            or "force_refresh" in request.query_params):
+        return await call_next(request)
+    # The dataset version is read from memory; the database is asked at most every DATA_VERSION_CHECK_SECONDS
+    validators = await run_in_threadpool(current_validators, path, request.query_params.multi_items(), request.headers.get("accept"))
+    if validators is None:
+        return await call_next(request)
+    etag, last_modified = validators
+    if is_not_modified(request.headers, etag, last_modified):
+        headers = validator_headers(etag, last_modified)
+        if path in NEGOTIATED_PATHS:
+            headers["Vary"] = VARY
+        return Response(status_code=304, headers=headers)
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers.update(validator_headers(etag, last_modified))
+        if path in NEGOTIATED_PATHS:
+            response.headers.add_vary_header(VARY)
+    return response
 
 # --- CORS Configuration ---
+# Added after conditional_get so it wraps it: 304s carry the CORS headers too
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Response headers the browser frontend (a different origin) may read
+    expose_headers=["ETag", "X-Snapshot-Version", "X-Snapshot-Created-At", "X-Rules-Version", "X-Total-Count", "X-Next-Cursor"],
 )
 
-# --- Database Engine Creation (Singleton) ---
-DB_URL = os.getenv("DATABASE_URL")
-# Ensure the URL uses the sqlalchemy dialect for psycopg2
-if DB_URL and DB_URL.startswith("postgresql://"):
-    DB_URL = DB_URL.replace("postgresql://", "postgresql+psycopg2://", 1)
-
-try:
-    if not DB_URL:
-        raise ValueError("DATABASE_URL environment variable is not set.")
-    engine = create_engine(DB_URL, pool_size=10, max_overflow=20)
-    logging.info("Database engine created successfully.")
-except Exception as e:
-    logging.error(f"Error creating database engine: {e}")
-    engine = None
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    if async_engine:
+        await async_engine.dispose()
 
 @app.get("/")
 def read_root():
@@ -77,63 +160,119 @@ def read_root():
 # --- API Endpoints ---
 
 @app.get("/api/platform/predictive-insights")
-def get_predictive_insights_endpoint(force_refresh: bool = False):
-    if not engine:
-        raise HTTPException(status_code=500, detail="Database connection not available.")
-    if not force_refresh and analysis_cache["data"]:
-        return analysis_cache["data"]
-    try:
-        all_data = get_data_for_predictions(engine)
-        if not all_data:
-            raise HTTPException(status_code=500, detail="Failed to fetch data for predictions.")
-        churn_results = run_churn_prediction_v2(all_data['orders'], all_data['payments'], all_data['customers'], all_data['processed_data'])
-        sales_forecasts = run_sales_forecasting_v2(all_data['processed_data'])
-        churn_df = churn_results['predictions']
-        customer_seller_map = all_data['processed_data'][['customer_unique_id', 'seller_id']].drop_duplicates()
-        seller_churn_df = pd.merge(churn_df, customer_seller_map, on='customer_unique_id')
-        seller_agg = seller_churn_df.groupby('seller_id').agg(total_customers=('customer_unique_id', 'nunique')).reset_index()
-        high_risk_customers_by_seller = seller_churn_df[seller_churn_df['churn_probability'] > 0.5].groupby('seller_id').agg(high_risk_customers=('customer_unique_id', 'nunique'), affected_gmv=('Monetary', 'sum')).reset_index()
-        seller_performance = pd.merge(seller_agg, high_risk_customers_by_seller, on='seller_id', how='left').fillna(0)
-        seller_performance['seller_churn_rate'] = (seller_performance['high_risk_customers'] / seller_performance['total_customers']) * 100
-        final_results = {
-            "churn_analysis": {
-                "predictions": churn_results["predictions"].to_dict('records'),
-                "feature_importance": churn_results["feature_importance"].to_dict('records')
-            },
-            "sales_forecast": {cat: df.to_dict('records') for cat, df in sales_forecasts.items()},
-            "seller_performance": seller_performance.to_dict('records')
+def get_predictive_insights_endpoint(request: Request, response: Response, force_refresh: bool = False,
+                                     format: str | None = None, table: str = 'sales_forecast'):
+    """
+    Serves the latest precomputed snapshot (see precompute.py). A stale snapshot is
+    still returned while a background refresh runs; force_refresh only schedules one.
+    format=columnar returns every table as {column: [...]} arrays; format=arrow (or
+    an Arrow Accept header) returns one `table` as an Arrow IPC stream. Both are
+    compressed as negotiated by Accept-Encoding.
+    """
+    if force_refresh:
+        predictive_store.refresh_in_background()
+    response_format = negotiate_format(format, request.headers.get("accept"))
+    if response_format == "arrow":
+        if table not in PAYLOAD_TABLES:
+            raise HTTPException(status_code=400, detail=f"Invalid table. Choose from: {', '.join(PAYLOAD_TABLES)}")
+        payload, manifest = predictive_store.table(table)
+    else:
+        payload, manifest = predictive_store.get(columnar=response_format == "columnar")
+    if payload is None:
+        if not engine:
+            raise HTTPException(status_code=500, detail="Database connection not available.")
+        if predictive_store.last_error and not predictive_store.is_refreshing():
+            raise HTTPException(status_code=500, detail=predictive_store.last_error)
+        raise HTTPException(status_code=503, detail="Predictive insights are being computed. Please retry shortly.", headers={"Retry-After": "60"})
+    snapshot_headers = {"X-Snapshot-Version": manifest["version"], "X-Snapshot-Created-At": manifest["created_at"]}
+    if response_format == "json":
+        response.headers.update(snapshot_headers)
+        return payload
+    # Encoded and compressed once per snapshot version, format and encoding
+    if response_format == "arrow":
+        encode, media_type, cache_key = (lambda: to_arrow_stream(payload)), ARROW_STREAM_MEDIA_TYPE, (manifest["version"], table)
+    else:
+        encode, media_type, cache_key = (lambda: dumps(payload)), JSON_MEDIA_TYPE, (manifest["version"], "columnar")
+    body, content_encoding = encode_body(encode, request.headers.get("accept-encoding"), cache_key=("predictive-insights", *cache_key))
+    return Response(content=body, media_type=media_type, headers=response_headers(content_encoding, snapshot_headers))
+
+@app.get("/api/platform/churn-predictions")
+def get_churn_predictions_endpoint(request: Request, response: Response, sort_by: str = 'churn_probability', order: str = 'DESC',
+                                   limit: int = 50, cursor: str | None = None, min_probability: float | None = None,
+                                   max_probability: float | None = None, seller_id: str | None = None,
+                                   format: str | None = None):
+    """
+    Per-customer churn predictions of the latest snapshot, filtered by probability
+    range and seller (comma-separated ids), sorted by churn_probability or Monetary.
+    The first page is the top-k; pass nextCursor as `cursor` for the following ones.
+    format=columnar returns `data` as {column: [...]} arrays; format=arrow returns
+    the page as an Arrow IPC stream with X-Total-Count / X-Next-Cursor headers.
+    """
+    index, manifest = predictive_store.churn_index()
+    if index is None:
+        raise HTTPException(status_code=503, detail="Predictive insights are being computed. Please retry shortly.", headers={"Retry-After": "60"})
+    sort_by = sort_by if sort_by in CHURN_SORT_COLUMNS else 'churn_probability'
+    order = order.upper() if order.upper() in ['ASC', 'DESC'] else 'DESC'
+    limit = min(max(limit, 1), 1000)
+    seller_ids = [item.strip() for item in seller_id.split(',') if item.strip()] if seller_id else None
+    cursor_row = None
+    if cursor:
+        try:
+            cursor_row = decode_cursor(cursor, sort_by, order, float)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    page, total_count = index.query(sort_by, order, limit, min_probability, max_probability, seller_ids, cursor_row)
+    response_format = negotiate_format(format, request.headers.get("accept"))
+    if response_format == "json":
+        predictions = page.to_dict('records')
+        response.headers["X-Snapshot-Version"] = manifest["version"]
+        return {
+            "data": predictions,
+            "totalCount": total_count,
+            "nextCursor": next_cursor(predictions, sort_by, order, sort_by, 'customer_unique_id', limit),
         }
-        analysis_cache["data"] = final_results
-        return final_results
-    except Exception as e:
-        logging.error(f"An error occurred while generating predictive insights: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    cursor_rows = page[[sort_by, 'customer_unique_id']].to_dict('records')
+    page_cursor = next_cursor(cursor_rows, sort_by, order, sort_by, 'customer_unique_id', limit)
+    headers = {"X-Snapshot-Version": manifest["version"]}
+    if response_format == "arrow":
+        headers.update({"X-Total-Count": str(total_count), "X-Next-Cursor": page_cursor or ""})
+        body, content_encoding = encode_body(lambda: to_arrow_stream(page), request.headers.get("accept-encoding"))
+        return Response(content=body, media_type=ARROW_STREAM_MEDIA_TYPE, headers=response_headers(content_encoding, headers))
+    body, content_encoding = encode_body(
+        lambda: dumps({"data": to_columns(page), "totalCount": total_count, "nextCursor": page_cursor}),
+        request.headers.get("accept-encoding"),
+    )
+    return Response(content=body, media_type=JSON_MEDIA_TYPE, headers=response_headers(content_encoding, headers))
 
 @app.get("/api/sentiment-insights")
-def get_sentiment_insights_endpoint():
+async def get_sentiment_insights_endpoint():
     """Provides aggregated data for simple sentiment analysis visualizations."""
-    if not engine:
+    if not analytics_engine:
         raise HTTPException(status_code=500, detail="Database connection not available.")
     try:
-        # 1. Overall Average Score
-        avg_score = get_average_review_score(engine)
+        # The four aggregates are independent, so they run concurrently in the threadpool
+        avg_score, dist_data, top_neg_cats_data, trend_data = await asyncio.gather(
+            run_in_threadpool(get_average_review_score, analytics_engine),
+            run_in_threadpool(get_overall_sentiment_distribution, analytics_engine),
+            run_in_threadpool(get_top_negative_categories, analytics_engine, limit=5),
+            run_in_threadpool(get_sentiment_trend_data, analytics_engine),
+        )
+
+        # 1. Overall Average Score is returned as is
 
         # 2. Sentiment Distribution
-        dist_data = get_overall_sentiment_distribution(engine)
         distribution = {row[0]: row[1] for row in dist_data}
         # Ensure all keys exist
         for key in ['positive', 'neutral', 'negative']:
             distribution.setdefault(key, 0)
 
         # 3. Top 5 Negative Categories
-        top_neg_cats_data = get_top_negative_categories(engine, limit=5)
         top_negative_categories = {
             "categories": [row[0] for row in top_neg_cats_data],
             "counts": [row[1] for row in top_neg_cats_data],
         }
 
         # 4. Sentiment Trend (keeping this as it's a simple, valuable chart)
-        trend_data = get_sentiment_trend_data(engine)
         sentiment_trend = {
             "months": [row[0] for row in trend_data],
             "positive": [row[1] for row in trend_data],
@@ -153,23 +292,43 @@ def get_sentiment_insights_endpoint():
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/api/sentiment-analysis")
-def get_sentiment_analysis_endpoint(page: int = 1, limit: int = 10):
+def get_sentiment_analysis_endpoint(page: int = 1, limit: int = 10, mode: str = 'fast'):
+    """
+    Paginated review comments with their sentiment. mode=fast scores the page with the
+    TF-IDF + LightGBM model (fast_sentiment.py); mode=accurate serves the stored BERT
+    scores, with a 'pending' label for reviews the offline scorer has not reached yet.
+    """
     if not engine:
         raise HTTPException(status_code=500, detail="Database connection not available.")
+    if mode not in ['fast', 'accurate']:
+        raise HTTPException(status_code=400, detail="mode must be 'fast' or 'accurate'.")
+    scorer = get_fast_scorer() if mode == 'fast' else None
+    if mode == 'fast' and scorer is None:
+        logging.warning("No fast sentiment model registered (run `python -m backend.fast_sentiment`); using mode=accurate.")
+        mode = 'accurate'
     offset = (page - 1) * limit
     try:
         with engine.connect() as connection:
             count_query = text("SELECT COUNT(*) FROM order_reviews WHERE review_comment_message IS NOT NULL AND TRIM(review_comment_message) <> '';")
             total_count = connection.execute(count_query).scalar_one()
+        # Stored scores come from the offline scoring stage (sentiment_scoring.py)
         query = text("""
-            WITH seller_info AS (SELECT order_id, seller_id, ROW_NUMBER() OVER(PARTITION BY order_id ORDER BY seller_id) as rn FROM order_items)
-            SELECT r.review_id, r.order_id, r.review_score, r.review_comment_title, r.review_comment_message, r.review_creation_date, s.seller_id
-            FROM order_reviews r LEFT JOIN seller_info s ON r.order_id = s.order_id AND s.rn = 1
+            SELECT r.review_id, r.order_id, r.review_score, r.review_comment_title, r.review_comment_message, r.review_creation_date,
+                   (SELECT MIN(oi.seller_id) FROM order_items oi WHERE oi.order_id = r.order_id) as seller_id,
+                   rs.sentiment_score, rs.sentiment_label
+            FROM order_reviews r
+            LEFT JOIN review_sentiment rs ON r.review_id = rs.review_id AND r.order_id = rs.order_id AND rs.sentiment_label <> 'error'
             WHERE r.review_comment_message IS NOT NULL AND TRIM(r.review_comment_message) <> ''
             ORDER BY r.review_creation_date DESC LIMIT :limit OFFSET :offset;
         """)
-        reviews_df = pd.read_sql_query(query, engine, params={'limit': limit, 'offset': offset})
-        analyzed_reviews_df = run_sentiment_analysis(reviews_df) if not reviews_df.empty else reviews_df
+        analyzed_reviews_df = pd.read_sql_query(query, engine, params={'limit': limit, 'offset': offset})
+        if scorer is not None:
+            # The whole page is one sparse transform and one predict_proba
+            sentiments = scorer.predict(analyzed_reviews_df['review_comment_message'].tolist())
+            analyzed_reviews_df[['sentiment_score', 'sentiment_label']] = pd.DataFrame(sentiments, index=analyzed_reviews_df.index)
+        # No inference in the request: the offline scorer fills these in after each load
+        analyzed_reviews_df['sentiment_label'] = analyzed_reviews_df['sentiment_label'].fillna('pending')
+        analyzed_reviews_df['sentiment_score'] = analyzed_reviews_df['sentiment_score'].map(lambda score: None if pd.isna(score) else int(score))
         distribution_query = text("""
             SELECT CASE WHEN review_score >= 4 THEN 'positive' WHEN review_score <= 2 THEN 'negative' ELSE 'neutral' END as sentiment_label, COUNT(*)
             FROM order_reviews WHERE review_comment_message IS NOT NULL AND TRIM(review_comment_message) <> '' GROUP BY sentiment_label;
@@ -179,6 +338,8 @@ def get_sentiment_analysis_endpoint(page: int = 1, limit: int = 10):
         for key in ['positive', 'neutral', 'negative']:
             distribution.setdefault(key, 0)
         return {
+            "mode": mode,
+            "model": scorer.model_name if scorer else None,
             "distribution": distribution,
             "reviews": {"data": analyzed_reviews_df.to_dict('records'), "totalCount": total_count}
         }
@@ -187,84 +348,65 @@ def get_sentiment_analysis_endpoint(page: int = 1, limit: int = 10):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/api/v2/sellers")
-def get_sellers_endpoint(sort_by: str = 'total_revenue', order: str = 'DESC', page: int = 1, limit: int = 10):
-    if not engine:
+async def get_sellers_endpoint(sort_by: str = 'total_revenue', order: str = 'DESC', page: int = 1, limit: int = 10,
+                               cursor: str | None = None, include_total: bool = True):
+    """Lists sellers. Pass the returned nextCursor as `cursor` to seek to the next page instead of using `page`."""
+    if not async_engine:
         raise HTTPException(status_code=500, detail="Database connection not available.")
-    offset = (page - 1) * limit
     sort_by = sort_by if sort_by in ['total_revenue', 'unique_order_count'] else 'total_revenue'
     order = order.upper() if order.upper() in ['ASC', 'DESC'] else 'DESC'
+    params = {'limit': limit, 'offset': 0 if cursor else (page - 1) * limit}
+    where = ""
+    if cursor:
+        try:
+            params['cursor_sort'], params['cursor_tie'] = decode_cursor(cursor, sort_by, order, CURSOR_SORT_TYPES.get(sort_by))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        where = "WHERE " + keyset_condition(sort_by, "seller_id", order)
+    # seller_metrics is a materialized view with an index per sort column (see schema.sql)
     query = text(f"""
-        WITH seller_metrics AS (
-            SELECT s.seller_id, s.seller_city, s.seller_state,
-                   COALESCE(SUM(oi.price), 0) AS total_revenue,
-                   COALESCE(COUNT(DISTINCT oi.order_id), 0) AS unique_order_count
-            FROM sellers s LEFT JOIN order_items oi ON s.seller_id = oi.seller_id
-            GROUP BY s.seller_id, s.seller_city, s.seller_state)
         SELECT seller_id, seller_city, seller_state, total_revenue, unique_order_count
-        FROM seller_metrics ORDER BY {sort_by} {order} LIMIT :limit OFFSET :offset;
+        FROM seller_metrics {where}
+        ORDER BY {sort_by} {order}, seller_id {order} LIMIT :limit OFFSET :offset;
     """)
     try:
-        with engine.connect() as connection:
-            sellers_result = connection.execute(query, {'limit': limit, 'offset': offset})
-            sellers = sellers_result.mappings().all()
-            total_count = connection.execute(text("SELECT COUNT(*) FROM sellers;")).scalar_one()
+        # The page and the (cached) total run concurrently on separate pooled connections
+        sellers, total_count = await asyncio.gather(
+            fetch_all(async_engine, query, params),
+            _cached_total("SELECT COUNT(*) FROM sellers;") if include_total else _none(),
+        )
         results = {
             "data": sellers,
-            "totalCount": total_count
+            "totalCount": total_count,
+            "nextCursor": next_cursor(sellers, sort_by, order, sort_by, 'seller_id', limit)
         }
         return results
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/v2/sellers/{seller_id}")
-def get_seller_details_endpoint(seller_id: str):
-    if not engine:
+async def get_seller_details_endpoint(seller_id: str):
+    if not async_engine:
         raise HTTPException(status_code=500, detail="Database connection not available.")
 
+    # KPIs cover delivered orders only; sellers without any sale have no first_sale_date
     query = text("""
-        WITH seller_base AS (
-            SELECT
-                s.seller_id,
-                s.seller_city,
-                s.seller_state,
-                MIN(oi.shipping_limit_date) as first_sale_date
-            FROM sellers s
-            JOIN order_items oi ON s.seller_id = oi.seller_id
-            WHERE s.seller_id = :seller_id
-            GROUP BY s.seller_id, s.seller_city, s.seller_state
-        ),
-        seller_kpis AS (
-            SELECT
-                oi.seller_id,
-                SUM(oi.price) as total_revenue,
-                COUNT(DISTINCT oi.order_id) as total_orders,
-                COUNT(DISTINCT oi.product_id) as distinct_products_sold,
-                AVG(r.review_score) as average_review_score,
-                SUM(CASE WHEN o.order_delivered_customer_date <= o.order_estimated_delivery_date THEN 1 ELSE 0 END) as on_time_deliveries,
-                COUNT(o.order_id) as total_delivered_orders
-            FROM order_items oi
-            JOIN orders o ON oi.order_id = o.order_id
-            LEFT JOIN order_reviews r ON o.order_id = r.order_id
-            WHERE oi.seller_id = :seller_id AND o.order_status = 'delivered'
-            GROUP BY oi.seller_id
-        )
         SELECT
-            b.seller_id,
-            b.seller_city,
-            b.seller_state,
-            b.first_sale_date,
-            k.total_revenue,
-            k.total_orders,
-            k.distinct_products_sold,
-            k.average_review_score,
-            (CAST(k.on_time_deliveries AS FLOAT) / k.total_delivered_orders) * 100 as on_time_delivery_rate
-        FROM seller_base b
-        LEFT JOIN seller_kpis k ON b.seller_id = k.seller_id;
+            seller_id,
+            seller_city,
+            seller_state,
+            first_sale_date,
+            delivered_revenue as total_revenue,
+            delivered_orders as total_orders,
+            distinct_products_sold,
+            average_review_score,
+            on_time_delivery_rate
+        FROM seller_metrics
+        WHERE seller_id = :seller_id AND first_sale_date IS NOT NULL;
     """)
 
     try:
-        with engine.connect() as connection:
-            result = connection.execute(query, {'seller_id': seller_id}).mappings().first()
+        result = await fetch_first(async_engine, query, {'seller_id': seller_id})
 
         if not result:
             raise HTTPException(status_code=404, detail="Seller not found")
@@ -277,8 +419,8 @@ def get_seller_details_endpoint(seller_id: str):
         raise e
 
 @app.get("/api/v2/sellers/{seller_id}/sales-trend")
-def get_seller_sales_trend_endpoint(seller_id: str):
-    if not engine:
+async def get_seller_sales_trend_endpoint(seller_id: str):
+    if not async_engine:
         raise HTTPException(status_code=500, detail="Database connection not available.")
 
     query = text("""
@@ -293,8 +435,7 @@ def get_seller_sales_trend_endpoint(seller_id: str):
     """)
 
     try:
-        with engine.connect() as connection:
-            result = connection.execute(query, {'seller_id': seller_id}).mappings().all()
+        result = await fetch_all(async_engine, query, {'seller_id': seller_id})
         
         if not result:
             # Return empty list if seller exists but has no sales
@@ -306,8 +447,8 @@ def get_seller_sales_trend_endpoint(seller_id: str):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/api/v2/sellers/{seller_id}/category-distribution")
-def get_seller_category_distribution_endpoint(seller_id: str):
-    if not engine:
+async def get_seller_category_distribution_endpoint(seller_id: str):
+    if not async_engine:
         raise HTTPException(status_code=500, detail="Database connection not available.")
 
     query = text("""
@@ -323,8 +464,7 @@ def get_seller_category_distribution_endpoint(seller_id: str):
     """)
 
     try:
-        with engine.connect() as connection:
-            result = connection.execute(query, {'seller_id': seller_id}).mappings().all()
+        result = await fetch_all(async_engine, query, {'seller_id': seller_id})
         
         if not result:
             return []
@@ -335,8 +475,8 @@ def get_seller_category_distribution_endpoint(seller_id: str):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/api/v2/sellers/{seller_id}/top-products")
-def get_seller_top_products_endpoint(seller_id: str, limit: int = 5):
-    if not engine:
+async def get_seller_top_products_endpoint(seller_id: str, limit: int = 5):
+    if not async_engine:
         raise HTTPException(status_code=500, detail="Database connection not available.")
 
     query = text("""
@@ -354,8 +494,7 @@ def get_seller_top_products_endpoint(seller_id: str, limit: int = 5):
     """)
 
     try:
-        with engine.connect() as connection:
-            result = connection.execute(query, {'seller_id': seller_id, 'limit': limit}).mappings().all()
+        result = await fetch_all(async_engine, query, {'seller_id': seller_id, 'limit': limit})
         
         if not result:
             return []
@@ -366,8 +505,8 @@ def get_seller_top_products_endpoint(seller_id: str, limit: int = 5):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/api/v2/sellers/{seller_id}/review-distribution")
-def get_seller_review_distribution_endpoint(seller_id: str):
-    if not engine:
+async def get_seller_review_distribution_endpoint(seller_id: str):
+    if not async_engine:
         raise HTTPException(status_code=500, detail="Database connection not available.")
 
     query = text("""
@@ -382,8 +521,7 @@ def get_seller_review_distribution_endpoint(seller_id: str):
     """)
 
     try:
-        with engine.connect() as connection:
-            result = connection.execute(query, {'seller_id': seller_id}).mappings().all()
+        result = await fetch_all(async_engine, query, {'seller_id': seller_id})
         
         # Ensure all scores from 1 to 5 are present, even if count is 0
         score_map = {item['review_score']: item['count'] for item in result}
@@ -395,8 +533,8 @@ def get_seller_review_distribution_endpoint(seller_id: str):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/api/v2/sellers/{seller_id}/recent-orders")
-def get_seller_recent_orders_endpoint(seller_id: str, limit: int = 5):
-    if not engine:
+async def get_seller_recent_orders_endpoint(seller_id: str, limit: int = 5):
+    if not async_engine:
         raise HTTPException(status_code=500, detail="Database connection not available.")
 
     query = text("""
@@ -415,8 +553,7 @@ def get_seller_recent_orders_endpoint(seller_id: str, limit: int = 5):
     """)
 
     try:
-        with engine.connect() as connection:
-            result = connection.execute(query, {'seller_id': seller_id, 'limit': limit}).mappings().all()
+        result = await fetch_all(async_engine, query, {'seller_id': seller_id, 'limit': limit})
         
         if not result:
             return []
@@ -427,8 +564,8 @@ def get_seller_recent_orders_endpoint(seller_id: str, limit: int = 5):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/api/v2/sellers/{seller_id}/predictive-insights")
-def get_seller_predictive_insights_endpoint(seller_id: str):
-    if not engine:
+async def get_seller_predictive_insights_endpoint(seller_id: str):
+    if not async_engine:
         raise HTTPException(status_code=500, detail="Database connection not available.")
 
     # Note: This is a simplified version for a single seller. 
@@ -466,8 +603,7 @@ def get_seller_predictive_insights_endpoint(seller_id: str):
     """)
 
     try:
-        with engine.connect() as connection:
-            result = connection.execute(query, {'seller_id': seller_id}).mappings().first()
+        result = await fetch_first(async_engine, query, {'seller_id': seller_id})
 
         if not result:
             raise HTTPException(status_code=404, detail="No predictive data found for this seller.")
@@ -477,60 +613,212 @@ def get_seller_predictive_insights_endpoint(seller_id: str):
         logging.error(f"Error fetching predictive insights for seller {seller_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.get("/api/v2/sellers/{seller_id}/dashboard")
+async def get_seller_dashboard_endpoint(seller_id: str, top_products_limit: int = 5, recent_orders_limit: int = 5):
+    """
+    Every panel of the seller page in one round trip. The seller's order_items rows
+    are read once into a CTE and each panel is aggregated from that slice; panels
+    have the same shape as the individual /api/v2/sellers/{seller_id}/* endpoints.
+    """
+    if not async_engine:
+        raise HTTPException(status_code=500, detail="Database connection not available.")
 
+    query = text("""
+        WITH seller_items AS MATERIALIZED (
+            SELECT order_id, product_id, price FROM order_items WHERE seller_id = :seller_id
+        ),
+        item_categories AS (
+            SELECT oi.order_id, oi.product_id, COALESCE(t.product_category_name_english, p.product_category_name) as category
+            FROM seller_items oi
+            JOIN products p ON oi.product_id = p.product_id
+            LEFT JOIN product_category_name_translation t ON p.product_category_name = t.product_category_name
+        ),
+        customer_rfm AS (
+            SELECT
+                c.customer_unique_id,
+                MAX(o.order_purchase_timestamp) as last_purchase_date,
+                COUNT(DISTINCT o.order_id) as frequency,
+                SUM(op.payment_value) as monetary
+            FROM seller_items oi
+            JOIN orders o ON oi.order_id = o.order_id
+            JOIN customers c ON o.customer_id = c.customer_id
+            JOIN order_payments op ON o.order_id = op.order_id
+            GROUP BY c.customer_unique_id
+        )
+        SELECT
+            (SELECT row_to_json(d) FROM (
+                SELECT seller_id, seller_city, seller_state, first_sale_date,
+                       delivered_revenue as total_revenue, delivered_orders as total_orders,
+                       distinct_products_sold, average_review_score, on_time_delivery_rate
+                FROM seller_metrics
+                WHERE seller_id = :seller_id AND first_sale_date IS NOT NULL) d
+            ) as details,
+            (SELECT COALESCE(json_agg(s ORDER BY s.month), '[]') FROM (
+                SELECT TO_CHAR(o.order_purchase_timestamp, 'YYYY-MM') as month, SUM(oi.price) as monthly_revenue
+                FROM seller_items oi JOIN orders o ON oi.order_id = o.order_id
+                GROUP BY month) s
+            ) as sales_trend,
+            (SELECT COALESCE(json_agg(c ORDER BY c.count DESC), '[]') FROM (
+                SELECT category, COUNT(product_id) as count FROM item_categories GROUP BY category) c
+            ) as category_distribution,
+            (SELECT COALESCE(json_agg(tp ORDER BY tp.sales_count DESC), '[]') FROM (
+                SELECT product_id, category, COUNT(product_id) as sales_count
+                FROM item_categories GROUP BY product_id, category
+                ORDER BY sales_count DESC LIMIT :top_products_limit) tp
+            ) as top_products,
+            (SELECT COALESCE(json_agg(rd), '[]') FROM (
+                SELECT r.review_score, COUNT(r.review_score) as count
+                FROM order_reviews r JOIN seller_items oi ON r.order_id = oi.order_id
+                GROUP BY r.review_score) rd
+            ) as review_distribution,
+            (SELECT COALESCE(json_agg(ro ORDER BY ro.order_purchase_timestamp DESC), '[]') FROM (
+                SELECT o.order_id, o.order_status, o.order_purchase_timestamp, SUM(op.payment_value) as total_value
+                FROM orders o
+                JOIN seller_items oi ON o.order_id = oi.order_id
+                JOIN order_payments op ON o.order_id = op.order_id
+                GROUP BY o.order_id, o.order_status, o.order_purchase_timestamp
+                ORDER BY o.order_purchase_timestamp DESC
+                LIMIT :recent_orders_limit) ro
+            ) as recent_orders,
+            (SELECT row_to_json(pi) FROM (
+                SELECT
+                    CAST(:seller_id AS TEXT) as seller_id,
+                    EXTRACT(DAY FROM NOW() - MAX(last_purchase_date)) as recency,
+                    AVG(frequency) as average_frequency,
+                    AVG(monetary) as average_monetary_value,
+                    (SUM(CASE WHEN NOW() - last_purchase_date > INTERVAL '180 days' THEN 1 ELSE 0 END) * 100.0 / COUNT(customer_unique_id)) as churn_rate
+                FROM customer_rfm
+                HAVING COUNT(*) > 0) pi
+            ) as predictive_insights;
+    """).columns(details=JSON, sales_trend=JSON, category_distribution=JSON, top_products=JSON,
+                 review_distribution=JSON, recent_orders=JSON, predictive_insights=JSON)
+    params = {'seller_id': seller_id, 'top_products_limit': top_products_limit, 'recent_orders_limit': recent_orders_limit}
+
+    try:
+        result = await fetch_first(async_engine, query, params)
+    except Exception as e:
+        logging.error(f"Error fetching dashboard for seller {seller_id}: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+    if not result or result['details'] is None:
+        raise HTTPException(status_code=404, detail="Seller not found")
+
+    score_map = {item['review_score']: item['count'] for item in result['review_distribution']}
+    return {
+        "details": result['details'],
+        "sales_trend": result['sales_trend'],
+        "category_distribution": result['category_distribution'],
+        "top_products": result['top_products'],
+        "review_distribution": [{"review_score": i, "count": score_map.get(i, 0)} for i in range(1, 6)],
+        "recent_orders": result['recent_orders'],
+        "predictive_insights": result['predictive_insights'],
+    }
 
 @app.get("/api/sellers")
-def get_sellers_legacy_endpoint(sort_by: str = 'total_revenue', order: str = 'DESC', page: int = 1, limit: int = 10):
+async def get_sellers_legacy_endpoint(sort_by: str = 'total_revenue', order: str = 'DESC', page: int = 1, limit: int = 10):
     """Legacy endpoint for fetching sellers. Aliases to /api/v2/sellers."""
-    return get_sellers_endpoint(sort_by, order, page, limit)
+    return await get_sellers_endpoint(sort_by, order, page, limit, cursor=None, include_total=True)
 
 @app.get("/api/v2/products")
-def get_products_endpoint(sort_by: str = 'sales_count', order: str = 'DESC', page: int = 1, limit: int = 10):
-    if not engine:
+async def get_products_endpoint(sort_by: str = 'sales_count', order: str = 'DESC', page: int = 1, limit: int = 10,
+                                cursor: str | None = None, include_total: bool = True):
+    """Lists products with sales. Pass the returned nextCursor as `cursor` to seek to the next page."""
+    if not async_engine:
         raise HTTPException(status_code=500, detail="Database connection not available.")
-    offset = (page - 1) * limit
     sort_by = sort_by if sort_by in ['sales_count', 'product_id', 'category'] else 'sales_count'
     order = order.upper() if order.upper() in ['ASC', 'DESC'] else 'DESC'
+    # Uncategorized products sort as an empty string so the keyset comparison never sees NULL
+    sort_expr = "COALESCE(category, '')" if sort_by == 'category' else sort_by
+    params = {'limit': limit, 'offset': 0 if cursor else (page - 1) * limit}
+    where = ""
+    if cursor:
+        try:
+            params['cursor_sort'], params['cursor_tie'] = decode_cursor(cursor, sort_by, order, CURSOR_SORT_TYPES.get(sort_by))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        where = "WHERE " + keyset_condition(sort_expr, "product_id", order)
     query = text(f"""
-        SELECT
-            p.product_id, MAX(oi.seller_id) as seller_id, COALESCE(t.product_category_name_english, p.product_category_name) as category, COUNT(oi.product_id) AS sales_count
-        FROM order_items oi JOIN products p ON oi.product_id = p.product_id
-        LEFT JOIN product_category_name_translation t ON p.product_category_name = t.product_category_name
-        GROUP BY p.product_id, category ORDER BY {sort_by} {order} LIMIT :limit OFFSET :offset;
+        WITH product_metrics AS (
+            SELECT
+                p.product_id, MAX(oi.seller_id) as seller_id, COALESCE(t.product_category_name_english, p.product_category_name) as category, COUNT(oi.product_id) AS sales_count
+            FROM order_items oi JOIN products p ON oi.product_id = p.product_id
+            LEFT JOIN product_category_name_translation t ON p.product_category_name = t.product_category_name
+            GROUP BY p.product_id, category)
+        SELECT product_id, seller_id, category, sales_count
+        FROM product_metrics {where}
+        ORDER BY {sort_expr} {order}, product_id {order} LIMIT :limit OFFSET :offset;
     """)
     try:
-        with engine.connect() as connection:
-            products_result = connection.execute(query, {'limit': limit, 'offset': offset})
-            products = products_result.mappings().all()
-            total_count = connection.execute(text("SELECT COUNT(DISTINCT product_id) FROM order_items;")).scalar_one()
+        # The page and the (cached) total run concurrently on separate pooled connections
+        products, total_count = await asyncio.gather(
+            fetch_all(async_engine, query, params),
+            _cached_total("SELECT COUNT(DISTINCT product_id) FROM order_items;") if include_total else _none(),
+        )
+        next_page = None
+        if len(products) == limit:
+            last = products[-1]
+            sort_value = (last['category'] or '') if sort_by == 'category' else last[sort_by]
+            next_page = encode_cursor(sort_by, order, sort_value, last['product_id'])
         results = {
             "data": products,
-            "totalCount": total_count
+            "totalCount": total_count,
+            "nextCursor": next_page
         }
         return results
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/v2/orders")
-def get_orders_log_endpoint(sort_by: str = 'order_purchase_timestamp', order: str = 'DESC', page: int = 1, limit: int = 10):
-    if not engine:
+async def get_orders_log_endpoint(sort_by: str = 'order_purchase_timestamp', order: str = 'DESC', page: int = 1, limit: int = 10,
+                                  cursor: str | None = None, include_total: bool = True):
+    """Lists orders. Pass the returned nextCursor as `cursor` to seek to the next page instead of using `page`."""
+    if not async_engine:
         raise HTTPException(status_code=500, detail="Database connection not available.")
-    offset = (page - 1) * limit
     sort_by = sort_by if sort_by in ['order_purchase_timestamp', 'order_id', 'customer_unique_id', 'order_status', 'total_value'] else 'order_purchase_timestamp'
     order = order.upper() if order.upper() in ['ASC', 'DESC'] else 'DESC'
-    query = text(f"""
-        SELECT o.order_id, c.customer_unique_id, o.order_status, o.order_purchase_timestamp, SUM(op.payment_value) as total_value
-        FROM orders o JOIN customers c ON o.customer_id = c.customer_id JOIN order_payments op ON o.order_id = op.order_id
-        GROUP BY o.order_id, c.customer_unique_id ORDER BY {sort_by} {order} LIMIT :limit OFFSET :offset;
-    """)
+    params = {'limit': limit, 'offset': 0 if cursor else (page - 1) * limit}
+    if cursor:
+        try:
+            params['cursor_sort'], params['cursor_tie'] = decode_cursor(cursor, sort_by, order, CURSOR_SORT_TYPES.get(sort_by))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if sort_by in ['order_purchase_timestamp', 'order_id', 'order_status']:
+        # The sort key lives on orders: pick the page first, then aggregate payments for those rows only
+        keyset = ("AND " + keyset_condition(f"o.{sort_by}", "o.order_id", order)) if cursor else ""
+        query = text(f"""
+            WITH page AS (
+                SELECT o.order_id, o.customer_id, o.order_status, o.order_purchase_timestamp
+                FROM orders o
+                WHERE EXISTS (SELECT 1 FROM order_payments op WHERE op.order_id = o.order_id) {keyset}
+                ORDER BY o.{sort_by} {order}, o.order_id {order} LIMIT :limit OFFSET :offset)
+            SELECT p.order_id, c.customer_unique_id, p.order_status, p.order_purchase_timestamp, SUM(op.payment_value) as total_value
+            FROM page p JOIN customers c ON p.customer_id = c.customer_id JOIN order_payments op ON p.order_id = op.order_id
+            GROUP BY p.order_id, c.customer_unique_id, p.order_status, p.order_purchase_timestamp
+            ORDER BY p.{sort_by} {order}, p.order_id {order};
+        """)
+    else:
+        # The sort key is computed per order, so every page still aggregates all orders; the
+        # cursor only saves the OFFSET scan here (there is no index to seek on)
+        where = ("WHERE " + keyset_condition(sort_by, "order_id", order)) if cursor else ""
+        query = text(f"""
+            WITH order_totals AS (
+                SELECT o.order_id, c.customer_unique_id, o.order_status, o.order_purchase_timestamp, SUM(op.payment_value) as total_value
+                FROM orders o JOIN customers c ON o.customer_id = c.customer_id JOIN order_payments op ON o.order_id = op.order_id
+                GROUP BY o.order_id, c.customer_unique_id)
+            SELECT order_id, customer_unique_id, order_status, order_purchase_timestamp, total_value
+            FROM order_totals {where}
+            ORDER BY {sort_by} {order}, order_id {order} LIMIT :limit OFFSET :offset;
+        """)
     try:
-        with engine.connect() as connection:
-            orders_result = connection.execute(query, {'limit': limit, 'offset': offset})
-            orders = orders_result.mappings().all()
-            total_count = connection.execute(text("SELECT COUNT(*) FROM orders;")).scalar_one()
+        # The page and the (cached) total run concurrently on separate pooled connections
+        orders, total_count = await asyncio.gather(
+            fetch_all(async_engine, query, params),
+            _cached_total("SELECT COUNT(*) FROM orders;") if include_total else _none(),
+        )
         results = {
             "data": orders,
-            "totalCount": total_count
+            "totalCount": total_count,
+            "nextCursor": next_cursor(orders, sort_by, order, sort_by, 'order_id', limit)
         }
         return results
     except Exception as e:
@@ -540,10 +828,10 @@ def get_orders_log_endpoint(sort_by: str = 'order_purchase_timestamp', order: st
 
 @app.get("/api/platform/sales-by-region")
 def get_sales_by_region_endpoint():
-    if not engine:
+    if not analytics_engine:
         raise HTTPException(status_code=500, detail="Database connection not available.")
     try:
-        sales_by_region = get_sales_by_region(engine)
+        sales_by_region = get_sales_by_region(analytics_engine)
         return {str(row[0]).upper(): row[1] for row in sales_by_region}
     except Exception as e:
         logging.error(f"An error occurred while fetching sales by region: {e}")
@@ -551,10 +839,10 @@ def get_sales_by_region_endpoint():
 
 @app.get("/api/platform/order-status-distribution")
 def get_order_status_distribution_endpoint():
-    if not engine:
+    if not analytics_engine:
         raise HTTPException(status_code=500, detail="Database connection not available.")
     try:
-        distribution = get_order_status_distribution(engine)
+        distribution = get_order_status_distribution(analytics_engine)
         return {row[0]: row[1] for row in distribution}
     except Exception as e:
         logging.error(f"An error occurred while fetching order status distribution: {e}")
@@ -562,10 +850,10 @@ def get_order_status_distribution_endpoint():
 
 @app.get("/api/platform/payment-method-distribution")
 def get_payment_method_distribution_endpoint():
-    if not engine:
+    if not analytics_engine:
         raise HTTPException(status_code=500, detail="Database connection not available.")
     try:
-        distribution = get_payment_method_distribution(engine)
+        distribution = get_payment_method_distribution(analytics_engine)
         return {row[0]: row[1] for row in distribution}
     except Exception as e:
         logging.error(f"An error occurred while fetching payment method distribution: {e}")
@@ -573,10 +861,10 @@ def get_payment_method_distribution_endpoint():
 
 @app.get("/api/platform/revenue-trend")
 def get_revenue_trend_endpoint():
-    if not engine:
+    if not analytics_engine:
         raise HTTPException(status_code=500, detail="Database connection not available.")
     try:
-        trend_data = get_revenue_trend(engine)
+        trend_data = get_revenue_trend(analytics_engine)
         return {
             "series": [{"name": "Revenue", "data": [float(row[1]) for row in trend_data]}],
             "categories": [row[0] for row in trend_data]
@@ -587,16 +875,46 @@ def get_revenue_trend_endpoint():
 
 @app.get("/api/platform/kpis")
 def get_kpis_endpoint():
-    if not engine:
+    if not analytics_engine:
         raise HTTPException(status_code=500, detail="Database connection not available.")
     try:
-        kpis = get_platform_kpis(engine)
-        kpis.update({"revenue_growth": 12.5, "orders_growth": 8.2, "customers_growth": 15.1, "sellers_growth": 2.3})
+        # The cached dict is shared between requests, so extend a copy
+        kpis = {**get_platform_kpis(analytics_engine), "revenue_growth": 12.5, "orders_growth": 8.2, "customers_growth": 15.1, "sellers_growth": 2.3}
         return kpis
     except Exception as e:
         logging.error(f"An error occurred while fetching platform KPIs: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.get("/api/platform/basket-rules")
+def get_basket_rules_endpoint(response: Response, level: str = 'category', antecedent: str | None = None,
+                              consequent: str | None = None, min_confidence: float = 0.0, min_lift: float = 1.0,
+                              limit: int = 50):
+    """
+    Association rules mined from multi-item orders (see basket_rules.py), strongest
+    first. `antecedent` / `consequent` take comma-separated items (categories, or
+    product ids at level=product); a rule matches if its side contains all of them.
+    """
+    if level not in BASKET_LEVELS:
+        raise HTTPException(status_code=400, detail=f"level must be one of {', '.join(BASKET_LEVELS)}.")
+    rules, manifest = basket_rules_store.get(level)
+    if rules is None:
+        raise HTTPException(status_code=404, detail=f"No {level} basket rules have been mined yet.")
+    antecedents = [item.strip() for item in antecedent.split(',') if item.strip()] if antecedent else None
+    consequents = [item.strip() for item in consequent.split(',') if item.strip()] if consequent else None
+    matches = filter_rules(rules, antecedents, consequents, min_confidence, min_lift, min(max(limit, 1), 500))
+    response.headers["X-Rules-Version"] = manifest["version"]
+    return {
+        "level": level,
+        "version": manifest["version"],
+        "orders": manifest["orders"],
+        "rules": to_records(matches),
+    }
+
+@app.get("/api/platform/cache-stats")
+def get_cache_stats_endpoint():
+    """Hit/miss counters of the aggregate query cache (see query_cache.py)."""
+    return cache_stats()
+
 # ... (and so on for all other endpoints)
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000)) 
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Olist Seller Success - Model Registry
+
+Stores fitted models as versioned artifacts on disk so the API only has to load
+them and score fresh features:
+
+    <MODEL_REGISTRY_DIR>/<model_name>/<version>/model.joblib
+    <MODEL_REGISTRY_DIR>/<model_name>/<version>/metadata.json
+    <MODEL_REGISTRY_DIR>/<model_name>/LATEST
+"""
+
+import os
+import json
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+import joblib
+
+# --- Paths ---
+BASE_DIR = Path(__file__).resolve().parent
+MODEL_REGISTRY_DIR = Path(os.getenv("MODEL_REGISTRY_DIR", BASE_DIR.parent / "artifacts" / "models"))
+LATEST_POINTER = "LATEST"
+MODEL_FILE = "model.joblib"
+METADATA_FILE = "metadata.json"
+
+
+def save_model(model_name: str, artifact: dict, metadata: dict, registry_dir: Path = MODEL_REGISTRY_DIR) -> dict:
+    """
+    Persists `artifact` (a dict of fitted objects) with its metadata as a new
+    version and points LATEST at it. Returns the stored metadata.
+    """
+    created_at = datetime.now(timezone.utc)
+    version = created_at.strftime("%Y%m%dT%H%M%S%fZ")
+    model_dir = registry_dir / model_name
+    tmp_dir = model_dir / f".{version}.tmp"
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+
+    metadata = {**metadata, "model_name": model_name, "version": version, "created_at": created_at.isoformat()}
+    joblib.dump(artifact, tmp_dir / MODEL_FILE)
+    with open(tmp_dir / METADATA_FILE, 'w') as f:
+        json.dump(metadata, f, indent=2, default=str)
+
+    os.replace(tmp_dir, model_dir / version)
+    pointer_tmp = model_dir / f".{LATEST_POINTER}.tmp"
+    pointer_tmp.write_text(version)
+    os.replace(pointer_tmp, model_dir / LATEST_POINTER)
+    logging.info(f"Saved model {model_name} version {version} to {model_dir}")
+    return metadata
+
+def latest_version(model_name: str, registry_dir: Path = MODEL_REGISTRY_DIR) -> str | None:
+    """Returns the version LATEST points at, or None if the model was never saved."""
+    try:
+        return (registry_dir / model_name / LATEST_POINTER).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+def load_model(model_name: str, version: str | None = None, registry_dir: Path = MODEL_REGISTRY_DIR):
+    """Loads a model version (the latest by default). Returns (artifact, metadata) or (None, None)."""
+    model_dir = registry_dir / model_name
+    try:
+        version = version or (model_dir / LATEST_POINTER).read_text().strip()
+        with open(model_dir / version / METADATA_FILE) as f:
+            metadata = json.load(f)
+        artifact = joblib.load(model_dir / version / MODEL_FILE)
+        return artifact, metadata
+    except FileNotFoundError:
+        return None, None
+    except Exception as e:
+        logging.error(f"Could not load model {model_name} version {version}: {e}")
+        return None, None
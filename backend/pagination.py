@@ -0,0 +1,92 @@
+"""
+Keyset (cursor) pagination helpers for the list endpoints.
+
+A cursor is an opaque, URL-safe token that encodes the sort column, direction
+and the (sort value, tie-break id) of the last row of the previous page. The
+next page seeks past that row instead of skipping rows with OFFSET.
+"""
+
+import os
+import base64
+import json
+import threading
+import time
+from sqlalchemy import text
+
+# --- Parameters ---
+COUNT_CACHE_TTL_SECONDS = int(os.getenv("COUNT_CACHE_TTL_SECONDS", 300))
+
+
+def encode_cursor(sort_by: str, order: str, sort_value, tie_value) -> str:
+    payload = json.dumps({"s": sort_by, "o": order, "k": sort_value, "t": tie_value}, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str, sort_by: str, order: str, sort_type=None):
+    """
+    Returns (sort value, tie value). Raises ValueError for malformed cursors or a different sort.
+    `sort_type` converts the JSON sort value back to the column's Python type (asyncpg binds strictly).
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        sort_value, tie_value = payload["k"], payload["t"]
+        if sort_type is not None and sort_value is not None:
+            sort_value = sort_type(sort_value)
+    except Exception:
+        raise ValueError("Malformed cursor.")
+    if payload.get("s") != sort_by or payload.get("o") != order:
+        raise ValueError("Cursor was issued for a different sort order.")
+    return sort_value, tie_value
+
+def keyset_condition(sort_expr: str, tie_expr: str, order: str) -> str:
+    """SQL predicate selecting rows strictly after the cursor row in the given order."""
+    operator = '<' if order == 'DESC' else '>'
+    return f"({sort_expr}, {tie_expr}) {operator} (:cursor_sort, :cursor_tie)"
+
+def next_cursor(rows, sort_by: str, order: str, sort_key: str, tie_key: str, limit: int):
+    """Cursor for the page after `rows`, or None if this was the last page."""
+    if len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(sort_by, order, last[sort_key], last[tie_key])
+
+
+# --- Cached Totals ---
+# Entries are (count, stored_at, data version): a load invalidates them before the TTL runs out
+_count_cache = {}
+_count_cache_lock = threading.Lock()
+
+def _cached_count(query: str, ttl_seconds: int, version):
+    with _count_cache_lock:
+        cached = _count_cache.get(query)
+    if cached and cached[2] == version and time.monotonic() - cached[1] < ttl_seconds:
+        return cached[0]
+    return None
+
+def _store_count(query: str, count: int, version):
+    with _count_cache_lock:
+        _count_cache[query] = (count, time.monotonic(), version)
+
+def get_cached_count(connection, query: str, ttl_seconds: int = COUNT_CACHE_TTL_SECONDS, version=None) -> int:
+    """
+    Runs a COUNT query at most once per TTL and dataset version (see
+    query_cache.get_data_version) and serves the cached value in between.
+    """
+    count = _cached_count(query, ttl_seconds, version)
+    if count is None:
+        count = connection.execute(text(query)).scalar_one()
+        _store_count(query, count, version)
+    return count
+
+async def get_cached_count_async(engine, query: str, ttl_seconds: int = COUNT_CACHE_TTL_SECONDS, version=None) -> int:
+    """get_cached_count for an async engine; only opens a connection on a cache miss."""
+    count = _cached_count(query, ttl_seconds, version)
+    if count is None:
+        async with engine.connect() as connection:
+            count = (await connection.execute(text(query))).scalar_one()
+        _store_count(query, count, version)
+    return count
+
+def clear_count_cache():
+    with _count_cache_lock:
+        _count_cache.clear()
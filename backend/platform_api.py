@@ -9,6 +9,7 @@ import pandas as pd
 
 # Import the main pipeline function from our refactored script
 from predictive_analysis import main as run_predictive_pipeline
+from dataset_cache import load_dataset
 
 # --- App Initialization ---
 app = FastAPI(
@@ -94,10 +95,10 @@ def get_predictive_insights(force_refresh: bool = False):
 
     # --- Seller Performance Aggregation ---
     try:
-        # Load necessary files for mapping
-        orders_df = pd.read_csv(ORDERS_PATH)
-        order_items_df = pd.read_csv(ORDER_ITEMS_PATH)
-        customers_df = pd.read_csv(CUSTOMERS_PATH)
+        # Load only the key columns needed for mapping, from the Parquet cache
+        orders_df = load_dataset(ORDERS_PATH, ['order_id', 'customer_id'])
+        order_items_df = load_dataset(ORDER_ITEMS_PATH, ['order_id', 'seller_id'])
+        customers_df = load_dataset(CUSTOMERS_PATH, ['customer_id', 'customer_unique_id'])
 
         # Create mappings: customer_unique_id -> customer_id -> order_id -> seller_id
         customer_map = customers_df[['customer_id', 'customer_unique_id']]
@@ -128,7 +129,8 @@ def get_predictive_insights(force_refresh: bool = False):
         ).reset_index()
 
         # Combine aggregations
-        seller_performance = pd.merge(seller_agg, high_risk_customers_by_seller, on='seller_id', how='left').fillna(0)
+        seller_performance = pd.merge(seller_agg, high_risk_customers_by_seller, on='seller_id', how='left')
+        seller_performance = seller_performance.fillna({'high_risk_customers': 0, 'affected_gmv': 0})
 
         # Calculate churn rate
         seller_performance['seller_churn_rate'] = (seller_performance['high_risk_customers'] / seller_performance['total_customers']) * 100
@@ -0,0 +1,404 @@
+# -*- coding: utf-8 -*-
+"""
+Olist Seller Success - Predictive Insights Precompute
+
+Runs the predictive pipeline (data fetch, churn model, sales forecasts and
+seller aggregation) outside of the request path and persists the result as a
+versioned snapshot on disk:
+
+    <SNAPSHOT_DIR>/<version>/predictions.parquet
+    <SNAPSHOT_DIR>/<version>/feature_importance.parquet
+    <SNAPSHOT_DIR>/<version>/sales_forecast.parquet
+    <SNAPSHOT_DIR>/<version>/seller_performance.parquet
+    <SNAPSHOT_DIR>/<version>/customer_sellers.parquet
+    <SNAPSHOT_DIR>/<version>/manifest.json
+    <SNAPSHOT_DIR>/LATEST
+
+The API loads the latest snapshot at startup and serves it stale-while-revalidate.
+The summary payload only carries churn aggregates; the per-customer predictions
+stay in memory as a sorted, filterable index (/api/platform/churn-predictions).
+Payloads are built once per version, row-oriented or columnar (response_format.py).
+
+Usage:
+    uv run python -m backend.precompute [--retrain-churn]
+"""
+
+import os
+import json
+import shutil
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from .response_format import to_columns
+from .forecasting import FORECAST_MAX_WORKERS, API_FORECAST_MAX_WORKERS
+
+# --- Paths ---
+BASE_DIR = Path(__file__).resolve().parent
+SNAPSHOT_DIR = Path(os.getenv("SNAPSHOT_DIR", BASE_DIR.parent / "artifacts" / "predictive_insights"))
+LATEST_POINTER = "LATEST"
+MANIFEST_FILE = "manifest.json"
+
+# --- Parameters ---
+SNAPSHOT_FORMAT_VERSION = 2
+SNAPSHOT_MAX_AGE_SECONDS = int(os.getenv("SNAPSHOT_MAX_AGE_SECONDS", 24 * 60 * 60))
+SNAPSHOT_REFRESH_INTERVAL_SECONDS = int(os.getenv("SNAPSHOT_REFRESH_INTERVAL_SECONDS", 0))
+SNAPSHOTS_TO_KEEP = 3
+SNAPSHOT_TABLES = ["predictions", "feature_importance", "sales_forecast", "seller_performance", "customer_sellers"]
+# Rule-based high-risk segment shown on the dashboard: active, not seen for a while, few orders
+HIGH_RISK_MIN_RECENCY_DAYS = 90
+HIGH_RISK_MAX_FREQUENCY = 2
+CHURN_PROBABILITY_THRESHOLD = 0.5
+CHURN_HISTOGRAM_BINS = 10
+CHURN_SORT_COLUMNS = ["churn_probability", "Monetary"]
+# Snapshot tables of the payload that can also be served on their own (format=arrow)
+PAYLOAD_TABLES = ["sales_forecast", "seller_performance", "feature_importance"]
+
+
+# --- Pipeline ---
+
+def build_predictive_insights(engine, churn_mode: str | None = None, forecast_workers: int | None = None):
+    """
+    Runs the full predictive pipeline. Returns (frames, metadata): the results as
+    flat DataFrames plus the versions of the models that produced them.
+    `forecast_workers` caps the Prophet fitting processes (FORECAST_MAX_WORKERS by default).
+    """
+    from .api_queries import get_data_for_predictions
+    from .predictive_analysis import run_churn_prediction_v2, run_sales_forecasting_v2, CHURN_MODE
+
+    all_data = get_data_for_predictions(engine)
+    if not all_data:
+        raise RuntimeError("Failed to fetch data for predictions.")
+    churn_results = run_churn_prediction_v2(all_data['orders'], all_data['payments'], all_data['customers'], all_data['processed_data'], mode=churn_mode or CHURN_MODE)
+    sales_forecasts = run_sales_forecasting_v2(all_data['processed_data'], max_workers=forecast_workers or FORECAST_MAX_WORKERS)
+
+    churn_df = churn_results['predictions']
+    customer_seller_map = all_data['processed_data'][['customer_unique_id', 'seller_id']].drop_duplicates()
+    seller_churn_df = pd.merge(churn_df, customer_seller_map, on='customer_unique_id')
+    seller_agg = seller_churn_df.groupby('seller_id', observed=True).agg(total_customers=('customer_unique_id', 'nunique')).reset_index()
+    high_risk_customers_by_seller = seller_churn_df[seller_churn_df['churn_probability'] > 0.5].groupby('seller_id', observed=True).agg(high_risk_customers=('customer_unique_id', 'nunique'), affected_gmv=('Monetary', 'sum')).reset_index()
+    seller_performance = pd.merge(seller_agg, high_risk_customers_by_seller, on='seller_id', how='left').fillna({'high_risk_customers': 0, 'affected_gmv': 0})
+    seller_performance['seller_churn_rate'] = (seller_performance['high_risk_customers'] / seller_performance['total_customers']) * 100
+
+    # Forecasts are stored long-form so every category fits in a single file
+    forecast_frames = [df.assign(category=category) for category, df in sales_forecasts.items()]
+    sales_forecast = pd.concat(forecast_frames, ignore_index=True) if forecast_frames else pd.DataFrame(columns=['ds', 'yhat', 'yhat_lower', 'yhat_upper', 'category'])
+
+    frames = {
+        "predictions": churn_df.reset_index(drop=True),
+        "feature_importance": churn_results['feature_importance'].reset_index(drop=True),
+        "sales_forecast": sales_forecast,
+        "seller_performance": seller_performance,
+        "customer_sellers": customer_seller_map.reset_index(drop=True),
+    }
+    metadata = {"churn_model_version": churn_results['model']['version']}
+    return frames, metadata
+
+def summarize_churn(predictions: pd.DataFrame) -> dict:
+    """Platform-level churn aggregates; the per-customer rows are served by /api/platform/churn-predictions."""
+    active = predictions['is_churn'] == 0
+    high_risk = active & (predictions['Recency'] > HIGH_RISK_MIN_RECENCY_DAYS) & (predictions['Frequency'] <= HIGH_RISK_MAX_FREQUENCY)
+    counts, edges = np.histogram(predictions['churn_probability'], bins=CHURN_HISTOGRAM_BINS, range=(0, 1))
+    return {
+        "customers": len(predictions),
+        "active_customers": int(active.sum()),
+        "high_risk_customers": int(high_risk.sum()),
+        "churn_rate": float(high_risk.sum() / active.sum() * 100) if active.any() else 0.0,
+        "affected_gmv": float(predictions.loc[high_risk, 'Monetary'].sum()),
+        "predicted_churners": int((predictions['churn_probability'] > CHURN_PROBABILITY_THRESHOLD).sum()),
+        "mean_churn_probability": float(predictions['churn_probability'].mean()) if len(predictions) else None,
+        "probability_histogram": [
+            {"bin_start": float(start), "bin_end": float(end), "customers": int(count)}
+            for start, end, count in zip(edges[:-1], edges[1:], counts)
+        ],
+    }
+
+def to_payload(frames: dict, columnar: bool = False) -> dict:
+    """
+    Converts snapshot DataFrames into the /api/platform/predictive-insights response
+    shape. Tables are lists of row dicts, or {column: array} when columnar.
+    """
+    table = to_columns if columnar else (lambda df: df.to_dict('records'))
+    sales_forecast = frames['sales_forecast']
+    return {
+        "churn_analysis": {
+            "summary": summarize_churn(frames['predictions']),
+            "feature_importance": table(frames['feature_importance'])
+        },
+        "sales_forecast": {
+            category: table(df.drop(columns='category'))
+            for category, df in sales_forecast.groupby('category', sort=False)
+        },
+        "seller_performance": table(frames['seller_performance'])
+    }
+
+
+# --- Snapshot Persistence ---
+
+def write_snapshot(frames: dict, metadata: dict | None = None, snapshot_dir: Path = SNAPSHOT_DIR) -> dict:
+    """Writes frames as a new snapshot version and atomically points LATEST at it."""
+    created_at = datetime.now(timezone.utc)
+    version = created_at.strftime("%Y%m%dT%H%M%S%fZ")
+    tmp_dir = snapshot_dir / f".{version}.tmp"
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+
+    tables = {}
+    for name in SNAPSHOT_TABLES:
+        df = frames[name]
+        df.to_parquet(tmp_dir / f"{name}.parquet", index=False)
+        tables[name] = {"rows": len(df), "columns": list(df.columns)}
+
+    manifest = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "version": version,
+        "created_at": created_at.isoformat(),
+        "tables": tables,
+        **(metadata or {}),
+    }
+    with open(tmp_dir / MANIFEST_FILE, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    os.replace(tmp_dir, snapshot_dir / version)
+    pointer_tmp = snapshot_dir / f".{LATEST_POINTER}.tmp"
+    pointer_tmp.write_text(version)
+    os.replace(pointer_tmp, snapshot_dir / LATEST_POINTER)
+    logging.info(f"Wrote predictive insights snapshot {version} to {snapshot_dir}")
+
+    _prune_snapshots(snapshot_dir, keep=version)
+    return manifest
+
+def _prune_snapshots(snapshot_dir: Path, keep: str):
+    """Removes all but the newest SNAPSHOTS_TO_KEEP snapshot versions."""
+    versions = sorted(p for p in snapshot_dir.iterdir() if p.is_dir() and not p.name.startswith('.'))
+    for path in versions[:-SNAPSHOTS_TO_KEEP]:
+        if path.name != keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+def latest_version(snapshot_dir: Path = SNAPSHOT_DIR) -> str | None:
+    """Returns the version LATEST points at, or None if no snapshot was written yet."""
+    try:
+        return (snapshot_dir / LATEST_POINTER).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+def load_snapshot(version: str | None = None, snapshot_dir: Path = SNAPSHOT_DIR):
+    """Loads a snapshot (the latest by default). Returns (frames, manifest) or (None, None)."""
+    version = version or latest_version(snapshot_dir)
+    if not version:
+        return None, None
+    path = snapshot_dir / version
+    try:
+        with open(path / MANIFEST_FILE) as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            logging.warning(f"Ignoring snapshot {version} with unsupported format {manifest.get('format_version')}.")
+            return None, None
+        frames = {name: pd.read_parquet(path / f"{name}.parquet") for name in SNAPSHOT_TABLES}
+        return frames, manifest
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        logging.error(f"Could not load snapshot {version}: {e}")
+        return None, None
+
+def refresh_snapshot(engine, snapshot_dir: Path = SNAPSHOT_DIR, churn_mode: str | None = None,
+                     forecast_workers: int | None = None) -> dict:
+    """Runs the pipeline and persists its results. Returns the new manifest."""
+    start = time.perf_counter()
+    frames, metadata = build_predictive_insights(engine, churn_mode=churn_mode, forecast_workers=forecast_workers)
+    manifest = write_snapshot(frames, metadata, snapshot_dir)
+    logging.info(f"Predictive insights snapshot refreshed in {time.perf_counter() - start:.1f}s")
+    return manifest
+
+
+# --- Churn Predictions Index ---
+
+class ChurnPredictionIndex:
+    """
+    The snapshot's per-customer predictions, pre-sorted once per sort column, so a
+    filtered top-k or keyset page is a vectorized mask plus a slice rather than a
+    sort or a dict per customer.
+    """
+
+    def __init__(self, predictions: pd.DataFrame, customer_sellers: pd.DataFrame):
+        # Ids are categoricals in the pipeline frames; categoricals sort by code, the cursors compare strings
+        predictions = predictions.astype({'customer_unique_id': str})
+        self._sorted = {}
+        for column in CHURN_SORT_COLUMNS:
+            # Descending by (value, customer id); ascending pages walk it backwards
+            frame = predictions.sort_values([column, 'customer_unique_id'], ascending=False, ignore_index=True)
+            self._sorted[column] = (
+                frame,
+                frame[column].to_numpy(),
+                frame['customer_unique_id'].to_numpy().astype(str),
+                frame['churn_probability'].to_numpy(),
+            )
+        self._seller_customers = {
+            seller_id: ids.to_numpy()
+            for seller_id, ids in customer_sellers.astype(str).groupby('seller_id')['customer_unique_id']
+        }
+
+    def query(self, sort_by: str, order: str, limit: int, min_probability: float | None = None,
+              max_probability: float | None = None, seller_ids: list | None = None, cursor=None):
+        """Returns (page, total): up to `limit` matching rows after `cursor` (sort value, customer id), and the match count."""
+        frame, values, ids, probabilities = self._sorted[sort_by]
+        if order == 'ASC':
+            frame, values, ids, probabilities = frame.iloc[::-1], values[::-1], ids[::-1], probabilities[::-1]
+        mask = np.ones(len(frame), dtype=bool)
+        if min_probability is not None:
+            mask &= probabilities >= min_probability
+        if max_probability is not None:
+            mask &= probabilities <= max_probability
+        if seller_ids is not None:
+            customers = [self._seller_customers[seller_id] for seller_id in seller_ids if seller_id in self._seller_customers]
+            mask &= np.isin(ids, np.concatenate(customers)) if customers else False
+        total = int(mask.sum())
+        if cursor is not None:
+            cursor_value, cursor_id = cursor
+            if order == 'DESC':
+                mask &= (values < cursor_value) | ((values == cursor_value) & (ids < cursor_id))
+            else:
+                mask &= (values > cursor_value) | ((values == cursor_value) & (ids > cursor_id))
+        return frame.iloc[np.flatnonzero(mask)[:limit]], total
+
+
+# --- Stale-While-Revalidate Store ---
+
+class SnapshotStore:
+    """
+    Serves the latest on-disk snapshot from memory.
+
+    Reads never run the pipeline: a stale or missing snapshot only schedules a
+    background refresh. Snapshots written by other processes (populate_db.py, the
+    CLI or another API worker) are picked up through the LATEST pointer.
+    """
+
+    def __init__(self, engine, snapshot_dir: Path = SNAPSHOT_DIR, max_age_seconds: int = SNAPSHOT_MAX_AGE_SECONDS):
+        self.engine = engine
+        self.snapshot_dir = snapshot_dir
+        self.max_age_seconds = max_age_seconds
+        self.frames = None
+        self.manifest = None
+        self._payloads = {}
+        self._churn_index = None
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+        self.last_error = None
+
+    @property
+    def version(self):
+        return self.manifest["version"] if self.manifest else None
+
+    def age_seconds(self):
+        if not self.manifest:
+            return None
+        created_at = datetime.fromisoformat(self.manifest["created_at"])
+        return (datetime.now(timezone.utc) - created_at).total_seconds()
+
+    def is_stale(self):
+        age = self.age_seconds()
+        return age is None or age > self.max_age_seconds
+
+    def is_refreshing(self):
+        return self._refresh_thread is not None and self._refresh_thread.is_alive()
+
+    def reload(self):
+        """Loads the latest snapshot from disk if it differs from the one in memory."""
+        version = latest_version(self.snapshot_dir)
+        if not version or version == self.version:
+            return False
+        frames, manifest = load_snapshot(version, self.snapshot_dir)
+        if frames is None:
+            return False
+        with self._lock:
+            self.frames, self.manifest, self._payloads, self._churn_index = frames, manifest, {}, None
+        logging.info(f"Loaded predictive insights snapshot {version}.")
+        return True
+
+    def payload(self, columnar: bool = False):
+        """Returns the JSON payload of the current snapshot, building it once per version and shape."""
+        with self._lock:
+            if columnar not in self._payloads and self.frames is not None:
+                self._payloads[columnar] = to_payload(self.frames, columnar)
+            return self._payloads.get(columnar)
+
+    def _revalidate(self):
+        self.reload()
+        if self.is_stale():
+            self.refresh_in_background()
+
+    def get(self, columnar: bool = False):
+        """Returns (payload, manifest) and schedules a background refresh when stale."""
+        self._revalidate()
+        return self.payload(columnar), self.manifest
+
+    def table(self, name: str):
+        """Returns (DataFrame, manifest) of one PAYLOAD_TABLES table of the current snapshot."""
+        self._revalidate()
+        with self._lock:
+            return (self.frames[name] if self.frames is not None else None), self.manifest
+
+    def churn_index(self):
+        """Returns (ChurnPredictionIndex, manifest) of the current snapshot, building the index once per version."""
+        self._revalidate()
+        with self._lock:
+            if self._churn_index is None and self.frames is not None:
+                self._churn_index = ChurnPredictionIndex(self.frames['predictions'], self.frames['customer_sellers'])
+            return self._churn_index, self.manifest
+
+    def refresh_in_background(self):
+        """Starts a refresh thread unless one is already running. Returns True if started."""
+        if self.engine is None:
+            return False
+        with self._lock:
+            if self.is_refreshing():
+                return False
+            self._refresh_thread = threading.Thread(target=self._refresh, name="snapshot-refresh", daemon=True)
+            self._refresh_thread.start()
+            return True
+
+    def _refresh(self):
+        try:
+            # Runs inside the API process: fit forecasts with API_FORECAST_MAX_WORKERS, not half the node
+            refresh_snapshot(self.engine, self.snapshot_dir, forecast_workers=API_FORECAST_MAX_WORKERS)
+            self.last_error = None
+            self.reload()
+        except Exception as e:
+            self.last_error = str(e)
+            logging.error(f"Background refresh of predictive insights failed: {e}")
+
+    def start_scheduler(self, interval_seconds: int = SNAPSHOT_REFRESH_INTERVAL_SECONDS):
+        """Refreshes the snapshot every interval_seconds in a daemon thread (0 disables it)."""
+        if interval_seconds <= 0:
+            return None
+
+        def _loop():
+            while True:
+                time.sleep(interval_seconds)
+                self.refresh_in_background()
+
+        thread = threading.Thread(target=_loop, name="snapshot-scheduler", daemon=True)
+        thread.start()
+        return thread
+
+
+def main():
+    """Refreshes the predictive insights snapshot from the configured database."""
+    import argparse
+    from .db import create_db_engine
+
+    parser = argparse.ArgumentParser(description="Refresh the predictive insights snapshot.")
+    parser.add_argument('--retrain-churn', action='store_true', help="Retrain the churn model instead of scoring with the registered one.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    engine = create_db_engine()
+    if engine is None:
+        raise SystemExit(1)
+    manifest = refresh_snapshot(engine, churn_mode='train' if args.retrain_churn else None)
+    print(json.dumps(manifest, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -11,53 +11,41 @@ Patch Notes (v5):
 """
 
 # --- 1. Setup and Configuration ---
+import os
 import logging
 import pandas as pd
 
-# Transformer/ML imports
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-import torch
+from .churn_features import build_rfm_features, FEATURE_COLUMNS
+from .model_registry import save_model, load_model
 
 # ML & Forecasting Imports
 from sklearn.model_selection import train_test_split, GridSearchCV
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler
-from prophet import Prophet
+from sklearn.metrics import f1_score
+from .forecasting import forecast_categories, FORECAST_MAX_WORKERS
 
 # --- Parameters ---
+CHURN_MODEL_NAME = "churn"
+# 'score' reuses the registered model, 'train' refits it on every run
+CHURN_MODES = ["score", "train"]
+CHURN_MODE = os.getenv("CHURN_MODE", "score")
+RETRAIN_CHURN_COMMAND = "uv run python -m backend.precompute --retrain-churn"
+CHURN_TRAINING_N_JOBS = int(os.getenv("CHURN_TRAINING_N_JOBS", -1))
 CHURN_DAYS_THRESHOLD = 180
 FORECAST_PERIOD_DAYS = 30
-TOP_N_CATEGORIES_FOR_FORECAST = 3
+# 0 or less forecasts every category
+TOP_N_CATEGORIES_FOR_FORECAST = int(os.getenv("TOP_N_CATEGORIES_FOR_FORECAST", 3))
 
 # --- 2. Predictive Functions ---
 
-def run_churn_prediction_v2(orders_df, payments_df, customers_df, processed_df):
-    """Builds an advanced churn prediction model with tuning and feature importance."""
-    logging.info("--- Starting Advanced Customer Churn Prediction (v2) ---")
-
-    df_rfm = pd.merge(orders_df, payments_df, on='order_id')
-    df_rfm = pd.merge(df_rfm, customers_df, on='customer_id')
-    df_rfm['order_purchase_timestamp'] = pd.to_datetime(df_rfm['order_purchase_timestamp'])
-    snapshot_date = df_rfm['order_purchase_timestamp'].max() + pd.Timedelta(days=1)
-
-    rfm = df_rfm.groupby('customer_unique_id').agg({
-        'order_purchase_timestamp': lambda date: (snapshot_date - date.max()).days,
-        'order_id': 'nunique',
-        'payment_value': 'sum'
-    })
-    rfm.rename(columns={
-        'order_purchase_timestamp': 'Recency',
-        'order_id': 'Frequency',
-        'payment_value': 'Monetary'
-    }, inplace=True)
-
-    diversity = processed_df.groupby('customer_unique_id')['product_category_name_english'].nunique().reset_index()
-    diversity.rename(columns={'product_category_name_english': 'Purchase_Diversity'}, inplace=True)
-    
-    features_df = pd.merge(rfm, diversity, on='customer_unique_id', how='left').fillna(0)
-    features_df['is_churn'] = (features_df['Recency'] > CHURN_DAYS_THRESHOLD).astype(int)
-
-    X = features_df[['Recency', 'Frequency', 'Monetary', 'Purchase_Diversity']]
+def train_churn_model(features_df: pd.DataFrame, data_watermark=None) -> dict:
+    """
+    Fits the scaler and a tuned RandomForest on churn features and stores them in
+    the model registry. Returns the artifact metadata.
+    """
+    logging.info("--- Training Churn Model ---")
+    X = features_df[FEATURE_COLUMNS]
     y = features_df['is_churn']
 
     scaler = StandardScaler()
@@ -67,12 +55,62 @@ def run_churn_prediction_v2(orders_df, payments_df, customers_df, processed_df):
     # Using a wider param_grid to encourage smoother probabilities
     param_grid = {'n_estimators': [100], 'max_depth': [5, 10], 'min_samples_leaf': [20, 50]}
     grid_search = GridSearchCV(estimator=RandomForestClassifier(random_state=42, class_weight='balanced'), 
-                               param_grid=param_grid, cv=3, n_jobs=-1, verbose=1, scoring='f1_weighted')
+                               param_grid=param_grid, cv=3, n_jobs=CHURN_TRAINING_N_JOBS, verbose=1, scoring='f1_weighted')
     grid_search.fit(X_train, y_train)
     best_model = grid_search.best_estimator_
 
+    metrics = {
+        "cv_f1_weighted": float(grid_search.best_score_),
+        "test_f1_weighted": float(f1_score(y_test, best_model.predict(X_test), average='weighted')),
+        "best_params": grid_search.best_params_,
+        "train_rows": int(len(X_train)),
+        "test_rows": int(len(X_test)),
+    }
+    logging.info(f"Churn model trained: {metrics}")
+    return save_model(CHURN_MODEL_NAME, {"scaler": scaler, "model": best_model}, {
+        "features": FEATURE_COLUMNS,
+        "churn_days_threshold": CHURN_DAYS_THRESHOLD,
+        "data_watermark": data_watermark,
+        "metrics": metrics,
+    })
+
+def load_churn_model():
+    """Loads the latest churn model if it matches the current feature set. Returns (artifact, metadata)."""
+    artifact, metadata = load_model(CHURN_MODEL_NAME)
+    if artifact is None:
+        return None, None
+    if metadata.get("features") != FEATURE_COLUMNS or metadata.get("churn_days_threshold") != CHURN_DAYS_THRESHOLD:
+        logging.warning(f"Ignoring churn model {metadata.get('version')}: trained on a different feature set.")
+        return None, None
+    return artifact, metadata
+
+def run_churn_prediction_v2(orders_df, payments_df, customers_df, processed_df, mode: str = CHURN_MODE):
+    """
+    Builds churn features and scores every customer with the churn model.
+
+    mode='score' loads the latest model from the registry and only calls predict_proba;
+    without a usable model it fails rather than training in the caller's process (this
+    runs inside the API's background refresh). mode='train' retrains first.
+    """
+    if mode not in CHURN_MODES:
+        raise ValueError(f"Unknown churn mode {mode!r}. Choose from: {', '.join(CHURN_MODES)}")
+    logging.info(f"--- Starting Advanced Customer Churn Prediction (v2, mode={mode}) ---")
+
+    features_df = build_rfm_features(orders_df, payments_df, customers_df, processed_df)
+    features_df['is_churn'] = (features_df['Recency'] > CHURN_DAYS_THRESHOLD).astype(int)
+
+    if mode == 'train':
+        data_watermark = pd.to_datetime(orders_df['order_purchase_timestamp']).max()
+        train_churn_model(features_df, data_watermark=data_watermark)
+    artifact, metadata = load_churn_model()
+    if artifact is None:
+        raise RuntimeError(f"No usable churn model is registered. Train one with `{RETRAIN_CHURN_COMMAND}`.")
+    logging.info(f"Scoring customers with churn model {metadata['version']}.")
+
+    best_model = artifact['model']
+    X_scaled = artifact['scaler'].transform(features_df[FEATURE_COLUMNS])
     importance_df = pd.DataFrame({
-        'Feature': X.columns,
+        'Feature': FEATURE_COLUMNS,
         'Importance': best_model.feature_importances_
     }).sort_values(by='Importance', ascending=False)
     
@@ -81,98 +119,19 @@ def run_churn_prediction_v2(orders_df, payments_df, customers_df, processed_df):
     
     return {
         "predictions": features_df,
-        "feature_importance": importance_df
+        "feature_importance": importance_df,
+        "model": metadata
     }
 
-def run_sales_forecasting_v2(processed_df: pd.DataFrame):
-    """Runs sales forecasting with holiday effects."""
+def run_sales_forecasting_v2(processed_df: pd.DataFrame, max_workers: int = FORECAST_MAX_WORKERS):
+    """
+    Runs sales forecasting with holiday effects for the top categories by revenue.
+    Models are fitted in up to `max_workers` processes and unchanged categories are served from cache.
+    """
     logging.info("--- Starting Advanced Sales Forecasting (v2) ---")
 
-    df = processed_df.copy()
-    df['order_purchase_timestamp'] = pd.to_datetime(df['order_purchase_timestamp'])
-    
-    top_categories = df.groupby('product_category_name_english')['price'].sum().nlargest(TOP_N_CATEGORIES_FOR_FORECAST).index
-    logging.info(f"Forecasting for top {TOP_N_CATEGORIES_FOR_FORECAST} categories: {top_categories.tolist()}")
-
-    all_forecasts = {}
-    for category in top_categories:
-        logging.info(f"--- Forecasting for category: {category} ---")
-        category_sales = df[df['product_category_name_english'] == category].copy()
-        daily_sales = category_sales.set_index('order_purchase_timestamp').resample('D')['price'].sum().reset_index()
-        daily_sales.rename(columns={'order_purchase_timestamp': 'ds', 'price': 'y'}, inplace=True)
-
-        model = Prophet(yearly_seasonality=True, weekly_seasonality=True, daily_seasonality=False)
-        model.add_country_holidays(country_name='BR')
-        model.fit(daily_sales)
-
-        future = model.make_future_dataframe(periods=FORECAST_PERIOD_DAYS)
-        forecast = model.predict(future)
+    category_revenue = processed_df.groupby('product_category_name_english', observed=True)['price'].sum().sort_values(ascending=False)
+    top_categories = category_revenue.index if TOP_N_CATEGORIES_FOR_FORECAST <= 0 else category_revenue.index[:TOP_N_CATEGORIES_FOR_FORECAST]
+    logging.info(f"Forecasting for top {len(top_categories)} categories: {top_categories.tolist()}")
 
-        forecast_data = forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].copy()
-        all_forecasts[category] = forecast_data
-        logging.info(f"Advanced forecast for '{category}' generated.")
-
-    return all_forecasts
-
-
-def run_sentiment_analysis(reviews_df: pd.DataFrame):
-    """
-    Performs sentiment analysis on review comments using a multilingual BERT model.
-    """
-    logging.info("--- Starting Sentiment Analysis using Transformer Model ---")
-    
-    # Ensure there are comments to analyze
-    if 'review_comment_message' not in reviews_df.columns or reviews_df['review_comment_message'].isnull().all():
-        logging.warning("No review comments found to analyze.")
-        reviews_df['sentiment_score'] = None
-        reviews_df['sentiment_label'] = 'no_comment'
-        return reviews_df
-
-    # Define device
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    logging.info(f"Using device: {device}")
-
-    # Load tokenizer and model
-    model_name = "nlptown/bert-base-multilingual-uncased-sentiment"
-    try:
-        tokenizer = AutoTokenizer.from_pretrained(model_name)
-        model = AutoModelForSequenceClassification.from_pretrained(model_name).to(device)
-    except Exception as e:
-        logging.error(f"Failed to load model or tokenizer: {e}")
-        reviews_df['sentiment_score'] = None
-        reviews_df['sentiment_label'] = 'error'
-        return reviews_df
-
-    def analyze_comment(comment):
-        if pd.isna(comment) or not isinstance(comment, str) or comment.strip() == "":
-            return None, 'no_comment'
-        
-        try:
-            # Tokenize the text and move to the specified device
-            inputs = tokenizer(comment, return_tensors="pt", truncation=True, max_length=512).to(device)
-            
-            # Get model output
-            with torch.no_grad():
-                logits = model(**inputs).logits
-            
-            predicted_class_id = logits.argmax().item()
-            score = predicted_class_id + 1 # Score is 1-5
-            
-            if score <= 2:
-                label = 'negative'
-            elif score == 3:
-                label = 'neutral'
-            else: # 4 or 5
-                label = 'positive'
-                
-            return score, label
-        except Exception as e:
-            logging.error(f"Error analyzing comment: '{comment[:50]}...'. Error: {e}")
-            return None, 'error'
-
-    # Apply the analysis function
-    sentiments = reviews_df['review_comment_message'].apply(analyze_comment)
-    reviews_df[['sentiment_score', 'sentiment_label']] = pd.DataFrame(sentiments.tolist(), index=reviews_df.index)
-    
-    logging.info("Sentiment analysis completed.")
-    return reviews_df
+    return forecast_categories(processed_df, top_categories.tolist(), FORECAST_PERIOD_DAYS, max_workers=max_workers)
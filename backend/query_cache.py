@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Olist Seller Success - Query Result Cache
+
+Bounded TTL + LRU cache for the aggregate queries in api_queries.py, keyed by
+engine, function name and arguments. Every entry is stamped with the dataset version
+from the `dataset_version` table, which populate_db.py (and the sentiment
+scorer) bump after changing the data, so a reload invalidates the cache without
+waiting for the TTL.
+"""
+
+import os
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import timezone
+from functools import wraps
+from sqlalchemy import text
+
+# --- Parameters ---
+QUERY_CACHE_TTL_SECONDS = int(os.getenv("QUERY_CACHE_TTL_SECONDS", 3600))
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", 256))
+# How long a read of the dataset version is trusted before asking the database again
+DATA_VERSION_CHECK_SECONDS = float(os.getenv("DATA_VERSION_CHECK_SECONDS", 10))
+
+DATA_VERSION_QUERY = text("SELECT version, loaded_at FROM dataset_version WHERE id = 1;")
+BUMP_DATA_VERSION_SQL = """
+    INSERT INTO dataset_version (id, version, loaded_at) VALUES (1, 1, NOW())
+    ON CONFLICT (id) DO UPDATE SET version = dataset_version.version + 1, loaded_at = NOW();
+"""
+
+
+# --- Dataset Version ---
+_version_cache = {}
+_version_lock = threading.Lock()
+
+def read_data_version(engine):
+    """Returns (version, loaded_at) from the database, or (None, None) if it has never been stamped."""
+    try:
+        with engine.connect() as connection:
+            row = connection.execute(DATA_VERSION_QUERY).first()
+    except Exception as e:
+        logging.warning(f"Could not read dataset version: {e}")
+        return None, None
+    if not row:
+        return None, None
+    loaded_at = row[1]
+    # The Parquet export stores timestamps as naive UTC
+    if loaded_at is not None and loaded_at.tzinfo is None:
+        loaded_at = loaded_at.replace(tzinfo=timezone.utc)
+    return row[0], loaded_at
+
+def get_data_stamp(engine, max_age_seconds: float = DATA_VERSION_CHECK_SECONDS):
+    """(version, loaded_at) of `engine`'s database, re-read at most every `max_age_seconds`."""
+    now = time.monotonic()
+    with _version_lock:
+        cached = _version_cache.get(engine)
+    if cached and now - cached[1] < max_age_seconds:
+        return cached[0]
+    stamp = read_data_version(engine)
+    with _version_lock:
+        _version_cache[engine] = (stamp, now)
+    return stamp
+
+def get_data_version(engine, max_age_seconds: float = DATA_VERSION_CHECK_SECONDS):
+    """Dataset version of `engine`'s database, re-read at most every `max_age_seconds`."""
+    return get_data_stamp(engine, max_age_seconds)[0]
+
+def bump_data_version(engine):
+    """Marks the data as changed; call after loading or rescoring data."""
+    with engine.begin() as connection:
+        connection.execute(text(BUMP_DATA_VERSION_SQL))
+    with _version_lock:
+        _version_cache.pop(engine, None)
+    logging.info("Dataset version bumped.")
+
+
+# --- Cache ---
+class QueryCache:
+    """Thread-safe LRU of (data version, expiry, value) entries with hit/miss counters."""
+
+    def __init__(self, max_entries: int = QUERY_CACHE_MAX_ENTRIES, ttl_seconds: int = QUERY_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, version):
+        """Returns (True, value) for a fresh entry of the same data version, else (False, None)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == version and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[2]
+            if entry:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, version, value):
+        with self._lock:
+            self._entries[key] = (version, time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+query_cache = QueryCache()
+
+def cached_query(func):
+    """
+    Caches an api_queries function `func(engine, *args, **kwargs)` by engine, name
+    and arguments. Empty results are not cached: the query functions return [] / {} /
+    None when the query fails, and that must not be served for the whole TTL.
+    Callers must treat the returned value as read-only.
+    """
+    @wraps(func)
+    def wrapper(engine, *args, **kwargs):
+        # Postgres and the DuckDB export (analytics_backend.py) each get their own entries
+        key = (engine, func.__name__, args, tuple(sorted(kwargs.items())))
+        version = get_data_version(engine)
+        found, value = query_cache.get(key, version)
+        if found:
+            return value
+        value = func(engine, *args, **kwargs)
+        if value not in (None, [], {}):
+            query_cache.put(key, version, value)
+        return value
+    return wrapper
+
+def cache_stats() -> dict:
+    with _version_lock:
+        versions = [stamp[0] for stamp, _ in _version_cache.values()]
+    return {**query_cache.stats(), "data_version": versions[0] if versions else None}
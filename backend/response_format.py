@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Olist Seller Success - Columnar / Compressed Response Formats
+
+Opt-in encodings for the large analytic payloads (predictive insights, churn
+predictions). The default `json` format is the row-oriented shape served by
+FastAPI; the others are negotiated with a `format` query parameter or the
+Accept header:
+
+    columnar  tables as {"column": [...]} arrays, serialized with orjson, which
+              writes NumPy arrays directly instead of one dict per row
+    arrow     one table as an Arrow IPC stream (application/vnd.apache.arrow.stream)
+
+Both are compressed with brotli or gzip according to Accept-Encoding (brotli
+only when the optional `brotli` package is installed). Encoded bodies are
+cached per snapshot version, so a repeated request costs neither
+serialization nor compression.
+"""
+
+import os
+import gzip
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+import numpy as np
+import pandas as pd
+import orjson
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# --- Parameters ---
+RESPONSE_FORMATS = ["json", "columnar", "arrow"]
+JSON_MEDIA_TYPE = "application/json"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+# Responses differ by format and encoding, so shared caches must key on both headers
+VARY = "Accept, Accept-Encoding"
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", 1024))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", 5))
+ENCODED_RESPONSE_CACHE_SIZE = int(os.getenv("ENCODED_RESPONSE_CACHE_SIZE", 32))
+
+JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+# --- Negotiation ---
+
+def negotiate_format(requested: str | None, accept: str | None) -> str:
+    """An explicit `format` parameter wins; otherwise an Arrow Accept header selects arrow."""
+    if requested in RESPONSE_FORMATS:
+        return requested
+    if accept and ARROW_STREAM_MEDIA_TYPE in accept.lower():
+        return "arrow"
+    return "json"
+
+def _accepted_codings(accept_encoding: str | None) -> dict:
+    codings = {}
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        codings[name.strip().lower()] = quality
+    return codings
+
+def negotiate_encoding(accept_encoding: str | None) -> str | None:
+    """'br', 'gzip' or None (identity), preferring brotli when both are acceptable."""
+    codings = _accepted_codings(accept_encoding)
+    wildcard = codings.get("*", 0.0)
+    available = (["br"] if brotli is not None else []) + ["gzip"]
+    candidates = [(codings.get(coding, wildcard), coding) for coding in available]
+    candidates = [(quality, coding) for quality, coding in candidates if quality > 0]
+    if not candidates:
+        return None
+    # max() keeps the first of equal qualities, i.e. brotli
+    return max(candidates, key=lambda candidate: candidate[0])[1]
+
+
+# --- Encoding ---
+
+def to_columns(df: pd.DataFrame) -> dict:
+    """
+    {column: array} for a DataFrame. Numeric, boolean and datetime columns stay
+    NumPy arrays (NaN is serialized as null); the rest are lists. orjson cannot
+    represent NaT, so datetime columns with missing values are lists with None.
+    """
+    columns = {}
+    for name, series in df.items():
+        dtype = series.dtype
+        if isinstance(dtype, np.dtype) and (dtype.kind in "biuf" or (dtype.kind == "M" and not series.isna().any())):
+            columns[name] = series.to_numpy()
+        elif pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+            # Nullable / Arrow-backed numbers
+            columns[name] = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        else:
+            columns[name] = series.astype(object).where(series.notna(), None).tolist()
+    return columns
+
+def _default(value):
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (frozenset, set)):
+        return sorted(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def dumps(content) -> bytes:
+    """orjson with NumPy arrays and scalars serialized natively; NaN becomes null."""
+    return orjson.dumps(content, default=_default, option=JSON_OPTIONS)
+
+def to_arrow_stream(df: pd.DataFrame) -> bytes:
+    """A DataFrame as a single-batch Arrow IPC stream."""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def compress(body: bytes, encoding: str | None) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
+
+
+# --- Encoded Body Cache ---
+
+class EncodedBodyCache:
+    """Small LRU of encoded (and compressed) bodies, keyed by e.g. (snapshot version, format, encoding)."""
+
+    def __init__(self, max_entries: int = ENCODED_RESPONSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                return body
+        body = build()
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body
+
+_body_cache = EncodedBodyCache()
+
+def encode_body(encode, accept_encoding: str | None, cache_key=None):
+    """
+    Runs `encode()` (returning the uncompressed bytes) and compresses the result
+    as negotiated. Returns (body, content_encoding). With a cache_key, both steps
+    run once per key and encoding.
+    """
+    encoding = negotiate_encoding(accept_encoding)
+
+    def build():
+        body = encode() if cache_key is None else _body_cache.get_or_build((cache_key, None), encode)
+        if encoding is None or len(body) < COMPRESSION_MIN_BYTES:
+            return body, None
+        return compress(body, encoding), encoding
+
+    if cache_key is None or encoding is None:
+        return build()
+    return _body_cache.get_or_build((cache_key, encoding), build)
+
+def response_headers(content_encoding: str | None, headers: dict | None = None) -> dict:
+    """Vary plus Content-Encoding (when compressed) merged into `headers`."""
+    headers = {**(headers or {}), "Vary": VARY}
+    if content_encoding:
+        headers["Content-Encoding"] = content_encoding
+    return headers
@@ -1,4 +1,5 @@
 -- Drop tables if they exist to start fresh
+DROP MATERIALIZED VIEW IF EXISTS seller_metrics;
 DROP TABLE IF EXISTS order_payments;
 DROP TABLE IF EXISTS order_reviews;
 DROP TABLE IF EXISTS order_items;
@@ -94,4 +95,76 @@ CREATE TABLE order_reviews (
     review_answer_timestamp TIMESTAMP,
     PRIMARY KEY (review_id, order_id),
     FOREIGN KEY (order_id) REFERENCES orders(order_id)
-);
\ No newline at end of file
+);
+
+-- Per-seller summary read by the seller endpoints instead of aggregating order_items.
+-- Created empty here and refreshed by populate_db.py once the tables are loaded.
+CREATE MATERIALIZED VIEW seller_metrics AS
+WITH item_metrics AS (
+    SELECT
+        seller_id,
+        SUM(price) AS total_revenue,
+        COUNT(DISTINCT order_id) AS unique_order_count,
+        MIN(shipping_limit_date) AS first_sale_date
+    FROM order_items
+    GROUP BY seller_id
+),
+delivered_metrics AS (
+    SELECT
+        oi.seller_id,
+        SUM(oi.price) AS delivered_revenue,
+        COUNT(DISTINCT oi.order_id) AS delivered_orders,
+        COUNT(DISTINCT oi.product_id) AS distinct_products_sold,
+        AVG(r.review_score) AS average_review_score,
+        (CAST(SUM(CASE WHEN o.order_delivered_customer_date <= o.order_estimated_delivery_date THEN 1 ELSE 0 END) AS FLOAT) / COUNT(o.order_id)) * 100 AS on_time_delivery_rate
+    FROM order_items oi
+    JOIN orders o ON oi.order_id = o.order_id
+    LEFT JOIN order_reviews r ON o.order_id = r.order_id
+    WHERE o.order_status = 'delivered'
+    GROUP BY oi.seller_id
+)
+SELECT
+    s.seller_id,
+    s.seller_city,
+    s.seller_state,
+    COALESCE(i.total_revenue, 0) AS total_revenue,
+    COALESCE(i.unique_order_count, 0) AS unique_order_count,
+    i.first_sale_date,
+    d.delivered_revenue,
+    d.delivered_orders,
+    d.distinct_products_sold,
+    d.average_review_score,
+    d.on_time_delivery_rate
+FROM sellers s
+LEFT JOIN item_metrics i ON s.seller_id = i.seller_id
+LEFT JOIN delivered_metrics d ON s.seller_id = d.seller_id
+WITH NO DATA;
+
+-- The unique index also allows REFRESH MATERIALIZED VIEW CONCURRENTLY
+CREATE UNIQUE INDEX idx_seller_metrics_seller_id ON seller_metrics (seller_id);
+CREATE INDEX idx_seller_metrics_total_revenue ON seller_metrics (total_revenue, seller_id);
+CREATE INDEX idx_seller_metrics_unique_order_count ON seller_metrics (unique_order_count, seller_id);
+CREATE INDEX idx_seller_metrics_seller_city ON seller_metrics (seller_city, seller_id);
+CREATE INDEX idx_seller_metrics_seller_state ON seller_metrics (seller_state, seller_id);
+
+-- Model sentiment per review, filled by sentiment_scoring.py.
+-- Not dropped above so scores survive full reloads; new reviews are scored incrementally.
+CREATE TABLE IF NOT EXISTS review_sentiment (
+    review_id VARCHAR(255),
+    order_id VARCHAR(255),
+    review_creation_date TIMESTAMP,
+    sentiment_score INT,
+    sentiment_label VARCHAR(20),
+    model_name VARCHAR(255),
+    scored_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (review_id, order_id)
+);
+CREATE INDEX IF NOT EXISTS idx_review_sentiment_creation_date ON review_sentiment (review_creation_date);
+
+-- Single-row stamp bumped by every data load (and by sentiment scoring); API caches
+-- compare against it to drop results computed from older data. Kept across reloads.
+CREATE TABLE IF NOT EXISTS dataset_version (
+    id INT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    version BIGINT NOT NULL,
+    loaded_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Olist Seller Success - Sentiment Inference Engine
+
+Keeps the nlptown multilingual BERT model resident for the lifetime of the
+process and scores comments in length-bucketed, padded batches instead of one
+forward pass per comment.
+
+For CPU-only nodes the linear layers can be quantized to int8 at load time
+(SENTIMENT_QUANTIZE), the intra-op thread count pinned (SENTIMENT_NUM_THREADS)
+and comments truncated to fewer tokens (SENTIMENT_MAX_LENGTH). Check the effect
+on throughput and label agreement with backend/benchmarks/sentiment_inference.py.
+"""
+
+import os
+import logging
+import threading
+import time
+import pandas as pd
+
+import torch
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+from .sentiment_memo import SentimentMemo, normalize_comment, SENTIMENT_MEMO_ENABLED
+
+# --- Parameters ---
+SENTIMENT_MODEL_NAME = "nlptown/bert-base-multilingual-uncased-sentiment"
+MAX_SEQUENCE_LENGTH = int(os.getenv("SENTIMENT_MAX_LENGTH", 512))
+# Dynamic int8 quantization of the linear layers (CPU only)
+QUANTIZE = os.getenv("SENTIMENT_QUANTIZE", "false").lower() in ("1", "true", "yes")
+# torch intra-op threads; 0 keeps the torch default (one per physical core)
+NUM_THREADS = int(os.getenv("SENTIMENT_NUM_THREADS", 0))
+MAX_BATCH_SIZE = int(os.getenv("SENTIMENT_MAX_BATCH_SIZE", 64))
+# Upper bound on padded tokens (batch size x longest sequence) per forward pass
+MAX_TOKENS_PER_BATCH = int(os.getenv("SENTIMENT_MAX_TOKENS_PER_BATCH", 8192))
+
+
+def score_to_label(score: int) -> str:
+    """Maps a 1-5 star score to a sentiment label."""
+    if score <= 2:
+        return 'negative'
+    elif score == 3:
+        return 'neutral'
+    else:  # 4 or 5
+        return 'positive'
+
+def is_blank(comment) -> bool:
+    return pd.isna(comment) or not isinstance(comment, str) or comment.strip() == ""
+
+
+class SentimentEngine:
+    """Lazily loads the model once and scores lists of comments in dynamic batches."""
+
+    def __init__(self, model_name: str = SENTIMENT_MODEL_NAME, max_length: int = MAX_SEQUENCE_LENGTH,
+                 max_batch_size: int = MAX_BATCH_SIZE, max_tokens_per_batch: int = MAX_TOKENS_PER_BATCH,
+                 quantize: bool = QUANTIZE, num_threads: int = NUM_THREADS, memo: bool = SENTIMENT_MEMO_ENABLED):
+        self.model_name = model_name
+        self.max_length = max_length
+        self.max_batch_size = max_batch_size
+        self.max_tokens_per_batch = max_tokens_per_batch
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        if quantize and self.device != "cpu":
+            logging.warning("int8 dynamic quantization is CPU-only; loading the fp32 model on the GPU.")
+        self.quantize = quantize and self.device == "cpu"
+        self.num_threads = num_threads
+        # Results depend on the model, its precision and the truncation length
+        self.memo = SentimentMemo(f"{model_name}:{self.precision}:{max_length}") if memo else None
+        self.tokenizer = None
+        self.model = None
+        self.last_batch_stats = []
+        self._load_lock = threading.Lock()
+        # Forward passes are serialized; torch already parallelizes within a batch
+        self._infer_lock = threading.Lock()
+
+    def load(self):
+        """Loads tokenizer and model on first use. Safe to call from multiple threads."""
+        if self.model is not None:
+            return
+        with self._load_lock:
+            if self.model is not None:
+                return
+            start = time.perf_counter()
+            logging.info(f"Loading sentiment model {self.model_name} on {self.device} ({self.precision}, max_length={self.max_length})...")
+            if self.num_threads > 0:
+                # Process-wide setting; applies to every torch op in this process
+                torch.set_num_threads(self.num_threads)
+            self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            if self.memo is not None and not getattr(self.tokenizer, 'do_lower_case', False):
+                # normalize_comment() lowercases, which is only lossless for an uncased model
+                logging.warning(f"{self.model_name} is case-sensitive; disabling the sentiment memo.")
+                self.memo = None
+            model = AutoModelForSequenceClassification.from_pretrained(self.model_name).to(self.device)
+            model.eval()
+            if self.quantize:
+                # Weights of every nn.Linear become int8; activations are quantized on the fly
+                model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            self.model = model
+            logging.info(f"Sentiment model loaded in {time.perf_counter() - start:.1f}s ({torch.get_num_threads()} threads)")
+
+    @property
+    def precision(self) -> str:
+        return "int8" if self.quantize else "fp32"
+
+    def _plan_batches(self, lengths: list[int]) -> list[list[int]]:
+        """Groups positions of similar length so each padded batch stays within the token budget."""
+        order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+        batches, current, current_max = [], [], 0
+        for i in order:
+            new_max = max(current_max, lengths[i])
+            if current and (len(current) >= self.max_batch_size or new_max * (len(current) + 1) > self.max_tokens_per_batch):
+                batches.append(current)
+                current, new_max = [], lengths[i]
+            current.append(i)
+            current_max = new_max
+        if current:
+            batches.append(current)
+        return batches
+
+    def predict(self, comments: list) -> list[tuple]:
+        """
+        Returns a (score, label) tuple per comment; blank comments get (None, 'no_comment').
+        Comments are normalized and deduplicated first, and only texts the memo has
+        not seen before go through the model.
+        """
+        results = [(None, 'no_comment')] * len(comments)
+        positions = [i for i, comment in enumerate(comments) if not is_blank(comment)]
+        self.last_batch_stats = []
+        if not positions:
+            return results
+
+        self.load()
+        if self.memo is None:
+            for i, result in zip(positions, self._predict_texts([comments[i] for i in positions])):
+                results[i] = result
+            return results
+
+        keys = [normalize_comment(comments[i]) for i in positions]
+        distinct = list(dict.fromkeys(keys))
+        known = self.memo.get_many(distinct)
+        unseen = [key for key in distinct if key not in known]
+        if unseen:
+            # The normalized text tokenizes exactly like the original (see load())
+            scored = dict(zip(unseen, self._predict_texts(unseen)))
+            self.memo.put_many(scored)
+            known.update(scored)
+        self.memo.record(len(positions), len(unseen))
+        for i, key in zip(positions, keys):
+            results[i] = known[key]
+        return results
+
+    def _predict_texts(self, texts: list) -> list[tuple]:
+        """Runs the model on non-blank texts in length-bucketed batches."""
+        results = [(None, 'error')] * len(texts)
+        # HF fast tokenizers are not safe for concurrent calls ("Already borrowed"), and the
+        # process-wide engine can be shared by threads (e.g. SENTIMENT_WORKERS=0)
+        try:
+            with self._infer_lock:
+                encodings = self.tokenizer(texts, truncation=True, max_length=self.max_length)
+        except Exception as e:
+            logging.error(f"Error tokenizing {len(texts)} comments: {e}")
+            return results
+        lengths = [len(ids) for ids in encodings['input_ids']]
+
+        for batch in self._plan_batches(lengths):
+            start = time.perf_counter()
+            try:
+                features = [{key: encodings[key][i] for key in encodings.keys()} for i in batch]
+                with self._infer_lock, torch.inference_mode():
+                    inputs = self.tokenizer.pad(features, return_tensors="pt").to(self.device)
+                    logits = self.model(**inputs).logits
+                scores = (logits.argmax(dim=-1) + 1).tolist()  # Score is 1-5
+                for i, score in zip(batch, scores):
+                    results[i] = (score, score_to_label(score))
+                padded_tokens = int(inputs['input_ids'].numel())
+            except Exception as e:
+                logging.error(f"Error analyzing batch of {len(batch)} comments: {e}")
+                for i in batch:
+                    results[i] = (None, 'error')
+                padded_tokens = 0
+            elapsed = time.perf_counter() - start
+            stats = {
+                "batch_size": len(batch),
+                "max_tokens": max(lengths[i] for i in batch),
+                "padded_tokens": padded_tokens,
+                "seconds": round(elapsed, 4),
+                "reviews_per_second": round(len(batch) / elapsed, 1) if elapsed > 0 else None,
+            }
+            self.last_batch_stats.append(stats)
+            logging.info(f"Sentiment batch: {stats['batch_size']} reviews, {stats['max_tokens']} max tokens, "
+                         f"{stats['seconds']}s ({stats['reviews_per_second']} reviews/s)")
+        return results
+
+
+# --- Process-wide Engine ---
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_sentiment_engine() -> SentimentEngine:
+    """Returns the process-wide engine, creating it on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = SentimentEngine()
+    return _engine
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Olist Seller Success - Sentiment Result Memoization
+
+Remembers the model output for each normalized comment text: an in-memory LRU
+in front of a SQLite file that survives restarts and is shared by the offline
+scorer's worker processes. Many Olist comments are short repeats ("bom",
+"ótimo", "recomendo"), so most of them never reach the model.
+
+Normalization only merges texts the uncased BERT tokenizer cannot tell apart
+(case and whitespace), and entries are namespaced by model configuration, so a
+memoized result is always the one the model would have produced.
+"""
+
+import os
+import re
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+
+# --- Paths ---
+BASE_DIR = Path(__file__).resolve().parent
+# Empty keeps the memo in memory only
+SENTIMENT_MEMO_PATH = os.getenv("SENTIMENT_MEMO_PATH", str(BASE_DIR.parent / "artifacts" / "sentiment_memo.sqlite3"))
+
+# --- Parameters ---
+SENTIMENT_MEMO_ENABLED = os.getenv("SENTIMENT_MEMO", "true").lower() in ("1", "true", "yes")
+SENTIMENT_MEMO_MAX_ENTRIES = int(os.getenv("SENTIMENT_MEMO_MAX_ENTRIES", 100_000))
+SQLITE_MAX_VARIABLES = 500
+
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_comment(comment: str) -> str:
+    """Unicode NFC, lowercased, with runs of whitespace collapsed and trimmed."""
+    return WHITESPACE.sub(" ", unicodedata.normalize("NFC", comment).lower()).strip()
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]
+
+
+class SentimentMemo:
+    """Thread-safe LRU of normalized text -> (score, label), backed by an optional SQLite store."""
+
+    def __init__(self, namespace: str, path: str = SENTIMENT_MEMO_PATH, max_entries: int = SENTIMENT_MEMO_MAX_ENTRIES):
+        self.namespace = namespace
+        self.path = path
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.comments = 0
+        self.scored = 0
+
+    def _store(self):
+        if not self.path:
+            return None
+        if self._connection is None:
+            try:
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+                connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+                # WAL lets the worker processes and the offline scorer read while one writes
+                connection.execute("PRAGMA journal_mode=WAL;")
+                connection.execute("""
+                    CREATE TABLE IF NOT EXISTS sentiment_memo (
+                        namespace TEXT NOT NULL, text_hash TEXT NOT NULL, score INTEGER, label TEXT NOT NULL,
+                        PRIMARY KEY (namespace, text_hash)
+                    ) WITHOUT ROWID;
+                """)
+                self._connection = connection
+            except sqlite3.Error as e:
+                logging.warning(f"Sentiment memo store {self.path} unavailable, keeping results in memory only: {e}")
+                self.path = None
+                return None
+        return self._connection
+
+    def _remember(self, text: str, result: tuple):
+        self._entries[text] = result
+        self._entries.move_to_end(text)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_many(self, texts: list) -> dict:
+        """Returns {text: (score, label)} for the normalized texts that were scored before."""
+        found = {}
+        with self._lock:
+            for text in texts:
+                result = self._entries.get(text)
+                if result is not None:
+                    self._entries.move_to_end(text)
+                    found[text] = result
+            self.memory_hits += len(found)
+            missing = {_text_hash(text): text for text in texts if text not in found}
+            store = self._store() if missing else None
+            if store is not None:
+                hashes = list(missing)
+                try:
+                    for i in range(0, len(hashes), SQLITE_MAX_VARIABLES):
+                        chunk = hashes[i:i + SQLITE_MAX_VARIABLES]
+                        rows = store.execute(
+                            f"SELECT text_hash, score, label FROM sentiment_memo WHERE namespace = ? AND text_hash IN ({','.join('?' * len(chunk))});",
+                            [self.namespace, *chunk],
+                        ).fetchall()
+                        for text_hash, score, label in rows:
+                            text = missing[text_hash]
+                            found[text] = (score, label)
+                            self._remember(text, (score, label))
+                            self.disk_hits += 1
+                except sqlite3.Error as e:
+                    logging.warning(f"Could not read the sentiment memo store: {e}")
+            self.misses += len(texts) - len(found)
+        return found
+
+    def put_many(self, results: dict):
+        """Stores {normalized text: (score, label)}; failed results are not memoized."""
+        results = {text: result for text, result in results.items() if result[1] != 'error'}
+        if not results:
+            return
+        with self._lock:
+            for text, result in results.items():
+                self._remember(text, result)
+            store = self._store()
+            if store is not None:
+                try:
+                    with store:
+                        store.executemany(
+                            "INSERT OR REPLACE INTO sentiment_memo (namespace, text_hash, score, label) VALUES (?, ?, ?, ?);",
+                            [(self.namespace, _text_hash(text), score, label) for text, (score, label) in results.items()],
+                        )
+                except sqlite3.Error as e:
+                    logging.warning(f"Could not write the sentiment memo store: {e}")
+
+    def record(self, comments: int, scored: int):
+        """Counts comments requested vs. unique texts that actually went through the model."""
+        with self._lock:
+            self.comments += comments
+            self.scored += scored
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else None,
+                "comments": self.comments,
+                "model_inputs": self.scored,
+                "inference_saved_rate": round(1 - self.scored / self.comments, 4) if self.comments else None,
+            }
+
+def combine_stats(stats: list) -> dict | None:
+    """Adds up the counters of several memos (one per worker process)."""
+    if not stats:
+        return None
+    totals = {key: sum(s[key] for s in stats) for key in ["entries", "memory_hits", "disk_hits", "misses", "comments", "model_inputs"]}
+    lookups = totals["memory_hits"] + totals["disk_hits"] + totals["misses"]
+    totals["hit_rate"] = round((totals["memory_hits"] + totals["disk_hits"]) / lookups, 4) if lookups else None
+    totals["inference_saved_rate"] = round(1 - totals["model_inputs"] / totals["comments"], 4) if totals["comments"] else None
+    return totals
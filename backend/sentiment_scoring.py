@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Olist Seller Success - Offline Review Sentiment Scoring
+
+Scores every commented review in `order_reviews` once and stores the result in
+`review_sentiment`. Later runs score every review that has no successful score in
+the table yet, whatever its `review_creation_date`, so reviews loaded late
+(incremental upserts, backfilled CSVs) are scored too. BERT runs in the
+SENTIMENT_WORKERS processes of the sentiment pool (sentiment_service.py).
+
+Pass --fast to score with the TF-IDF + LightGBM model (fast_sentiment.py, trained
+first if none is registered) instead of BERT; `model_name` records which one was used.
+
+Usage:
+    uv run python -m backend.sentiment_scoring [--fast]
+"""
+
+import logging
+import time
+import pandas as pd
+from sqlalchemy import text
+
+from .sentiment_engine import SENTIMENT_MODEL_NAME
+from .sentiment_service import get_sentiment_service
+from .query_cache import bump_data_version
+
+# --- Parameters ---
+SCORING_CHUNK_SIZE = 2048
+
+# Reviews with no successful score yet (never scored, or failed last time). The
+# (date, id) cursor moves through the run so rows that fail are not refetched.
+UNSCORED_REVIEWS_QUERY = text("""
+    SELECT r.review_id, r.order_id, r.review_creation_date, r.review_comment_message
+    FROM order_reviews r
+    WHERE r.review_comment_message IS NOT NULL AND TRIM(r.review_comment_message) <> ''
+      AND (CAST(:after_date AS TIMESTAMP) IS NULL OR (r.review_creation_date, r.review_id) > (:after_date, :after_id))
+      AND NOT EXISTS (
+          SELECT 1 FROM review_sentiment rs
+          WHERE rs.review_id = r.review_id AND rs.order_id = r.order_id AND rs.sentiment_label <> 'error')
+    ORDER BY r.review_creation_date, r.review_id
+    LIMIT :limit;
+""")
+
+UPSERT_QUERY = text("""
+    INSERT INTO review_sentiment (review_id, order_id, review_creation_date, sentiment_score, sentiment_label, model_name, scored_at)
+    VALUES (:review_id, :order_id, :review_creation_date, :sentiment_score, :sentiment_label, :model_name, NOW())
+    ON CONFLICT (review_id, order_id) DO UPDATE SET
+        review_creation_date = EXCLUDED.review_creation_date,
+        sentiment_score = EXCLUDED.sentiment_score,
+        sentiment_label = EXCLUDED.sentiment_label,
+        model_name = EXCLUDED.model_name,
+        scored_at = EXCLUDED.scored_at;
+""")
+
+
+def score_new_reviews(engine, chunk_size: int = SCORING_CHUNK_SIZE, scorer=None) -> int:
+    """
+    Scores all unscored commented reviews, committing one chunk at a time, with
+    `scorer` (BERT through the process pool by default). Returns the row count.
+    """
+    service = get_sentiment_service() if scorer is None else None
+    model_name = SENTIMENT_MODEL_NAME if scorer is None else scorer.model_name
+
+    total, start = 0, time.perf_counter()
+    after_date, after_id = None, None
+    while True:
+        params = {'after_date': after_date, 'after_id': after_id, 'limit': chunk_size}
+        chunk = pd.read_sql_query(UNSCORED_REVIEWS_QUERY, engine, params=params)
+        if chunk.empty:
+            break
+        comments = chunk['review_comment_message'].tolist()
+        sentiments = (service or scorer).predict(comments)
+        rows = [
+            {
+                'review_id': row.review_id,
+                'order_id': row.order_id,
+                'review_creation_date': row.review_creation_date,
+                'sentiment_score': score,
+                'sentiment_label': label,
+                'model_name': model_name,
+            }
+            for row, (score, label) in zip(chunk.itertuples(index=False), sentiments)
+        ]
+        with engine.begin() as connection:
+            connection.execute(UPSERT_QUERY, rows)
+        total += len(rows)
+        last = chunk.iloc[-1]
+        after_date, after_id = last['review_creation_date'].to_pydatetime(), last['review_id']
+        logging.info(f"Scored {total} reviews ({total / (time.perf_counter() - start):.1f} reviews/s)")
+
+    logging.info(f"Review sentiment scoring finished: {total} new reviews scored.")
+    if service:
+        logging.info(f"Sentiment workers: {service.stats()}")
+    if total:
+        # The sentiment aggregates read review_sentiment; drop their cached results
+        bump_data_version(engine)
+    return total
+
+
+def main():
+    """Scores new reviews in the configured database."""
+    import argparse
+    from .db import create_db_engine
+    from .fast_sentiment import get_fast_scorer, train_fast_sentiment
+
+    parser = argparse.ArgumentParser(description="Score new review comments.")
+    parser.add_argument('--fast', action='store_true', help="Score with the TF-IDF + LightGBM model instead of BERT.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    engine = create_db_engine()
+    if engine is None:
+        raise SystemExit(1)
+    scorer = None
+    if args.fast:
+        if get_fast_scorer() is None:
+            train_fast_sentiment(engine)
+        scorer = get_fast_scorer()
+    score_new_reviews(engine, scorer=scorer)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Olist Seller Success - Sentiment Process Pool
+
+Runs the BERT engine (sentiment_engine.py) for the offline scorer
+(sentiment_scoring.py) in SENTIMENT_WORKERS spawned processes that each load
+the model once. Every chunk the scorer reads is split evenly over the workers;
+each worker batches its share by length itself (SentimentEngine._plan_batches).
+SENTIMENT_WORKERS=0 scores in the calling process instead.
+
+A worker that dies (OOM, segfault) fails the chunk in flight, and the pool is
+started again for the next one.
+"""
+
+import os
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .sentiment_memo import combine_stats
+
+# --- Parameters ---
+SENTIMENT_WORKERS = int(os.getenv("SENTIMENT_WORKERS", 1))
+
+
+# --- Worker Process ---
+_worker_engine = None
+_worker_load_error = None
+
+def _init_worker():
+    """Loads the model once per worker process."""
+    global _worker_engine, _worker_load_error
+    from .sentiment_engine import SentimentEngine
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    _worker_engine = SentimentEngine()
+    try:
+        _worker_engine.load()
+    except Exception as e:
+        _worker_load_error = f"Failed to load sentiment model: {e}"
+        logging.error(_worker_load_error)
+
+def _score_in_worker(comments: list):
+    """Scores one share of a chunk. Each worker has its own memo LRU; its counters travel back with the results."""
+    if _worker_load_error:
+        raise RuntimeError(_worker_load_error)
+    predictions = _worker_engine.predict(comments)
+    memo_stats = (os.getpid(), _worker_engine.memo.stats()) if _worker_engine.memo else None
+    return predictions, memo_stats
+
+
+class SentimentService:
+    """A process pool of sentiment engines, started on first use."""
+
+    def __init__(self, workers: int = SENTIMENT_WORKERS):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._memo_stats = {}
+        self.chunks = 0
+        self.scored_comments = 0
+        self.worker_restarts = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # torch is not fork-safe once initialized
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                                     initializer=_init_worker)
+                logging.info(f"Started {self.workers} sentiment worker process(es).")
+            return self._executor
+
+    def predict(self, comments: list) -> list:
+        """Returns a (score, label) tuple per comment."""
+        comments = list(comments)
+        if not comments:
+            return []
+        if self.workers <= 0:
+            from .sentiment_engine import get_sentiment_engine
+            engine = get_sentiment_engine()
+            results = engine.predict(comments)
+            if engine.memo:
+                self._memo_stats[os.getpid()] = engine.memo.stats()
+        else:
+            share = -(-len(comments) // self.workers)
+            shares = [comments[i:i + share] for i in range(0, len(comments), share)]
+            executor = self._get_executor()
+            try:
+                outputs = list(executor.map(_score_in_worker, shares))
+            except BrokenProcessPool as e:
+                with self._lock:
+                    if self._executor is executor:
+                        self._executor = None
+                        self.worker_restarts += 1
+                executor.shutdown(wait=False, cancel_futures=True)
+                logging.error("A sentiment worker exited; failed the chunk in flight and restarting the pool.")
+                raise RuntimeError(f"Sentiment worker exited: {e}") from e
+            results = [result for predictions, _ in outputs for result in predictions]
+            for _, memo_stats in outputs:
+                if memo_stats:
+                    self._memo_stats[memo_stats[0]] = memo_stats[1]
+        self.chunks += 1
+        self.scored_comments += len(comments)
+        return results
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "worker_restarts": self.worker_restarts,
+            "chunks": self.chunks,
+            "comments": self.scored_comments,
+            "memo": combine_stats(list(self._memo_stats.values())),
+        }
+
+    def shutdown(self):
+        """Stops the worker processes; the next predict() starts new ones."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+# --- Process-wide Service ---
+_service = None
+_service_lock = threading.Lock()
+
+def get_sentiment_service() -> SentimentService:
+    """Returns the process-wide pool, creating it (but not its workers) on first use."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = SentimentService()
+    return _service
@@ -17,14 +17,16 @@ import IconPieChart from '@/icons/pie-chart.svg';
 import IconArrowUp from '@/icons/arrow-up.svg';
 
 // --- TypeScript Interfaces ---
-interface ChurnPrediction {
-  customer_unique_id: string;
-  Recency: number;
-  Frequency: number;
-  Monetary: number;
-  Purchase_Diversity: number;
-  is_churn: number;
-  churn_probability: number;
+// Per-customer predictions are paginated at /api/platform/churn-predictions
+interface ChurnSummary {
+  customers: number;
+  active_customers: number;
+  high_risk_customers: number;
+  churn_rate: number;
+  affected_gmv: number;
+  predicted_churners: number;
+  mean_churn_probability: number | null;
+  probability_histogram: { bin_start: number; bin_end: number; customers: number }[];
 }
 
 interface FeatureImportance {
@@ -49,7 +51,7 @@ interface SellerPerformanceData {
 
 interface PredictiveInsightsData {
   churn_analysis: {
-    predictions: ChurnPrediction[];
+    summary: ChurnSummary;
     feature_importance: FeatureImportance[];
   };
   sales_forecast: {
@@ -98,12 +100,8 @@ const PredictiveInsightsPage = () => {
     }
 
     // --- Calculate KPI Metrics ---
-    const churnPredictions = data.churn_analysis.predictions;
-    // Define high-risk based on rules instead of flawed probability
-    const highRiskCustomers = churnPredictions.filter(p => p.is_churn === 0 && p.Recency > 90 && p.Frequency <= 2);
-    const totalActiveCustomers = churnPredictions.filter(p => p.is_churn === 0);
-    const churnRate = totalActiveCustomers.length > 0 ? (highRiskCustomers.length / totalActiveCustomers.length) * 100 : 0;
-    const affectedGmv = highRiskCustomers.reduce((sum, customer) => sum + customer.Monetary, 0);
+    // High-risk is rule-based (active, Recency > 90, Frequency <= 2) and aggregated server-side
+    const { high_risk_customers: highRiskCustomers, churn_rate: churnRate, affected_gmv: affectedGmv } = data.churn_analysis.summary;
 
     const allForecasts = Object.values(data.sales_forecast).flat();
     // To handle the historical dataset, we define "now" as a relevant point in time for the data.
@@ -120,7 +118,7 @@ const PredictiveInsightsPage = () => {
     return (
       <>
         <div className="grid grid-cols-1 gap-4 md:grid-cols-2 md:gap-6 xl:grid-cols-4 2xl:gap-7.5">
-            <KpiCard title="High-Risk Customers" value={highRiskCustomers.length.toLocaleString()}>
+            <KpiCard title="High-Risk Customers" value={highRiskCustomers.toLocaleString()}>
               <IconUserCircle className="w-6 h-6" />
             </KpiCard>
             <KpiCard title="Platform-wide Churn Rate" value={`${churnRate.toFixed(2)}%`}>
@@ -39,7 +39,7 @@ interface Review {
   review_id: string;
   review_score: number;
   review_comment_message: string;
-  sentiment_label: 'positive' | 'neutral' | 'negative' | 'no_comment' | 'error';
+  sentiment_label: 'positive' | 'neutral' | 'negative' | 'no_comment' | 'pending' | 'error';
   sentiment_score: number | null;
   seller_id: string;
   review_creation_date: string;
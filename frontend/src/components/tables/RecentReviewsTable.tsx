@@ -5,7 +5,7 @@ interface Review {
   review_id: string;
   review_score: number;
   review_comment_message: string;
-  sentiment_label: 'positive' | 'neutral' | 'negative' | 'no_comment' | 'error';
+  sentiment_label: 'positive' | 'neutral' | 'negative' | 'no_comment' | 'pending' | 'error';
   sentiment_score: number | null;
   seller_id: string;
   review_creation_date: string;
@@ -21,6 +21,7 @@ const sentimentColorMap = {
   neutral: 'bg-yellow-500 text-white',
   negative: 'bg-red-500 text-white',
   no_comment: 'bg-gray-400 text-gray-800',
+  pending: 'bg-gray-300 text-gray-800',
   error: 'bg-purple-500 text-white',
 };
 
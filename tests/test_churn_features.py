@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from backend.benchmarks.rfm_features import build_rfm_features_legacy, check_equal, make_dataset
+from backend.churn_features import build_rfm_features
+
+
+def small_dataset():
+    """Repeat buyers under several customer_ids, split payments, an unpaid order and a customer without orders."""
+    customers = pd.DataFrame({
+        'customer_id': ['c1', 'c2', 'c3', 'c4', 'c5'],
+        'customer_unique_id': ['u1', 'u1', 'u2', 'u3', 'u4'],
+    })
+    orders = pd.DataFrame({
+        'order_id': ['o1', 'o2', 'o3', 'o4', 'o5'],
+        'customer_id': ['c1', 'c2', 'c3', 'c3', 'c4'],
+        'order_purchase_timestamp': pd.to_datetime([
+            '2018-01-01 10:00', '2018-03-05 23:59', '2017-12-31 00:00', '2018-02-01 12:30', '2018-03-06 08:00',
+        ]),
+    })
+    payments = pd.DataFrame({
+        'order_id': ['o1', 'o1', 'o2', 'o3', 'o4'],
+        'payment_value': [10.0, 5.5, 20.0, 7.25, 1.0],
+    })
+    processed = pd.DataFrame({
+        'customer_unique_id': ['u1', 'u1', 'u1', 'u2', 'u3'],
+        'product_category_name_english': ['toys', 'toys', 'garden', None, 'toys'],
+    })
+    return orders, payments, customers, processed
+
+
+def test_matches_legacy_features_on_edge_cases():
+    inputs = small_dataset()
+    features = build_rfm_features(*inputs)
+    check_equal(build_rfm_features_legacy(*inputs), features)
+    row = features.set_index('customer_unique_id').loc['u1']
+    assert (row['Frequency'], row['Monetary'], row['Purchase_Diversity']) == (2, 35.5, 2)
+
+
+def test_matches_legacy_features_on_synthetic_olist_data():
+    data = make_dataset(1, seed=7)
+    sample = data['orders'].sample(5000, random_state=0)
+    orders = sample.reset_index(drop=True)
+    payments = data['payments'][data['payments']['order_id'].isin(orders['order_id'])]
+    customers = data['customers'][data['customers']['customer_id'].isin(orders['customer_id'])]
+    processed = data['processed'][data['processed']['order_id'].isin(orders['order_id'])]
+    inputs = (orders, payments, customers, processed)
+    features = build_rfm_features(*inputs)
+    check_equal(build_rfm_features_legacy(*inputs), features)
+    assert np.all(features['Recency'] >= 0)
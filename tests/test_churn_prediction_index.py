@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from backend.precompute import ChurnPredictionIndex
+
+
+def categorical_frames(tmp_path, customers=40, sellers=5):
+    """Predictions and customer_sellers as the pipeline stores them: categorical ids, round-tripped through Parquet."""
+    rng = np.random.default_rng(0)
+    # Category order differs from string order on purpose
+    ids = [f"c{i:03d}" for i in rng.permutation(customers)]
+    predictions = pd.DataFrame({
+        "customer_unique_id": pd.Categorical(ids, categories=ids),
+        "Recency": rng.integers(0, 700, customers),
+        "Frequency": rng.integers(1, 5, customers),
+        "Monetary": rng.random(customers).round(1) * 100,
+        "is_churn": rng.integers(0, 2, customers),
+        "churn_probability": rng.random(customers).round(1),
+    })
+    customer_sellers = pd.DataFrame({
+        "customer_unique_id": pd.Categorical(ids),
+        "seller_id": pd.Categorical([f"s{i % sellers}" for i in range(customers)]),
+    })
+    predictions.to_parquet(tmp_path / "predictions.parquet", index=False)
+    customer_sellers.to_parquet(tmp_path / "customer_sellers.parquet", index=False)
+    return pd.read_parquet(tmp_path / "predictions.parquet"), pd.read_parquet(tmp_path / "customer_sellers.parquet")
+
+
+def test_builds_from_categorical_frames(tmp_path):
+    predictions, customer_sellers = categorical_frames(tmp_path)
+    assert isinstance(customer_sellers['seller_id'].dtype, pd.CategoricalDtype)
+
+    index = ChurnPredictionIndex(predictions, customer_sellers)
+    page, total = index.query('churn_probability', 'DESC', 50, seller_ids=['s1', 'unknown'])
+
+    expected = set(customer_sellers.loc[customer_sellers['seller_id'] == 's1', 'customer_unique_id'].astype(str))
+    assert total == len(expected)
+    assert set(page['customer_unique_id']) == expected
+
+
+def test_pages_follow_value_then_customer_id(tmp_path):
+    predictions, customer_sellers = categorical_frames(tmp_path)
+    index = ChurnPredictionIndex(predictions, customer_sellers)
+    reference = predictions.astype({'customer_unique_id': str})
+
+    for sort_by in ['churn_probability', 'Monetary']:
+        for order in ['ASC', 'DESC']:
+            expected = reference.sort_values([sort_by, 'customer_unique_id'], ascending=order == 'ASC')
+            seen, cursor = [], None
+            while True:
+                page, total = index.query(sort_by, order, 7, cursor=cursor)
+                seen.extend(page['customer_unique_id'])
+                if len(page) < 7:
+                    break
+                last = page.iloc[-1]
+                cursor = (last[sort_by], last['customer_unique_id'])
+            assert total == len(reference)
+            assert seen == expected['customer_unique_id'].tolist()
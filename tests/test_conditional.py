@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta, timezone
+
+from backend.conditional import http_date, is_not_modified, make_etag
+
+LOADED_AT = datetime(2018, 10, 17, 12, 0, 30, 500000, tzinfo=timezone.utc)
+
+
+def test_etag_is_weak_and_depends_on_every_part():
+    etag = make_etag(1, "/api/platform/kpis", [])
+    assert etag.startswith('W/"')
+    assert etag == make_etag(1, "/api/platform/kpis", [])
+    assert etag != make_etag(2, "/api/platform/kpis", [])
+
+
+def test_if_none_match_compares_weakly_and_accepts_lists():
+    etag = make_etag(1)
+    opaque = etag[2:]
+    assert is_not_modified({"if-none-match": etag}, etag, LOADED_AT)
+    assert is_not_modified({"if-none-match": opaque}, etag, LOADED_AT)
+    assert is_not_modified({"if-none-match": f'W/"other", {etag}'}, etag, LOADED_AT)
+    assert is_not_modified({"if-none-match": "*"}, etag, LOADED_AT)
+    assert not is_not_modified({"if-none-match": make_etag(2)}, etag, LOADED_AT)
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since():
+    headers = {"if-none-match": make_etag(2), "if-modified-since": http_date(LOADED_AT + timedelta(days=1))}
+    assert not is_not_modified(headers, make_etag(1), LOADED_AT)
+
+
+def test_if_modified_since_uses_second_precision():
+    etag = make_etag(1)
+    assert is_not_modified({"if-modified-since": http_date(LOADED_AT)}, etag, LOADED_AT)
+    assert not is_not_modified({"if-modified-since": http_date(LOADED_AT - timedelta(seconds=1))}, etag, LOADED_AT)
+    # Naive timestamps are UTC
+    assert is_not_modified({"if-modified-since": http_date(LOADED_AT)}, etag, LOADED_AT.replace(tzinfo=None))
+
+
+def test_unusable_validators_are_modified():
+    etag = make_etag(1)
+    assert not is_not_modified({}, etag, LOADED_AT)
+    assert not is_not_modified({"if-modified-since": "yesterday"}, etag, LOADED_AT)
+    assert not is_not_modified({"if-modified-since": http_date(LOADED_AT)}, etag, None)
@@ -0,0 +1,21 @@
+from datetime import datetime, timezone
+
+from fastapi.testclient import TestClient
+
+import backend.main as main
+
+ETAG = 'W/"0123456789abcdef"'
+LOADED_AT = datetime(2018, 10, 17, 12, 0, tzinfo=timezone.utc)
+ORIGIN = "http://localhost:3000"
+
+
+def test_not_modified_response_carries_cors_headers(monkeypatch):
+    monkeypatch.setattr(main, "current_validators", lambda path, query_items, accept=None: (ETAG, LOADED_AT))
+    client = TestClient(main.app)
+
+    response = client.get("/api/platform/kpis", headers={"Origin": ORIGIN, "If-None-Match": ETAG})
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == ETAG
+    assert response.headers["access-control-allow-origin"] in ("*", ORIGIN)
+    assert "ETag" in response.headers["access-control-expose-headers"]
@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+
+from backend.api_queries import copy_to_frame
+
+
+class FakeCursor:
+    def __init__(self, payload: bytes | None, error: Exception | None):
+        self.payload = payload
+        self.error = error
+
+    def copy_expert(self, sql, sink):
+        if self.payload:
+            sink.write(self.payload)
+        if self.error:
+            raise self.error
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """The psycopg2 connection surface copy_to_frame uses."""
+
+    def __init__(self, payload: bytes | None = None, error: Exception | None = None):
+        self.payload = payload
+        self.error = error
+
+    def cursor(self):
+        return FakeCursor(self.payload, self.error)
+
+
+def test_reads_typed_frame():
+    payload = b"order_id,payment_value\no1,10.5\no2,3\n"
+    df = copy_to_frame(FakeConnection(payload), "order_payments", ["order_id", "payment_value"])
+    assert isinstance(df["order_id"].dtype, pd.CategoricalDtype)
+    assert df["payment_value"].tolist() == [10.5, 3.0]
+
+
+def test_copy_error_is_raised_instead_of_empty_input():
+    error = RuntimeError('relation "order_payments" does not exist')
+    with pytest.raises(RuntimeError, match="does not exist") as raised:
+        copy_to_frame(FakeConnection(error=error), "order_payments", ["order_id", "payment_value"])
+    assert isinstance(raised.value.__context__, pd.errors.EmptyDataError)
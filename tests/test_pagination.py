@@ -0,0 +1,69 @@
+from datetime import datetime
+
+import pytest
+
+from backend.pagination import (
+    clear_count_cache,
+    decode_cursor,
+    encode_cursor,
+    get_cached_count,
+    keyset_condition,
+    next_cursor,
+)
+
+
+def test_cursor_round_trips_with_sort_type():
+    cursor = encode_cursor('total_revenue', 'DESC', 1234.5, 'seller-1')
+    assert decode_cursor(cursor, 'total_revenue', 'DESC', float) == (1234.5, 'seller-1')
+
+    timestamp = datetime(2018, 8, 29, 15, 0, 37)
+    cursor = encode_cursor('order_purchase_timestamp', 'ASC', timestamp, 'order-1')
+    assert decode_cursor(cursor, 'order_purchase_timestamp', 'ASC', datetime.fromisoformat) == (timestamp, 'order-1')
+
+
+def test_cursor_for_another_sort_is_rejected():
+    cursor = encode_cursor('total_revenue', 'DESC', 10.0, 'seller-1')
+    with pytest.raises(ValueError, match="different sort"):
+        decode_cursor(cursor, 'total_revenue', 'ASC')
+    with pytest.raises(ValueError, match="different sort"):
+        decode_cursor(cursor, 'unique_order_count', 'DESC')
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "", encode_cursor('total_revenue', 'DESC', 'abc', 's')[:-3]])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 'total_revenue', 'DESC', float)
+
+
+def test_keyset_condition_follows_order():
+    assert keyset_condition("total_revenue", "seller_id", "DESC") == "(total_revenue, seller_id) < (:cursor_sort, :cursor_tie)"
+    assert keyset_condition("o.order_id", "o.order_id", "ASC") == "(o.order_id, o.order_id) > (:cursor_sort, :cursor_tie)"
+
+
+def test_next_cursor_only_for_full_pages():
+    rows = [{'total_revenue': 3.0, 'seller_id': 'a'}, {'total_revenue': 2.0, 'seller_id': 'b'}]
+    assert next_cursor(rows, 'total_revenue', 'DESC', 'total_revenue', 'seller_id', limit=3) is None
+    cursor = next_cursor(rows, 'total_revenue', 'DESC', 'total_revenue', 'seller_id', limit=2)
+    assert decode_cursor(cursor, 'total_revenue', 'DESC', float) == (2.0, 'b')
+
+
+class CountingConnection:
+    def __init__(self):
+        self.count = 0
+
+    def execute(self, query):
+        self.count += 1
+        return self
+
+    def scalar_one(self):
+        return 100 + self.count
+
+
+def test_cached_count_is_recounted_for_a_new_data_version():
+    clear_count_cache()
+    connection = CountingConnection()
+    assert get_cached_count(connection, "SELECT COUNT(*) FROM sellers;", version=1) == 101
+    assert get_cached_count(connection, "SELECT COUNT(*) FROM sellers;", version=1) == 101
+    assert get_cached_count(connection, "SELECT COUNT(*) FROM sellers;", version=2) == 102
+    assert get_cached_count(connection, "SELECT COUNT(*) FROM sellers;", ttl_seconds=0, version=2) == 103
+    clear_count_cache()
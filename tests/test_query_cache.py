@@ -0,0 +1,79 @@
+import pytest
+
+from backend import query_cache
+from backend.query_cache import QueryCache, cached_query
+
+
+class FakeEngine:
+    """An engine whose dataset version the test controls."""
+
+    def __init__(self, name: str, version: int = 1):
+        self.name = name
+        self.version = version
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    cache = QueryCache(max_entries=8, ttl_seconds=60)
+    monkeypatch.setattr(query_cache, "query_cache", cache)
+    monkeypatch.setattr(query_cache, "get_data_version", lambda engine: engine.version)
+    return cache
+
+
+def test_engines_do_not_share_entries(fresh_cache):
+    calls = []
+
+    @cached_query
+    def get_kpis(engine, limit=5):
+        calls.append(engine.name)
+        return [engine.name, limit]
+
+    postgres, duckdb = FakeEngine("postgres"), FakeEngine("duckdb")
+    assert get_kpis(postgres) == ["postgres", 5]
+    assert get_kpis(duckdb) == ["duckdb", 5]
+    assert get_kpis(postgres) == ["postgres", 5]
+    assert calls == ["postgres", "duckdb"]
+
+
+def test_new_data_version_invalidates_entries(fresh_cache):
+    calls = []
+
+    @cached_query
+    def get_kpis(engine):
+        calls.append(engine.version)
+        return {"version": engine.version}
+
+    engine = FakeEngine("postgres")
+    assert get_kpis(engine) == {"version": 1}
+    assert get_kpis(engine) == {"version": 1}
+    engine.version = 2
+    assert get_kpis(engine) == {"version": 2}
+    assert calls == [1, 2]
+    assert fresh_cache.stats()["hits"] == 1
+
+
+def test_empty_results_are_not_cached(fresh_cache):
+    calls = []
+
+    @cached_query
+    def get_trend(engine):
+        calls.append(1)
+        return []
+
+    engine = FakeEngine("postgres")
+    get_trend(engine)
+    get_trend(engine)
+    assert len(calls) == 2
+
+
+def test_expired_and_evicted_entries_are_misses():
+    cache = QueryCache(max_entries=2, ttl_seconds=0)
+    cache.put("a", 1, "value")
+    assert cache.get("a", 1) == (False, None)
+
+    cache = QueryCache(max_entries=2, ttl_seconds=60)
+    for key in ["a", "b", "c"]:
+        cache.put(key, 1, key)
+    assert cache.get("a", 1) == (False, None)
+    assert cache.get("c", 1) == (True, "c")
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,26 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from backend.response_format import dumps, to_columns
+
+
+def test_columns_with_missing_values_serialize_as_null():
+    df = pd.DataFrame({
+        "ds": pd.to_datetime(["2018-01-01", None]),
+        "yhat": [1.5, np.nan],
+        "category": ["toys", None],
+    })
+    assert json.loads(dumps(to_columns(df))) == {
+        "ds": ["2018-01-01T00:00:00", None],
+        "yhat": [1.5, None],
+        "category": ["toys", None],
+    }
+
+
+def test_complete_numeric_and_datetime_columns_stay_arrays():
+    df = pd.DataFrame({"ds": pd.date_range("2018-01-01", periods=3), "yhat": [1.0, 2.0, 3.0]})
+    columns = to_columns(df)
+    assert isinstance(columns["ds"], np.ndarray) and isinstance(columns["yhat"], np.ndarray)
+    assert json.loads(dumps(columns))["ds"][-1] == "2018-01-03T00:00:00"
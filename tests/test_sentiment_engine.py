@@ -0,0 +1,38 @@
+import pytest
+
+pytest.importorskip("torch")
+
+from backend.sentiment_engine import SentimentEngine, score_to_label
+
+
+def plan(lengths, max_batch_size=4, max_tokens_per_batch=64):
+    engine = SentimentEngine(max_batch_size=max_batch_size, max_tokens_per_batch=max_tokens_per_batch, memo=False)
+    return engine._plan_batches(lengths)
+
+
+def test_every_position_is_planned_once():
+    lengths = [5, 40, 12, 7, 64, 3, 3, 30, 18, 9]
+    batches = plan(lengths)
+    assert sorted(i for batch in batches for i in batch) == list(range(len(lengths)))
+
+
+def test_batches_respect_size_and_token_budget():
+    lengths = [5, 40, 12, 7, 64, 3, 3, 30, 18, 9, 11, 2]
+    for batch in plan(lengths):
+        assert len(batch) <= 4
+        # A single sequence longer than the budget still gets a batch of its own
+        assert len(batch) == 1 or max(lengths[i] for i in batch) * len(batch) <= 64
+
+
+def test_batches_group_similar_lengths():
+    lengths = [100, 2, 100, 2, 100, 2]
+    batches = plan(lengths, max_batch_size=3, max_tokens_per_batch=1000)
+    assert [sorted(lengths[i] for i in batch) for batch in batches] == [[2, 2, 2], [100, 100, 100]]
+
+
+def test_empty_input_plans_nothing():
+    assert plan([]) == []
+
+
+def test_score_to_label():
+    assert [score_to_label(score) for score in range(1, 6)] == ['negative', 'negative', 'neutral', 'positive', 'positive']
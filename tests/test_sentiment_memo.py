@@ -0,0 +1,15 @@
+from backend.sentiment_memo import normalize_comment
+
+
+def test_normalize_comment_merges_case_and_whitespace():
+    assert normalize_comment("  Ótimo   PRODUTO\n\tRecomendo ") == "ótimo produto recomendo"
+
+
+def test_normalize_comment_composes_accents():
+    decomposed = "ótimo"
+    assert decomposed != "ótimo"
+    assert normalize_comment(decomposed) == "ótimo"
+
+
+def test_normalize_comment_keeps_punctuation():
+    assert normalize_comment("bom!") != normalize_comment("bom")